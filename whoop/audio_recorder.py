@@ -9,57 +9,114 @@ This application provides a GUI with:
 - 5-second audio recording capability
 - Saves recordings with the provided name
 
+The recording, saving and scoring itself is done by recorder_core.Recorder;
+this module is the Tk front end. See kiosk.py for running it without a GUI.
+The window appears straight away: the microphone and camera are opened and
+probed in the background (with results cached by device_probe.py), and
+cv2/sounddevice are only imported there.
+
+With WHOOP_STATIONS set (see stations.py) the window shows one panel per
+recording station, each with its own microphone, camera and name field,
+and all of them share one scoring pipeline.
+
 Cross-platform compatible: Windows, macOS, Linux
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
-import wave
-import sounddevice as sd
-import numpy as np
 import os
 import platform
-import re
-from datetime import datetime
-import cv2
-import subprocess
-import requests
+from ui_pump import UIPump
+from capture_profiles import get_profile
+from device_probe import probe_all, probe_audio_inputs
+from recorder_core import Recorder, RecorderEvents, sanitize_filename
+from stations import StationGroup, parse_stations
+
+
+class TkRecorderEvents(RecorderEvents):
+    """Shows a Recorder's progress in the AudioRecorderApp window, through its UI pump"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def status(self, text):
+        print(text)
+        self.app.ui.set_var(self.app.status_var, text)
+
+    def countdown(self, text):
+        self.app.ui.set_var(self.app.countdown_var, text)
+
+    def progress(self, value, maximum):
+        self.app.ui.configure(self.app.progress, value=value, maximum=maximum)
+
+    def error(self, title, message):
+        print(f"❌ {title}: {message}")
+        self.app.ui.call(messagebox.showerror, title, message)
+
+    def job_status(self, job, message):
+        self.app.ui.set_var(self.app.job_status_var, f"{job['name']}: {message}")
 
 
 class AudioRecorderApp:
-    def __init__(self, root):
+    """
+    The recorder window, or one station's panel of it: with a StationGroup
+    (group=) the app records `station` into the `parent` frame and its
+    recorder shares the group's scoring pipeline.
+    """
+
+    def __init__(self, root, profile=None, station=None, group=None, parent=None):
         self.root = root
-        self.root.title("Audio Recorder")
-        self.root.geometry("400x300")
-        self.root.resizable(False, False)
+        self.station = station
+        self.group = group
+        self.parent = parent or root
+        if parent is None:
+            self.root.title("Audio Recorder")
+            self.root.geometry("400x300")
+            self.root.resizable(False, False)
         
-        # Recording parameters
-        self.sample_rate = 44100  # Hz
-        self.duration = 5  # seconds
+        # Recording parameters, from the capture profile (see capture_profiles.py)
+        self.profile = get_profile(profile)
+        self.sample_rate = self.profile.sample_rate  # Hz
+        self.duration = self.profile.duration  # seconds
         self.countdown_time = 3  # seconds
-        self.recording_data = None
+        self.preroll_seconds = 1.0  # audio kept from before the recording starts
         self.is_recording = False
         
-        # Webcam parameters
-        self.webcam = None
-        self.webcam_available = False
-        self.video_writer = None
+        # The recorder opens the microphone and camera once and keeps them warm
+        options = dict(profile=self.profile, countdown_time=self.countdown_time,
+                       preroll_seconds=self.preroll_seconds)
+        if group is not None:
+            self.recorder = group.add(station, TkRecorderEvents(self), **options)
+        else:
+            self.recorder = Recorder(TkRecorderEvents(self), **options)
+        # Until the devices are probed, go by what was found last time
+        self.camera_cache_key = "camera_available" if station is None else f"camera_available:{station.name}"
+        self.webcam_available = self.recorder.probe_cache.get(self.camera_cache_key, False)
         
-        # Check audio device availability on startup
-        self.check_audio_devices()
+        self.setup_ui()
         
-        # Check webcam availability on startup
-        self.check_webcam_devices()
+        # Worker threads never touch Tk objects: they post updates to the pump,
+        # which applies the latest of each on the main thread ~30 times a second
+        self.ui = UIPump(self.root, interval_ms=33)
+        self.ui.start()
         
-        self.setup_ui()
+        # Open and check the devices in the background, so the window shows now
+        threading.Thread(target=self.probe_devices, daemon=True).start()
+        
+    def probe_devices(self):
+        """Open the devices and check them concurrently, off the main thread"""
+        self.recorder.start(wait=False)
+        results = probe_all(self.recorder.probe_cache, {"audio_inputs": probe_audio_inputs})
+        self.check_audio_devices(results["audio_inputs"])
+        self.recorder.devices.wait_ready()
+        self.check_webcam_devices()
         
-    def check_audio_devices(self):
-        """Check if audio input devices are available"""
+    def check_audio_devices(self, input_devices):
+        """Warn if no audio input devices were found (None if probing failed)"""
         try:
-            devices = sd.query_devices()
-            input_devices = [d for d in devices if d['max_input_channels'] > 0]
+            if input_devices is None:
+                raise RuntimeError("the audio system could not be queried")
             
             if not input_devices:
                 # Show warning but don't prevent startup
@@ -74,21 +131,19 @@ class AudioRecorderApp:
                     warning_msg = ("No audio input devices detected.\n"
                                  "Please check your microphone connection and system audio settings.")
                 
-                messagebox.showwarning("Audio Device Warning", warning_msg)
+                self.ui.call(messagebox.showwarning, self.dialog_title("Audio Device Warning"), warning_msg)
                 
         except Exception as e:
-            messagebox.showwarning("Audio System Warning", 
-                                 f"Could not check audio devices: {str(e)}\n"
-                                 "Recording may not work properly.")
+            self.ui.call(messagebox.showwarning, self.dialog_title("Audio System Warning"),
+                         f"Could not check audio devices: {str(e)}\n"
+                         "Recording may not work properly.")
         
     def check_webcam_devices(self):
         """Check if webcam devices are available"""
         try:
-            # Try to access the default camera (index 0)
-            cap = cv2.VideoCapture(0)
-            if cap.isOpened():
+            # The recorder's device manager already tried to open the camera
+            if self.recorder.camera_available:
                 self.webcam_available = True
-                cap.release()
             else:
                 self.webcam_available = False
                 
@@ -106,7 +161,7 @@ class AudioRecorderApp:
                     warning_msg = ("No webcam detected or webcam is in use by another application.\n"
                                  "Video recording will be disabled.")
                 
-                messagebox.showwarning("Webcam Warning", warning_msg)
+                self.ui.call(messagebox.showwarning, self.dialog_title("Webcam Warning"), warning_msg)
         except Exception as e:
             self.webcam_available = False
             
@@ -123,46 +178,34 @@ class AudioRecorderApp:
                 error_msg = (f"Could not check webcam devices: {str(e)}\n"
                            "Video recording will be disabled.")
             
-            messagebox.showwarning("Webcam System Warning", error_msg)
+            self.ui.call(messagebox.showwarning, self.dialog_title("Webcam System Warning"), error_msg)
         
-    def sanitize_filename(self, filename):
-        """Sanitize filename for cross-platform compatibility, especially Windows"""
-        # Remove or replace invalid characters for Windows filenames
-        # Invalid characters: < > : " | ? * \ /
-        invalid_chars = r'<>:"|?*\/'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
-            
-        # Remove leading/trailing dots and spaces (Windows issue)
-        filename = filename.strip('. ')
+        # Remember for the next start, and show the result in the window
+        self.recorder.probe_cache.set(self.camera_cache_key, self.webcam_available)
+        self.ui.set_var(self.instructions_var, self.instructions_text())
         
-        # Ensure filename is not empty
-        if not filename:
-            filename = "recording"
-            
-        # Windows reserved names
-        reserved_names = ['CON', 'PRN', 'AUX', 'NUL', 'COM1', 'COM2', 'COM3', 'COM4', 
-                         'COM5', 'COM6', 'COM7', 'COM8', 'COM9', 'LPT1', 'LPT2', 
-                         'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9']
+    def dialog_title(self, title):
+        """A dialog title, naming the station when the window has several"""
+        return title if self.station is None else f"{self.station.name}: {title}"
         
-        if filename.upper() in reserved_names:
-            filename = f"user_{filename}"
-            
-        return filename
+    def sanitize_filename(self, filename):
+        """Sanitize filename for cross-platform compatibility, especially Windows"""
+        return sanitize_filename(filename)
         
     def setup_ui(self):
         """Set up the user interface"""
         # Main frame
-        main_frame = ttk.Frame(self.root, padding="20")
+        main_frame = ttk.Frame(self.parent, padding="20")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Configure grid weights
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
+        self.parent.columnconfigure(0, weight=1)
+        self.parent.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
         
         # Title
-        title_label = ttk.Label(main_frame, text="Audio Recorder", 
+        title = self.station.name if self.station is not None else "Audio Recorder"
+        title_label = ttk.Label(main_frame, text=title, 
                                font=("Arial", 16, "bold"))
         title_label.grid(row=0, column=0, columnspan=2, pady=(0, 20))
         
@@ -197,12 +240,32 @@ class AudioRecorderApp:
         self.progress = ttk.Progressbar(main_frame, length=300, mode='determinate')
         self.progress.grid(row=5, column=0, columnspan=2, pady=(0, 10))
         
-        # Instructions
+        # Scoring progress of earlier recordings, updated in the background
+        self.job_status_var = tk.StringVar(value="")
+        job_status_label = ttk.Label(main_frame, textvariable=self.job_status_var,
+                                     font=("Arial", 9))
+        job_status_label.grid(row=6, column=0, columnspan=2, pady=(0, 10))
+        
+        # Instructions, updated once the webcam has been checked
+        self.instructions_var = tk.StringVar(value=self.instructions_text())
+        instructions_label = ttk.Label(main_frame, textvariable=self.instructions_var, 
+                                      font=("Arial", 9), 
+                                      justify=tk.LEFT)
+        instructions_label.grid(row=7, column=0, columnspan=2, pady=(20, 0))
+        
+    def take_length_text(self):
+        """How long a take lasts, for the instructions"""
+        if self.profile.auto_stop:
+            return f"up to {self.duration:g} seconds and stop when you do"
+        return f"{self.duration:g} seconds"
+
+    def instructions_text(self):
+        """Instructions with the current webcam status"""
         instructions = ("Instructions:\n"
                        "1. Enter your name in the text field\n"
                        "2. Click 'Start Recording'\n"
                        "3. Wait for the countdown to finish\n"
-                       "4. Recording will start automatically for 5 seconds\n"
+                       f"4. Recording will start automatically for {self.take_length_text()}\n"
                        "5. Audio and video files will be saved with your name")
         
         # Add webcam status to instructions
@@ -210,11 +273,7 @@ class AudioRecorderApp:
             instructions += "\n\n✅ Webcam detected - Video recording enabled"
         else:
             instructions += "\n\n⚠️ No webcam detected - Audio only"
-        
-        instructions_label = ttk.Label(main_frame, text=instructions, 
-                                      font=("Arial", 9), 
-                                      justify=tk.LEFT)
-        instructions_label.grid(row=6, column=0, columnspan=2, pady=(20, 0))
+        return instructions
         
     def start_recording_process(self):
         """Start the recording process with countdown"""
@@ -230,291 +289,39 @@ class AudioRecorderApp:
         
         # Disable the button and start the process
         self.record_button.config(state='disabled')
-        
-        # Pre-initialize webcam if available to avoid delay after countdown
-        if self.webcam_available:
-            try:
-                self.webcam = cv2.VideoCapture(0)
-                if not self.webcam.isOpened():
-                    print("Warning: Could not open webcam, falling back to audio-only")
-                    self.webcam_available = False
-                    if self.webcam:
-                        self.webcam.release()
-                        self.webcam = None
-                else:
-                    # Set webcam properties for better Windows compatibility
-                    if platform.system() == "Windows":
-                        # Set buffer size to reduce latency on Windows
-                        self.webcam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                        # Set frame format for better compatibility
-                        self.webcam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
-            except Exception as e:
-                print(f"Warning: Webcam initialization failed: {e}")
-                self.webcam_available = False
-                if self.webcam:
-                    self.webcam.release()
-                    self.webcam = None
+        self.is_recording = True
         
         # Start countdown and recording in a separate thread
-        thread = threading.Thread(target=self.recording_thread)
+        thread = threading.Thread(target=self.recording_thread, args=(name,))
         thread.daemon = True
         thread.start()
         
-    def recording_thread(self):
-        """Handle countdown and recording in a separate thread"""
+    def recording_thread(self, name):
+        """Handle countdown, recording and saving in a separate thread"""
+        saved = False
         try:
-            # Countdown phase
-            self.status_var.set("Get ready! Recording will start in...")
-            
-            for i in range(self.countdown_time, 0, -1):
-                self.countdown_var.set(str(i))
-                time.sleep(1)
-                
-            self.countdown_var.set("")
-            
-            # Recording phase
-            status_text = "🔴 RECORDING... Speak now!"
-            if self.webcam_available:
-                status_text += " (Audio + Video)"
-            self.status_var.set(status_text)
-            self.is_recording = True
-            
-            # Start progress bar
-            self.progress['maximum'] = self.duration * 10  # Update every 0.1 seconds
-            self.progress['value'] = 0
-            
-            # New approach: Record video with audio synchronously if webcam available
-            if self.webcam_available:
-                self.record_video_with_audio()
-            else:
-                # Record audio only
-                self.record_audio_only()
-            
-            # Save the recordings
-            self.save_recording()
-            
+            session = self.recorder.record_session(name)
+            saved = session["job"] is not None
         except Exception as e:
-            messagebox.showerror("Error", f"Recording failed: {str(e)}")
+            self.ui.call(messagebox.showerror, "Error", f"Recording failed: {str(e)}")
         finally:
             # Reset UI
             self.is_recording = False
-            self.status_var.set("Enter your name and click 'Start Recording'")
-            self.countdown_var.set("")
-            self.progress['value'] = 0
-            self.record_button.config(state='normal')
-            
-            # Cleanup webcam if it was initialized for this recording
-            if hasattr(self, 'webcam') and self.webcam:
-                self.webcam.release()
-                self.webcam = None
-            
-    def record_video_with_audio(self):
-        """Record video and audio synchronously to avoid timing issues"""
-        try:
-            # Webcam should already be initialized in start_recording_process
-            if not self.webcam or not self.webcam.isOpened():
-                print("Warning: Webcam not available for recording")
-                # Fall back to audio only
-                self.record_audio_only()
-                return
-            
-            # Get webcam properties
-            fps = 30  # Frame rate
-            width = int(self.webcam.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(self.webcam.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # Ensure we have valid dimensions
-            if width <= 0 or height <= 0:
-                width, height = 640, 480  # Default resolution
-                print(f"Warning: Invalid webcam resolution, using default {width}x{height}")
-            
-            # Create video filename
-            name = self.name_var.get().strip()
-            safe_name = self.sanitize_filename(name) if name else "anonymous"
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            video_filename = f"{safe_name}_{timestamp}.mp4"
-            
-            # Ensure recordings directory exists
-            recordings_dir = os.path.join(os.getcwd(), "recordings")
-            if not os.path.exists(recordings_dir):
-                os.makedirs(recordings_dir, exist_ok=True)
-            
-            video_filepath = os.path.join(recordings_dir, video_filename)
-            
-            # Initialize video writer (MP4 codec, no audio)
-            # Use Windows-compatible codec selection
-            if platform.system() == "Windows":
-                # Try different codecs for better Windows compatibility
-                codecs_to_try = ['mp4v', 'XVID', 'MJPG', 'WMV2']
-                self.video_writer = None
-                
-                for codec_name in codecs_to_try:
-                    try:
-                        fourcc = cv2.VideoWriter_fourcc(*codec_name)
-                        self.video_writer = cv2.VideoWriter(video_filepath, fourcc, fps, (width, height))
-                        if self.video_writer.isOpened():
-                            break
-                        else:
-                            self.video_writer.release()
-                    except:
-                        continue
-                
-                if not self.video_writer or not self.video_writer.isOpened():
-                    print("Warning: Could not initialize video writer with any codec")
-                    # Fall back to audio only
-                    self.record_audio_only()
-                    return
-            else:
-                # Use default codec for other platforms
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                self.video_writer = cv2.VideoWriter(video_filepath, fourcc, fps, (width, height))
-            
-            # Verify video writer is working
-            if not self.video_writer.isOpened():
-                print("Warning: Video writer could not be initialized")
-                # Fall back to audio only
-                self.record_audio_only()
-                return
-            
-            # Start audio recording in the background
-            self.recording_data = sd.rec(int(self.duration * self.sample_rate), 
-                                       samplerate=self.sample_rate, 
-                                       channels=1, dtype=np.float32)
-            
-            # Record video for the duration - synchronized with audio
-            start_time = time.time()
-            frame_count = 0
-            target_frames = fps * self.duration
-            
-            while time.time() - start_time < self.duration and frame_count < target_frames:
-                ret, frame = self.webcam.read()
-                if ret:
-                    self.video_writer.write(frame)
-                    frame_count += 1
-                else:
-                    # Handle frame read failures
-                    print("Warning: Failed to read frame from webcam")
-                    break
-                
-                # Update progress bar
-                progress_value = int((time.time() - start_time) * 10)
-                if progress_value <= self.duration * 10:
-                    self.progress['value'] = progress_value
-                
-                time.sleep(1.0 / fps)  # Maintain frame rate
-            
-            # Wait for audio recording to complete
-            sd.wait()
-            
-            print(f"Recorded {frame_count} video frames")
-            
-        except Exception as e:
-            error_msg = f"Error during synchronized recording: {e}"
-            print(error_msg)
-            # On Windows, provide additional troubleshooting info
-            if platform.system() == "Windows":
-                print("Windows troubleshooting:")
-                print("- Check camera permissions in Windows Settings")
-                print("- Close other apps using the camera")
-                print("- Try running as administrator")
-            # Fall back to audio only
-            self.record_audio_only()
-        finally:
-            # Cleanup webcam resources
-            if hasattr(self, 'video_writer') and self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
-            if hasattr(self, 'webcam') and self.webcam:
-                self.webcam.release()
-                self.webcam = None
-    
-    def record_audio_only(self):
-        """Record audio only when no webcam is available"""
-        try:
-            # Record audio
-            self.recording_data = sd.rec(int(self.duration * self.sample_rate), 
-                                       samplerate=self.sample_rate, 
-                                       channels=1, dtype=np.float32)
-            
-            # Update progress bar during recording
-            for i in range(self.duration * 10):
-                time.sleep(0.1)
-                self.progress['value'] = i + 1
-                
-            sd.wait()  # Wait until recording is finished
-            
-        except Exception as e:
-            print(f"Error during audio recording: {e}")
-            raise
+            if not saved:
+                self.ui.set_var(self.status_var, "Enter your name and click 'Start Recording'")
+            self.ui.set_var(self.countdown_var, "")
+            self.ui.configure(self.record_button, state='normal')
     
     def save_recording(self):
-        """Save the recorded audio to a WAV file and automatically score it."""
-        try:
-            name = self.name_var.get().strip()
-            safe_name = self.sanitize_filename(name) if name else "anonymous"
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{safe_name}_{timestamp}.wav"
-
-            # Ensure recordings directory exists
-            recordings_dir = os.path.join(os.getcwd(), "recordings")
-            os.makedirs(recordings_dir, exist_ok=True)
-
-            filepath = os.path.join(recordings_dir, filename)
-
-            # Convert float32 to int16 and save WAV
-            audio_data = (self.recording_data * 32767).astype(np.int16)
-            with wave.open(filepath, 'wb') as wf:
-                wf.setnchannels(1)  # Mono
-                wf.setsampwidth(2)  # 2 bytes per sample
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(audio_data.tobytes())
-
-            self.status_var.set(f"✅ Recording saved as: {filename}")
-
-            # Prepare success message
-            success_msg = f"Recording saved successfully!\nAudio file: {filename}\nLocation: {recordings_dir}"
-
-            # Include video file if available
-            if self.webcam_available:
-                video_filename = f"{safe_name}_{timestamp}.mp4"
-                video_filepath = os.path.join(recordings_dir, video_filename)
-                if os.path.exists(video_filepath):
-                    success_msg += f"\nVideo file: {video_filename}"
-                else:
-                    success_msg += "\nNote: Video recording may have failed"
-
-            messagebox.showinfo("Success", success_msg)
-
-            # ---- AUTOMATIC SCORING ----
-            try:
-                # Run whoop.py on the saved WAV
-                result = subprocess.run(
-                    ["python3", "whoop_gamescore.py", filepath],
-                    capture_output=True, text=True
-                )
-
-                if result.returncode == 0:
-                    # whoop.py must print a dictionary like {"name": "Alice", "score": 0.87}
-                    score_dict = eval(result.stdout.strip())
-                    print("Whoop.py output:", score_dict)
-
-                    # Submit score to Flask server
-                    try:
-                        requests.post("http://127.0.0.1:5000/submit-score", json=score_dict)
-                        print("Score submitted successfully!")
-                    except Exception as e:
-                        print("Failed to submit score:", e)
-                else:
-                    print("Whoop.py error:", result.stderr.strip())
-
-            except Exception as e:
-                print("Error running whoop.py:", e)
-
-        except Exception as e:
-            error_msg = f"Failed to save recording: {str(e)}"
-            self.status_var.set("❌ Save failed - check console")
-            messagebox.showerror("Error", error_msg)
-
+        """Queue the last recording for scoring and submission (done by the recorder)"""
+        return self.recorder.save_recording()
+    
+    def close(self):
+        """Close the devices and finish queued scoring when the application exits"""
+        self.ui.stop()
+        # A station's recorder is closed by its group, with the others
+        if self.group is None:
+            self.recorder.close()
 
 
 def main():
@@ -538,12 +345,35 @@ def main():
         except:
             pass  # Ignore if icon file not found
             
-        app = AudioRecorderApp(root)
+        # WHOOP_CAPTURE_PROFILE picks a capture profile, e.g. scoring-8k
+        profile = os.environ.get("WHOOP_CAPTURE_PROFILE")
+        # WHOOP_AUDIO_STORAGE=flac keeps the takes as lossless FLAC
+        profile = get_profile(profile, audio_storage=os.environ.get("WHOOP_AUDIO_STORAGE"))
+        # WHOOP_STATIONS lists the booths recorded from this window, e.g. "left:1:0,right:2:1"
+        stations = parse_stations(os.environ.get("WHOOP_STATIONS", ""))
+        group = None
+        if stations:
+            group = StationGroup()
+            root.title(f"Audio Recorder - {len(stations)} stations")
+            root.geometry(f"{400 * len(stations)}x300")
+            apps = []
+            for column, station in enumerate(stations):
+                panel = ttk.Frame(root)
+                panel.grid(row=0, column=column, sticky=(tk.W, tk.E, tk.N, tk.S))
+                root.columnconfigure(column, weight=1)
+                apps.append(AudioRecorderApp(root, profile=profile, station=station, group=group, parent=panel))
+        else:
+            apps = [AudioRecorderApp(root, profile=profile)]
         
         try:
             root.mainloop()
         except KeyboardInterrupt:
             print("\nApplication closed by user")
+        finally:
+            for app in apps:
+                app.close()
+            if group is not None:
+                group.close()
             
     except Exception as e:
         # Handle any startup errors gracefully
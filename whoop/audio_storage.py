@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Lossless FLAC storage of recordings.
+
+A 5 s mono take is 441 KB as a 44.1 kHz 16-bit WAV; FLAC keeps exactly the
+same samples in a fraction of the space. The recorder still streams each
+take to a WAV file while capturing; with a profile's audio_storage set to
+"flac" it is compressed as soon as it is saved, and everything after that
+(duplicate check, scoring, similarity search) reads the FLAC. Recordings
+kept as WAV can be archived to FLAC later with this script.
+
+read_audio() decodes a WAV or FLAC file (or upload) in memory into a numpy
+array with the same integer sample format scipy's wavfile.read gives for
+the WAV, so a recording scores identically either way. FLAC needs the
+soundfile package; WAV files are read without it.
+
+Usage:
+    python3 audio_storage.py recordings/                 # archive every WAV as FLAC
+    python3 audio_storage.py recordings/ --min-age 600   # only takes older than 10 min
+    python3 audio_storage.py recordings/ --report        # size, read time and scores, WAV vs FLAC
+"""
+
+import os
+import io
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+STORAGE_FORMATS = ("wav", "flac")
+# FLAC holds integer samples of up to 24 bits, so only these are stored losslessly
+FLAC_SUBTYPES = {"int16": "PCM_16"}
+
+
+def _soundfile():
+    try:
+        import soundfile
+    except ImportError:
+        raise RuntimeError("FLAC recordings need the soundfile package (pip install soundfile)") from None
+    return soundfile
+
+
+def is_audio_file(path):
+    """Whether path names a WAV or FLAC recording."""
+    return os.path.splitext(str(path))[1].lower() in AUDIO_EXTENSIONS
+
+
+def find_audio_files(directory):
+    """The WAV and FLAC recordings directly in a directory, sorted."""
+    return [os.path.join(directory, entry) for entry in sorted(os.listdir(directory)) if is_audio_file(entry)]
+
+
+def audio_aliases(path):
+    """path under every audio extension, e.g. for a take since converted to FLAC."""
+    stem = os.path.splitext(str(path))[0]
+    return [stem + extension for extension in AUDIO_EXTENSIONS]
+
+
+def existing_audio_path(path):
+    """path if it exists, else the same recording under another audio extension (or path)."""
+    if os.path.exists(path):
+        return path
+    for alias in audio_aliases(path):
+        if os.path.exists(alias):
+            return alias
+    return path
+
+
+def read_audio(source):
+    """
+    Read a WAV or FLAC recording. Returns (rate, data) like wavfile.read.
+
+    source is a path or a binary file object; the format is taken from the
+    content, not the name. FLAC is decoded straight into the array, 16-bit
+    samples as int16 and deeper ones as int32.
+    """
+    if hasattr(source, "read"):
+        position = source.tell()
+        magic = source.read(4)
+        source.seek(position)
+    else:
+        with open(source, "rb") as f:
+            magic = f.read(4)
+    if magic != b"fLaC":
+        from scipy.io import wavfile
+        return wavfile.read(source)
+    soundfile = _soundfile()
+    with soundfile.SoundFile(source) as f:
+        data = f.read(dtype="int16" if f.subtype == "PCM_16" else "int32")
+        return f.samplerate, data
+
+
+def mono(data):
+    """Average the channels of a (samples x channels) array; mono arrays pass through."""
+    data = np.asarray(data)
+    return data.mean(axis=1) if data.ndim > 1 else data
+
+
+def audio_info(path):
+    """(sample rate, frames) of a WAV or FLAC file, from its header."""
+    if str(path).lower().endswith(".flac"):
+        info = _soundfile().info(str(path))
+        return info.samplerate, info.frames
+    import wave
+    try:
+        with wave.open(str(path), "rb") as wf:
+            return wf.getframerate(), wf.getnframes()
+    except (wave.Error, EOFError):
+        rate, data = read_audio(path)  # e.g. float samples, which wave cannot parse
+        return rate, len(data)
+
+
+def compress(wav_path, flac_path=None, keep_wav=False):
+    """
+    Store a WAV recording as FLAC and return the FLAC's path.
+
+    The FLAC is decoded and compared with the WAV before it replaces it, so
+    the samples are guaranteed to be the same. Raises ValueError for sample
+    formats FLAC cannot hold losslessly.
+    """
+    from scipy.io import wavfile
+    soundfile = _soundfile()
+    rate, data = wavfile.read(wav_path)
+    subtype = FLAC_SUBTYPES.get(data.dtype.name)
+    if subtype is None:
+        raise ValueError(f"{wav_path}: FLAC cannot store {data.dtype.name} samples losslessly")
+    stem = os.path.splitext(str(wav_path))[0]
+    flac_path = flac_path or stem + ".flac"
+    partial = os.path.splitext(flac_path)[0] + ".part.flac"  # renamed once verified
+    soundfile.write(partial, data, rate, format="FLAC", subtype=subtype)
+    decoded_rate, decoded = read_audio(partial)
+    if decoded_rate != rate or not np.array_equal(decoded, data):
+        os.remove(partial)
+        raise RuntimeError(f"{flac_path} does not decode to the samples of {wav_path}")
+    os.replace(partial, flac_path)
+    if not keep_wav:
+        os.remove(wav_path)
+    return flac_path
+
+
+def archive(recordings_dir, min_age=0, keep_wav=False):
+    """
+    Convert the WAV recordings in a directory to FLAC.
+
+    Takes modified less than min_age seconds ago are skipped, as they may
+    still be being scored. Returns (converted paths, bytes before, bytes after).
+    """
+    converted, before, after = [], 0, 0
+    now = time.time()
+    for path in find_audio_files(recordings_dir):
+        if not path.lower().endswith(".wav") or now - os.path.getmtime(path) < min_age:
+            continue
+        size = os.path.getsize(path)
+        try:
+            flac_path = compress(path, keep_wav=keep_wav)
+        except (ValueError, RuntimeError) as e:
+            print(f"⚠️  {e}")
+            continue
+        converted.append(flac_path)
+        before += size
+        after += os.path.getsize(flac_path)
+    return converted, before, after
+
+
+def storage_report(wav_files, real_wav=None, repeats=3):
+    """
+    Compare WAV and FLAC storage of some recordings.
+
+    Converts copies to FLAC in a temporary directory and returns their total
+    sizes, the time to read all of them (best of `repeats`) and, with
+    real_wav, whether every recording scores the same from either file.
+    """
+    report = {"files": len(wav_files), "wav_bytes": 0, "flac_bytes": 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        flac_files = []
+        for wav in wav_files:
+            copy = os.path.join(tmp, os.path.basename(wav))
+            shutil.copyfile(wav, copy)
+            flac_files.append(compress(copy))
+            report["wav_bytes"] += os.path.getsize(wav)
+            report["flac_bytes"] += os.path.getsize(flac_files[-1])
+
+        for label, files in (("wav", wav_files), ("flac", flac_files)):
+            best = float("inf")
+            for _ in range(repeats):
+                started = time.perf_counter()
+                for path in files:
+                    with open(path, "rb") as f:
+                        read_audio(io.BytesIO(f.read()))
+                best = min(best, time.perf_counter() - started)
+            report[f"{label}_read_seconds"] = best
+
+        if real_wav:
+            from whoop_gamescore import compare_mimic
+            report["scores_identical"] = all(
+                compare_mimic(wav, real_wav) == compare_mimic(flac, real_wav)
+                for wav, flac in zip(wav_files, flac_files))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive WAV recordings as lossless FLAC")
+    parser.add_argument("recordings_dir", help="Directory of recordings")
+    parser.add_argument("--min-age", type=float, default=0,
+                        help="Skip recordings modified less than this many seconds ago")
+    parser.add_argument("--keep-wav", action="store_true", help="Keep the WAV files")
+    parser.add_argument("--report", action="store_true",
+                        help="Only compare WAV and FLAC storage of the WAV files, converting copies")
+    parser.add_argument("--real_wav", help="Template for --report to check that the scores match")
+    args = parser.parse_args()
+
+    if args.report:
+        wav_files = [path for path in find_audio_files(args.recordings_dir) if path.lower().endswith(".wav")]
+        if not wav_files:
+            print(f"❌ No .wav files found in {args.recordings_dir}")
+            return None
+        report = storage_report(wav_files, args.real_wav)
+        print(f"Files: {report['files']}")
+        print(f"Size: {report['wav_bytes'] / 1e6:.2f} MB as WAV, {report['flac_bytes'] / 1e6:.2f} MB as FLAC "
+              f"({100 * (1 - report['flac_bytes'] / report['wav_bytes']):.0f}% smaller)")
+        print(f"Reading all of them from memory: WAV {report['wav_read_seconds'] * 1000:.1f} ms, "
+              f"FLAC {report['flac_read_seconds'] * 1000:.1f} ms")
+        if "scores_identical" in report:
+            print("✅ Identical scores" if report["scores_identical"] else "❌ Scores differ")
+        return report
+
+    converted, before, after = archive(args.recordings_dir, args.min_age, args.keep_wav)
+    if not converted:
+        print(f"✅ Nothing to archive in {args.recordings_dir}")
+        return converted
+    print(f"✅ {len(converted)} recording(s) archived: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+    return converted
+
+
+if __name__ == "__main__":
+    main()
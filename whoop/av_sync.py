@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Audio/video alignment and per-station input-latency calibration.
+
+During a session every video frame is stamped with time.monotonic() when it
+is read, and every audio block is stamped on the same clock by the capture's
+AudioClock (capture_pipeline.py). What the clocks cannot see is how long a
+sound or an image takes to reach the program; that is measured once per
+station and kept in <recordings>/calibration.json:
+
+- audio_latency: seconds from a sound to its samples reaching the callback
+- video_latency: seconds from an image to its frame being read
+
+The recorder stores the aligned start times of the WAV and MP4 and their
+offset under "av_sync" in the sidecar (see av_sync_metadata), and moves the
+scoring trigger by the audio latency so the scoring window starts at "go".
+
+Calibrating:
+    # Loopback cable (or speaker next to the microphone): audio latency
+    python3 av_sync.py loopback
+
+    # Clap once in front of the camera during a recording: video vs audio
+    python3 av_sync.py clap recordings/calibration_20250101_120000.wav
+    python3 av_sync.py clap --record   # records a clap session first
+
+    python3 av_sync.py show
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from recording_metadata import read_sidecar
+
+CALIBRATION_FILE = "calibration.json"
+DEFAULT_CALIBRATION = {"audio_latency": 0.0, "video_latency": 0.0}
+
+
+def calibration_path(recordings_dir):
+    return os.path.join(recordings_dir, CALIBRATION_FILE)
+
+
+def load_calibration(recordings_dir, station):
+    """A station's measured latencies, zero for anything not calibrated."""
+    try:
+        with open(calibration_path(recordings_dir)) as f:
+            stations = json.load(f)
+    except (OSError, ValueError):
+        stations = {}
+    return dict(DEFAULT_CALIBRATION, **stations.get(station, {}))
+
+
+def save_calibration(recordings_dir, station, **fields):
+    """Merge measured latencies into a station's calibration and return it."""
+    path = calibration_path(recordings_dir)
+    try:
+        with open(path) as f:
+            stations = json.load(f)
+    except (OSError, ValueError):
+        stations = {}
+    calibration = dict(DEFAULT_CALIBRATION, **stations.get(station, {}))
+    calibration.update(fields, measured_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    stations[station] = calibration
+    os.makedirs(recordings_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(stations, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return calibration
+
+
+def av_sync_metadata(session_start, audio_capture, video_start=None, video_fps=None, calibration=None):
+    """
+    Sidecar fields lining the WAV and MP4 up on the session clock.
+
+    Times are seconds since session_start (time.monotonic()), corrected by
+    the station's calibration. av_offset is where in the WAV the first video
+    frame belongs: positive when the video starts after the audio.
+    """
+    calibration = calibration or DEFAULT_CALIBRATION
+    audio_start = audio_capture.clock.time_of(0)
+    if audio_start is None:
+        return {}
+    metadata = {
+        "audio_start": round(audio_start - calibration["audio_latency"] - session_start, 4),
+        "trigger_time": round(audio_capture.trigger_time - session_start, 4),
+        "audio_latency": calibration["audio_latency"],
+        "video_latency": calibration["video_latency"],
+    }
+    if video_start is not None:
+        metadata["video_start"] = round(video_start - calibration["video_latency"] - session_start, 4)
+        metadata["video_fps"] = video_fps
+        metadata["av_offset"] = round(metadata["video_start"] - metadata["audio_start"], 4)
+    return metadata
+
+
+def aligned_trigger_sample(audio_capture, audio_latency):
+    """
+    Position in the WAV of the sound made at the trigger.
+
+    The stream position at the trigger holds sound from audio_latency
+    earlier, so the player's "go" lands later in the file than that.
+    """
+    sample = audio_capture.clock.sample_at(audio_capture.trigger_time + audio_latency)
+    if sample is None:
+        return audio_capture.trigger_sample
+    return int(np.clip(sample, 0, audio_capture.trigger_sample + audio_capture.samples_captured))
+
+
+# ---- Onset detection ----
+
+def audio_onset(data, rate, threshold=0.5, smoothing=0.002):
+    """Sample index where a clap or click starts: the envelope first reaches threshold x its peak."""
+    data = np.abs(np.asarray(data, dtype=np.float64).reshape(len(data), -1).mean(axis=1))
+    width = max(1, int(smoothing * rate))
+    envelope = np.convolve(data, np.ones(width) / width, mode="same")
+    peak = envelope.max()
+    if peak <= 0:
+        return None
+    return int(np.argmax(envelope >= threshold * peak))
+
+
+def video_onset(video_path):
+    """Index of the frame that changes the most from the one before (the clap)."""
+    import cv2
+    video = cv2.VideoCapture(video_path)
+    previous, changes = None, []
+    while True:
+        ok, frame = video.read()
+        if not ok:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        changes.append(0.0 if previous is None else float(np.mean(np.abs(gray - previous))))
+        previous = gray
+    video.release()
+    if len(changes) < 2:
+        return None
+    return int(np.argmax(changes))
+
+
+def clap_offset(wav_path, video_path=None):
+    """
+    Seconds the clap appears later in the video than in the audio.
+
+    Uses the av_sync times from the recording's sidecar, so a result of 0
+    means the current calibration is right; add it to video_latency.
+    """
+    from audio_storage import read_audio
+    sync = read_sidecar(wav_path).get("av_sync", {})
+    if "video_start" not in sync:
+        raise ValueError(f"{wav_path} has no video timing in its sidecar")
+    if video_path is None:
+        # The capture intermediate until it has been transcoded
+        stem = os.path.splitext(wav_path)[0]
+        video_path = stem + ".mp4" if os.path.exists(stem + ".mp4") else stem + ".avi"
+    rate, data = read_audio(wav_path)
+    sample = audio_onset(data, rate)
+    frame = video_onset(video_path)
+    if sample is None or frame is None:
+        raise ValueError("no clap found")
+    audio_time = sync["audio_start"] + sample / rate
+    video_time = sync["video_start"] + frame / sync["video_fps"]
+    return video_time - audio_time
+
+
+# ---- Measurements ----
+
+def measure_loopback(sample_rate=44100, clicks=5, interval=0.5):
+    """
+    Round-trip latency from playing clicks to recording them, in seconds.
+
+    Needs the output looped back into the input (cable, or a speaker next to
+    the microphone). The input latency is the round trip minus the output
+    device's reported latency.
+    """
+    import sounddevice as sd
+    signal = np.zeros(int((clicks + 1) * interval * sample_rate), dtype=np.float32)
+    click = np.hanning(int(0.002 * sample_rate)).astype(np.float32) * 0.8
+    starts = [int((i + 0.5) * interval * sample_rate) for i in range(clicks)]
+    for start in starts:
+        signal[start:start + len(click)] = click
+    recorded = sd.playrec(signal, samplerate=sample_rate, channels=1, dtype='float32', blocking=True)[:, 0]
+
+    delays = []
+    for start in starts:
+        window = recorded[start:start + int(interval * sample_rate)]
+        onset = audio_onset(window, sample_rate)
+        if onset is not None:
+            delays.append(onset / sample_rate)
+    if not delays:
+        raise RuntimeError("no clicks came back - is the output looped back into the input?")
+    round_trip = float(np.median(delays))
+    output_latency = sd.query_devices(kind='output')['default_low_output_latency']
+    return round_trip, max(0.0, round_trip - output_latency)
+
+
+def main():
+    from capture_telemetry import station_name
+
+    parser = argparse.ArgumentParser(description="Measure a station's audio and video input latency")
+    parser.add_argument("--recordings_dir", default=os.path.join(os.getcwd(), "recordings"),
+                        help="Where calibration.json is kept")
+    parser.add_argument("--station", default=None, help="Station name (WHOOP_STATION or the hostname)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    loopback = commands.add_parser("loopback", help="Measure audio latency with a loopback cable")
+    loopback.add_argument("--rate", type=int, default=44100)
+    clap = commands.add_parser("clap", help="Measure video latency from a clap recording")
+    clap.add_argument("wav_file", nargs="?", help="Recording with a clap (made with video)")
+    clap.add_argument("--record", action="store_true", help="Record a clap session first")
+    commands.add_parser("show", help="Print the station's calibration")
+    args = parser.parse_args()
+
+    station = args.station or station_name()
+    calibration = load_calibration(args.recordings_dir, station)
+
+    if args.command == "loopback":
+        round_trip, input_latency = measure_loopback(args.rate)
+        print(f"Round trip {round_trip * 1000:.1f} ms, input latency {input_latency * 1000:.1f} ms")
+        calibration = save_calibration(args.recordings_dir, station, audio_latency=round(input_latency, 4),
+                                       audio_method="loopback")
+    elif args.command == "clap":
+        wav_file = args.wav_file
+        if args.record:
+            from recorder_core import Recorder
+            recorder = Recorder(recordings_dir=args.recordings_dir)
+            recorder.start()
+            try:
+                print("Clap once, clearly in view of the camera, after the countdown")
+                wav_file = recorder.record_session("calibration")["audio"]
+            finally:
+                recorder.close()
+        if not wav_file:
+            parser.error("clap needs a recording or --record")
+        offset = clap_offset(wav_file)
+        print(f"Video is {offset * 1000:+.1f} ms off the audio")
+        calibration = save_calibration(args.recordings_dir, station,
+                                       video_latency=round(calibration["video_latency"] + offset, 4),
+                                       video_method="clap")
+
+    print(f"✅ {station}: audio latency {calibration['audio_latency'] * 1000:.1f} ms, "
+          f"video latency {calibration['video_latency'] * 1000:.1f} ms")
+    return calibration
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+Building blocks for the recorder's capture pipeline.
+
+Capturing and encoding run on separate threads so that slow encoding never
+eats into capture time:
+
+- FrameQueue: a bounded queue of timestamped video frames with a drop
+  policy for when the encoder falls behind
+- VideoEncoder: a thread that drains a FrameQueue into a cv2.VideoWriter,
+  opened at the frame rate the camera actually delivers
+- AudioRingBuffer: a lock-free single-producer/single-consumer ring buffer
+  filled from the sounddevice callback
+- WavStreamWriter: a thread that appends ring buffer blocks to a WAV file
+  as 16- or 32-bit PCM, so memory use does not depend on the recording
+  length
+- PrerollBuffer / AudioInput: an input stream kept open between
+  recordings that always holds the last second of audio
+- AudioClock: maps sample positions in a recording onto time.monotonic(),
+  the clock video frames are stamped with
+- AutoStop: a streaming energy detector that ends a capture shortly after
+  the player stops
+- AudioCapture: an input stream wired to the ring buffer and WAV writer,
+  optionally starting with an AudioInput's pre-roll
+"""
+
+import time
+import wave
+import threading
+import collections
+import numpy as np
+
+from capture_profiles import SAMPLE_FORMATS
+
+# What FrameQueue.put does when the queue is full
+DROP_OLDEST = "drop-oldest"  # discard the oldest queued frame, keep the new one
+DROP_NEWEST = "drop-newest"  # discard the new frame, keep what is queued
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class FrameQueue:
+    """
+    Bounded queue of (timestamp, frame) tuples between capture and encoding.
+
+    put() never blocks, so the capture loop always keeps pace with the
+    camera. When the queue is full a frame is dropped according to the drop
+    policy and counted in `dropped`.
+    """
+
+    def __init__(self, maxsize=60, policy=DROP_OLDEST):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+    def put(self, item):
+        """Queue an item without blocking. Returns False if a frame was dropped."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("put() on a closed FrameQueue")
+            kept = True
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                kept = False
+                if self.policy == DROP_NEWEST:
+                    return kept
+                self._items.popleft()
+            self._items.append(item)
+            self._condition.notify()
+            return kept
+
+    def get(self, timeout=None):
+        """
+        Take the oldest item, waiting for one if needed.
+
+        Returns None once the queue is closed and empty, or on timeout.
+        """
+        with self._condition:
+            while not self._items and not self._closed:
+                if not self._condition.wait(timeout):
+                    return None
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        """Signal that no more items will be put; get() drains what is left."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class VideoEncoder(threading.Thread):
+    """
+    Thread that writes frames from a FrameQueue to a video file.
+
+    The writer is created lazily by open_writer(fps) once `warmup_frames`
+    frames have arrived, with fps measured from their capture timestamps.
+    That way the file plays back at the rate the camera really delivered
+    instead of a nominal 30 fps. With frame_size=(width, height), frames of
+    another size are scaled to it on this thread.
+    """
+
+    def __init__(self, frame_queue, open_writer, nominal_fps=30, warmup_frames=10, frame_size=None):
+        super().__init__(daemon=True)
+        self.frame_queue = frame_queue
+        self.open_writer = open_writer
+        self.nominal_fps = nominal_fps
+        self.warmup_frames = warmup_frames
+        self.frame_size = frame_size
+        self.fps = None
+        self.frames_written = 0
+        self.error = None
+
+    def _measure_fps(self, timestamps):
+        if len(timestamps) >= 2 and timestamps[-1] > timestamps[0]:
+            fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+            # Guard against a camera that hands out a burst of buffered frames
+            return max(1.0, min(fps, self.nominal_fps * 2))
+        return float(self.nominal_fps)
+
+    def run(self):
+        writer = None
+        pending = []
+        try:
+            while True:
+                item = self.frame_queue.get()
+                if item is None:
+                    break
+                if writer is None:
+                    pending.append(item)
+                    if len(pending) < self.warmup_frames:
+                        continue
+                    writer = self._start_writer(pending)
+                    pending = []
+                    continue
+                writer.write(self._fit(item[1]))
+                self.frames_written += 1
+
+            # Short recording: fewer frames than the warm-up
+            if writer is None and pending:
+                writer = self._start_writer(pending)
+        except Exception as e:
+            self.error = e
+            print(f"Warning: video encoding failed: {e}")
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def _start_writer(self, pending):
+        self.fps = self._measure_fps([t for t, _ in pending])
+        writer = self.open_writer(self.fps)
+        if writer is None or not writer.isOpened():
+            raise RuntimeError("video writer could not be opened")
+        for _, frame in pending:
+            writer.write(self._fit(frame))
+            self.frames_written += 1
+        return writer
+
+    def _fit(self, frame):
+        if self.frame_size is None or (frame.shape[1], frame.shape[0]) == tuple(self.frame_size):
+            return frame
+        import cv2
+        return cv2.resize(frame, tuple(self.frame_size), interpolation=cv2.INTER_AREA)
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring buffer of audio samples between a producer and a consumer.
+
+    Made for one writer (the audio callback) and one reader (the WAV writer
+    thread). Each side only ever advances its own position counter, and the
+    writer publishes new samples by updating its counter after copying them,
+    so no lock is needed and the callback never waits on the reader. When
+    the reader falls more than `capacity` samples behind, the samples that do
+    not fit are dropped and counted in `overruns`.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self._written = 0  # total samples written, only updated by the producer
+        self._read = 0  # total samples read, only updated by the consumer
+        self.overruns = 0
+
+    def available(self):
+        """Number of samples waiting to be read."""
+        return self._written - self._read
+
+    def write(self, block):
+        """Copy a (samples, channels) block in. Returns the number of samples kept."""
+        n = min(len(block), self.capacity - (self._written - self._read))
+        if n < len(block):
+            self.overruns += len(block) - n
+        if n <= 0:
+            return 0
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = block[:first]
+        self._buffer[:n - first] = block[first:n]
+        self._written += n  # publish only after the copy is complete
+        return n
+
+    def read(self, out=None, max_samples=None):
+        """
+        Copy up to max_samples waiting samples out and release their space.
+
+        Writes into `out` when given (which must be large enough) to avoid
+        allocating, and returns the filled part.
+        """
+        n = self.available()
+        if max_samples is not None:
+            n = min(n, max_samples)
+        if out is not None:
+            n = min(n, len(out))
+        else:
+            out = np.empty((n, self.channels), dtype=self._buffer.dtype)
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        out[first:n] = self._buffer[:n - first]
+        self._read += n
+        return out[:n]
+
+
+class WavStreamWriter(threading.Thread):
+    """
+    Thread that drains an AudioRingBuffer into a 16-bit (or 32-bit) WAV file.
+
+    Each block is scaled and converted to `dtype` (a key of
+    capture_profiles.SAMPLE_FORMATS) in preallocated scratch buffers and
+    appended to the file straight away, so the WAV is complete as soon as
+    capture stops and memory use stays constant.
+    """
+
+    def __init__(self, ring, path, sample_rate, block_size=4096, poll_interval=0.02, dtype="int16"):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.path = path
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.poll_interval = poll_interval
+        self.dtype = np.dtype(dtype)
+        self.full_scale = SAMPLE_FORMATS[dtype]
+        self.frames_written = 0
+        self.error = None
+        self._stop_event = threading.Event()
+        self._float_block = np.empty((block_size, ring.channels), dtype=np.float32)
+        # float32 cannot hold 32-bit full scale exactly, so scale those in float64
+        scale_dtype = np.float32 if self.dtype.itemsize <= 2 else np.float64
+        self._scaled_block = np.empty((block_size, ring.channels), dtype=scale_dtype)
+        self._int_block = np.empty((block_size, ring.channels), dtype=self.dtype)
+
+    def run(self):
+        try:
+            with wave.open(self.path, 'wb') as wf:
+                wf.setnchannels(self.ring.channels)
+                wf.setsampwidth(self.dtype.itemsize)
+                wf.setframerate(self.sample_rate)
+                while True:
+                    stopping = self._stop_event.is_set()
+                    self._drain(wf)
+                    if stopping:
+                        break
+                    self._stop_event.wait(self.poll_interval)
+        except Exception as e:
+            self.error = e
+            print(f"Warning: writing {self.path} failed: {e}")
+
+    def _drain(self, wf):
+        while self.ring.available():
+            block = self.ring.read(self._float_block, self.block_size)
+            n = len(block)
+            # Same scaling as the original save path: float32 * 32767 -> int16
+            scaled = self._scaled_block[:n]
+            np.multiply(block, self.full_scale, out=scaled)
+            np.clip(scaled, -self.full_scale - 1, self.full_scale, out=scaled)
+            np.copyto(self._int_block[:n], scaled, casting='unsafe')
+            wf.writeframes(self._int_block[:n].tobytes())
+            self.frames_written += n
+
+    def finish(self, timeout=None):
+        """Write out everything still buffered, close the file and wait."""
+        self._stop_event.set()
+        self.join(timeout)
+
+
+class PrerollBuffer:
+    """
+    Circular buffer that always holds the most recent `capacity` samples.
+
+    Unlike AudioRingBuffer nothing ever reads from it to make room: new
+    samples simply overwrite the oldest ones. snapshot() returns what is
+    currently held, oldest sample first.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def write(self, block):
+        """Append a (samples, channels) block, overwriting the oldest samples."""
+        if self.capacity == 0:
+            return
+        block = block[-self.capacity:]
+        n = len(block)
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = block[:first]
+        self._buffer[:n - first] = block[first:]
+        self._written += len(block)
+
+    def snapshot(self):
+        """Copy of the held samples, oldest first."""
+        n = len(self)
+        start = (self._written - n) % self.capacity if self.capacity else 0
+        return np.concatenate([self._buffer[start:start + n], self._buffer[:max(0, start + n - self.capacity)]])
+
+
+class AudioClock:
+    """
+    Where the samples of a recording are on the time.monotonic() clock.
+
+    Every block handed to the audio callback is stamped with its arrival
+    time. A block cannot arrive before its last sample was recorded, and
+    scheduling only ever delays it, so the earliest arrival relative to the
+    sample count is the best estimate of when sample 0 became available.
+    The driver's input latency (see av_sync.py) comes on top of that.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.anchor = None  # time.monotonic() at which sample 0 became available
+        self.blocks = 0
+
+    def block(self, first_sample, frames, arrival):
+        """Stamp a block of `frames` samples starting at first_sample."""
+        anchor = arrival - (first_sample + frames) / self.sample_rate
+        if self.anchor is None or anchor < self.anchor:
+            self.anchor = anchor
+        self.blocks += 1
+
+    def time_of(self, sample):
+        """time.monotonic() at which a sample became available, or None before any block."""
+        if self.anchor is None:
+            return None
+        return self.anchor + sample / self.sample_rate
+
+    def sample_at(self, timestamp):
+        """Sample position that became available at a time.monotonic() timestamp."""
+        if self.anchor is None:
+            return None
+        return int(round((timestamp - self.anchor) * self.sample_rate))
+
+
+def open_input_stream(input_stream, sample_rate, channels, callback, device=None):
+    """
+    Open and start an input stream of class input_stream
+    (sounddevice.InputStream if None) on `device`, the default input if None.
+    """
+    if input_stream is None:
+        import sounddevice as sd
+        input_stream = sd.InputStream
+    options = {} if device is None else {"device": device}
+    stream = input_stream(samplerate=sample_rate, channels=channels, dtype='float32',
+                          callback=callback, **options)
+    stream.start()
+    return stream
+
+
+class AudioInput:
+    """
+    Input stream that stays open between recordings.
+
+    Opening a stream takes a few hundred milliseconds and players often start
+    whooping before "go", so the recorder opens the microphone once and keeps
+    the last `preroll_seconds` of audio in a PrerollBuffer at all times. An
+    AudioCapture attached with attach() starts with that pre-roll and then
+    receives every new block, with no stream start-up in between.
+
+    device selects the input device (an index or name, as sounddevice
+    takes them); None is the system default.
+    """
+
+    def __init__(self, sample_rate, channels=1, preroll_seconds=1.0, input_stream=None, device=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.preroll = PrerollBuffer(int(preroll_seconds * sample_rate), channels)
+        self.samples_seen = 0  # samples delivered by the stream since start()
+        self.input_overflows = 0
+        self._input_stream = input_stream
+        self._stream = None
+        self._capture = None
+        # Held only for a block copy, so attaching never splits or repeats a block
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._stream is not None
+
+    @property
+    def capturing(self):
+        """True while an AudioCapture is attached."""
+        return self._capture is not None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status and status.input_overflow:
+            self.input_overflows += 1
+        with self._lock:
+            if self._capture is not None:
+                self._capture.feed(indata)
+            self.preroll.write(indata)
+            self.samples_seen += len(indata)
+
+    def start(self):
+        """Open the input stream."""
+        self._stream = open_input_stream(self._input_stream, self.sample_rate, self.channels,
+                                         self._callback, self.device)
+
+    def attach(self, capture):
+        """
+        Start feeding a capture: the pre-roll first, then every new block.
+
+        Sets capture.trigger_sample to the position in the capture's file
+        where recording was triggered, i.e. the length of the pre-roll.
+        """
+        with self._lock:
+            preroll = self.preroll.snapshot()
+            capture.prepend(preroll)
+            capture.trigger_stream_sample = self.samples_seen
+            capture.trigger_time = time.monotonic()
+            self._capture = capture
+
+    def detach(self, capture):
+        """Stop feeding a capture attached with attach()."""
+        with self._lock:
+            if self._capture is capture:
+                self._capture = None
+
+    def close(self):
+        """Close the input stream."""
+        with self._lock:
+            self._capture = None
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class AutoStop:
+    """
+    Streaming energy detector that decides when a take is over.
+
+    Each block's RMS is compared with a noise floor estimated from the
+    pre-roll (calibrate), or assumed quiet without one, and then tracked as
+    a running minimum that rises slowly, so louder background noise cannot
+    hold a take open for long. A block more than threshold_db above the
+    floor (and above floor_dbfs) counts as voice. Once voice has
+    been heard, the capture stops after `hangover` seconds without it, but
+    never before `min_duration` seconds; the capture's own duration is the
+    upper bound.
+    """
+
+    def __init__(self, sample_rate, min_duration=1.5, hangover=0.6, threshold_db=12.0,
+                 floor_dbfs=-50.0, floor_rise_db_per_second=3.0):
+        self.sample_rate = sample_rate
+        self.min_samples = int(min_duration * sample_rate)
+        self.hangover_samples = int(hangover * sample_rate)
+        self.ratio = 10 ** (threshold_db / 20)
+        self.min_threshold = 10 ** (floor_dbfs / 20)  # quieter than this is never voice
+        self.rise_per_sample = 10 ** (floor_rise_db_per_second / 20 / sample_rate)
+        self.noise = None
+        self.heard = False
+        self.samples = 0
+        self.last_voice = 0  # sample count at the end of the last voiced block
+
+    @staticmethod
+    def _rms(block):
+        return float(np.sqrt(np.mean(np.square(block, dtype=np.float64)))) if len(block) else 0.0
+
+    def calibrate(self, preroll, frame_seconds=0.02):
+        """Take the noise floor from the pre-roll: its quietest 20 ms frames."""
+        frame = max(1, int(frame_seconds * self.sample_rate))
+        frames = len(preroll) // frame
+        if frames == 0:
+            return
+        levels = np.sqrt(np.mean(np.square(preroll[:frames * frame].reshape(frames, -1), dtype=np.float64), axis=1))
+        self.noise = float(np.percentile(levels, 20))
+
+    def update(self, block):
+        """Feed a live block. Returns True once the take should stop."""
+        level = self._rms(block)
+        self.samples += len(block)
+        if self.noise is None:
+            self.noise = self.min_threshold / self.ratio
+        if level > max(self.noise * self.ratio, self.min_threshold):
+            self.heard = True
+            self.last_voice = self.samples
+        self.noise = max(min(level, self.noise * self.rise_per_sample ** len(block)), 1e-9)
+        return (self.heard and self.samples >= self.min_samples
+                and self.samples - self.last_voice >= self.hangover_samples)
+
+
+class AudioCapture:
+    """
+    Fixed-length audio recording streamed from an input stream to a WAV file.
+
+    The stream callback only copies blocks into an AudioRingBuffer; a
+    WavStreamWriter thread appends them to `path`. With an AudioInput the
+    capture uses its always-open stream and starts with its pre-roll, so the
+    file holds the pre-roll followed by `duration` seconds and
+    `trigger_sample` marks where recording was triggered. Otherwise it opens
+    its own stream of class input_stream (sounddevice.InputStream by default)
+    on `device` and trigger_sample is 0. dtype is the WAV sample format.
+
+    Live blocks are stamped on an AudioClock (`clock`), and `trigger_time`
+    is the time.monotonic() of the trigger, so the file can be lined up
+    with video frames stamped on the same clock.
+
+    With an AutoStop (auto_stop=) `duration` is the longest a take can be,
+    and the capture finishes as soon as the detector says the player has
+    stopped; stop_reason is then "silence" rather than "duration".
+    """
+
+    def __init__(self, path, sample_rate, duration, channels=1, ring_seconds=2.0,
+                 input_stream=None, audio_input=None, dtype="int16", auto_stop=None, device=None):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.target_samples = int(duration * sample_rate)
+        self.samples_captured = 0
+        self.trigger_sample = 0  # samples of pre-roll before the trigger
+        self.trigger_stream_sample = None  # stream position of the trigger (AudioInput only)
+        self.trigger_time = None  # time.monotonic() of the trigger
+        self.clock = AudioClock(sample_rate)
+        self.auto_stop = auto_stop
+        self.stop_reason = None  # "duration", "silence" or "stopped"
+        self.started_at = None  # time.monotonic() of start()
+        self.first_block_at = None  # time.monotonic() of the first live block
+        self._own_overflows = 0
+        self.audio_input = audio_input
+        if audio_input is not None:
+            ring_seconds += len(audio_input.preroll) / sample_rate
+            self._overflows_at_start = audio_input.input_overflows
+        self.ring = AudioRingBuffer(int(ring_seconds * sample_rate), channels)
+        self.writer = WavStreamWriter(self.ring, path, sample_rate, dtype=dtype)
+        self._input_stream = input_stream
+        self.device = device
+        self._stream = None
+        self._done = threading.Event()
+
+    @property
+    def input_overflows(self):
+        """Overflows reported by the audio driver during this capture."""
+        if self.audio_input is not None:
+            return self.audio_input.input_overflows - self._overflows_at_start
+        return self._own_overflows
+
+    def prepend(self, block):
+        """Queue audio from before the trigger (the pre-roll). Call before start feeding."""
+        self.ring.write(block)
+        self.trigger_sample = len(block)
+        if self.auto_stop is not None:
+            self.auto_stop.calibrate(block)
+
+    def feed(self, block):
+        """Queue a block of live audio, up to `duration` seconds in total."""
+        if self._done.is_set():
+            return
+        arrival = time.monotonic()
+        if self.first_block_at is None:
+            self.first_block_at = arrival
+        # Stamp the whole block, before any of it is cut off at the end
+        self.clock.block(self.trigger_sample + self.samples_captured, len(block), arrival)
+        block = block[:self.target_samples - self.samples_captured]
+        self.ring.write(block)
+        self.samples_captured += len(block)
+        if self.samples_captured >= self.target_samples:
+            self.stop_reason = "duration"
+            self._done.set()
+        elif self.auto_stop is not None and self.auto_stop.update(block):
+            self.stop_reason = "silence"
+            self._done.set()
+
+    def _callback(self, indata, frames, time_info, status):
+        if status and status.input_overflow:
+            self._own_overflows += 1
+        self.feed(indata)
+
+    def start(self):
+        """Start capturing and writing."""
+        self.started_at = time.monotonic()
+        self.trigger_time = self.started_at  # moved to the attach time with an AudioInput
+        self.writer.start()
+        if self.audio_input is not None:
+            self.audio_input.attach(self)
+            return
+        self._stream = open_input_stream(self._input_stream, self.sample_rate, self.channels,
+                                         self._callback, self.device)
+
+    @property
+    def progress(self):
+        """Fraction of `duration` captured so far."""
+        return self.samples_captured / self.target_samples if self.target_samples else 1.0
+
+    def finished(self, timeout=0):
+        """True once `duration` seconds are captured; waits up to timeout seconds."""
+        return self._done.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Wait until `duration` seconds are captured, then finish the file."""
+        finished = self._done.wait(timeout)
+        self.stop()
+        return finished
+
+    def stop(self):
+        """Stop capturing early (or after wait) and finish the WAV file."""
+        if self.stop_reason is None:
+            self.stop_reason = "stopped"
+        self._done.set()
+        if self.audio_input is not None:
+            self.audio_input.detach(self)
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self.writer.finish()
+        if self.writer.error:
+            raise self.writer.error
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Named capture profiles: what the recorder captures and stores for a take.
+
+A profile fixes the audio sample rate, the sample format of the WAV file,
+the take duration and the video resolution, frame rate and capture codec. The recorder
+opens the microphone and camera with it, the WAV writer stores it, and the
+scorer works at the take's own rate, so a low-rate profile is cheaper at
+every step:
+
+- standard: 44.1 kHz 16-bit audio and 640x480 at 30 fps, as before
+- scoring-8k: 8 kHz 16-bit audio and 320x240 at 15 fps. Scoring only looks
+  at 10-600 Hz, which 8 kHz keeps with plenty of margin, for 5.5 times less
+  audio to capture, store and score
+- archival-48k: 48 kHz 32-bit audio and 1280x720 at 30 fps, for keeping
+  takes at full quality
+- booth: scoring-8k with auto-stop, for queues of players
+
+audio_storage "flac" compresses each take to lossless FLAC once it is
+saved (16-bit profiles only; see audio_storage.py).
+
+With auto_stop the duration is the longest a take can be: a streaming
+energy detector (capture_pipeline.AutoStop) ends the take `hangover`
+seconds after the player stops, but not before `min_duration` seconds.
+
+Usage:
+    python3 kiosk.py Alice Bob --profile scoring-8k
+    python3 kiosk.py Alice Bob --auto-stop --min-duration 1 --hangover 0.5
+    python3 kiosk.py Alice Bob --audio-storage flac
+    WHOOP_CAPTURE_PROFILE=scoring-8k python3 audio_recorder.py
+    python3 capture_profiles.py   # list the profiles
+"""
+
+from dataclasses import dataclass, replace
+
+from audio_storage import STORAGE_FORMATS, FLAC_SUBTYPES
+
+# WAV sample formats: numpy dtype name -> full scale of a float sample of 1.0
+SAMPLE_FORMATS = {
+    "int16": 32767,
+    "int32": 2147483647,
+}
+
+
+@dataclass(frozen=True)
+class CaptureProfile:
+    """Audio and video settings for one take."""
+    name: str
+    description: str = ""
+    sample_rate: int = 44100  # Hz
+    dtype: str = "int16"  # WAV sample format, a key of SAMPLE_FORMATS
+    duration: float = 5.0  # seconds after the trigger (the longest take with auto_stop)
+    auto_stop: bool = False  # end the take once the player stops
+    min_duration: float = 1.5  # seconds, the shortest take with auto_stop
+    hangover: float = 0.6  # seconds of quiet after the player that end the take
+    video_width: int = 640
+    video_height: int = 480
+    video_fps: float = 30.0
+    # fourcc written while capturing and transcoded to the archival codec in
+    # the background afterwards (see video_transcode.py); "" writes the
+    # archival codec directly
+    video_intermediate: str = "MJPG"
+    audio_storage: str = "wav"  # how a saved take is kept, a key of STORAGE_FORMATS
+
+
+PROFILES = {
+    profile.name: profile for profile in (
+        CaptureProfile("standard", "44.1 kHz 16-bit, 640x480 at 30 fps"),
+        CaptureProfile("scoring-8k", "8 kHz 16-bit matched to the 10-600 Hz scoring band, 320x240 at 15 fps",
+                       sample_rate=8000, video_width=320, video_height=240, video_fps=15.0),
+        CaptureProfile("archival-48k", "48 kHz 32-bit, 1280x720 at 30 fps",
+                       sample_rate=48000, dtype="int32", video_width=1280, video_height=720),
+        CaptureProfile("booth", "scoring-8k that stops 0.6 s after the player, within 1.5-5 s",
+                       sample_rate=8000, video_width=320, video_height=240, video_fps=15.0, auto_stop=True),
+    )
+}
+DEFAULT_PROFILE = "standard"
+
+
+def get_profile(profile=None, **overrides):
+    """
+    Look up a profile by name (or pass a CaptureProfile through), with any
+    non-None keyword arguments overriding its fields.
+    """
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown capture profile {profile!r}, expected one of {', '.join(PROFILES)}")
+        profile = PROFILES[profile]
+    overrides = {field: value for field, value in overrides.items() if value is not None}
+    if overrides:
+        profile = replace(profile, **overrides)
+    if profile.auto_stop and not 0 < profile.min_duration <= profile.duration:
+        raise ValueError(f"min_duration {profile.min_duration:g} s must be between 0 and the duration "
+                         f"{profile.duration:g} s")
+    if profile.dtype not in SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported sample format {profile.dtype!r}, expected one of {', '.join(SAMPLE_FORMATS)}")
+    if profile.audio_storage not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown audio storage {profile.audio_storage!r}, expected one of {', '.join(STORAGE_FORMATS)}")
+    if profile.audio_storage == "flac" and profile.dtype not in FLAC_SUBTYPES:
+        raise ValueError(f"FLAC cannot store {profile.dtype} samples losslessly, keep {profile.name!r} as WAV")
+    return profile
+
+
+def main():
+    for profile in PROFILES.values():
+        default = " (default)" if profile.name == DEFAULT_PROFILE else ""
+        print(f"{profile.name:14} {profile.description}{default}")
+
+
+if __name__ == "__main__":
+    main()
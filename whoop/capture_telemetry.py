@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Capture-quality telemetry: how well a station's camera and microphone kept up.
+
+For every session the recorder measures
+
+- video: frames read from the camera, skipped (above the capture profile's
+  frame rate), dropped (encoder queue full) and written, read failures, the
+  effective frame rate and a histogram of the intervals between frames
+- audio: driver overflows (xruns) and ring buffer overruns
+- latency: time from the start of the capture to the first camera frame and
+  to the first live audio block
+
+and stores it under "telemetry" in the recording's JSON sidecar (see
+recording_metadata.py). Run this module on a recordings directory to
+aggregate the sidecars per station and flag the ones that fall short.
+
+Usage:
+    python3 capture_telemetry.py recordings/
+    python3 capture_telemetry.py recordings/ --min-fps-ratio 0.9 --json report.json
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import numpy as np
+
+from recording_metadata import read_sidecar
+from audio_storage import is_audio_file
+
+# Upper edges (ms) of the inter-frame interval histogram; the last bin is open
+INTERVAL_BINS_MS = (20, 40, 60, 80, 100, 150, 250)
+
+
+def interval_histogram(intervals_ms):
+    """Count intervals per bin, as {"<20": n, "20-40": n, ..., ">=250": n}."""
+    edges = (0,) + INTERVAL_BINS_MS
+    labels = [f"<{INTERVAL_BINS_MS[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(edges[1:-1], edges[2:])]
+    labels.append(f">={INTERVAL_BINS_MS[-1]}")
+    counts = np.bincount(np.searchsorted(INTERVAL_BINS_MS, intervals_ms, side="right"),
+                         minlength=len(labels))
+    return dict(zip(labels, (int(c) for c in counts)))
+
+
+class VideoTelemetry:
+    """
+    Counts and timestamps of the frames read during one capture.
+
+    Call read() for every frame the camera delivered (kept or not) and
+    read_failed() for failed reads, then summary() once the encoder is done.
+    """
+
+    def __init__(self, nominal_fps, target_fps=None, started=None):
+        self.nominal_fps = nominal_fps  # what the camera claims
+        self.target_fps = target_fps or nominal_fps  # what the capture profile allows
+        self.started = time.monotonic() if started is None else started
+        self.frames_kept = 0
+        self.read_failures = 0
+        self._read_times = []
+
+    def read(self, timestamp, kept=True):
+        self._read_times.append(timestamp)
+        if kept:
+            self.frames_kept += 1
+
+    def read_failed(self):
+        self.read_failures += 1
+
+    def summary(self, frames_dropped=0, frames_written=0, encoder_fps=None):
+        times = np.asarray(self._read_times)
+        intervals_ms = np.diff(times) * 1000.0
+        effective_fps = None
+        if len(times) >= 2 and times[-1] > times[0]:
+            effective_fps = float((len(times) - 1) / (times[-1] - times[0]))
+        summary = {
+            "nominal_fps": round(float(self.nominal_fps), 2),
+            "target_fps": round(float(self.target_fps), 2),
+            "effective_fps": round(effective_fps, 2) if effective_fps else None,
+            "encoder_fps": round(encoder_fps, 2) if encoder_fps else None,
+            "frames_read": len(times),
+            "frames_skipped": len(times) - self.frames_kept,
+            "frames_dropped": frames_dropped,
+            "frames_written": frames_written,
+            "read_failures": self.read_failures,
+            "first_frame_ms": round(float(times[0] - self.started) * 1000.0, 1) if len(times) else None,
+        }
+        if len(intervals_ms):
+            summary["interval_ms"] = {
+                "mean": round(float(intervals_ms.mean()), 2),
+                "p50": round(float(np.percentile(intervals_ms, 50)), 2),
+                "p95": round(float(np.percentile(intervals_ms, 95)), 2),
+                "max": round(float(intervals_ms.max()), 2),
+                "jitter": round(float(intervals_ms.std()), 2),
+            }
+            summary["interval_histogram_ms"] = interval_histogram(intervals_ms)
+        return summary
+
+
+def audio_telemetry(audio_capture):
+    """Overflows, overruns and start-up latency of a finished AudioCapture."""
+    first_block = None
+    if audio_capture.first_block_at is not None and audio_capture.started_at is not None:
+        first_block = round((audio_capture.first_block_at - audio_capture.started_at) * 1000.0, 1)
+    return {
+        "sample_rate": audio_capture.sample_rate,
+        "samples_captured": audio_capture.samples_captured,
+        "preroll_samples": audio_capture.trigger_sample,
+        "take_seconds": round(audio_capture.samples_captured / audio_capture.sample_rate, 3),
+        "stop_reason": audio_capture.stop_reason,
+        "xruns": audio_capture.input_overflows,
+        "ring_overruns": audio_capture.ring.overruns,
+        "first_sample_ms": first_block,
+    }
+
+
+def station_name():
+    """Which machine recorded a session, for grouping telemetry."""
+    return os.environ.get("WHOOP_STATION") or socket.gethostname()
+
+
+# ---- Aggregation ----
+
+def load_telemetry(recordings_dir):
+    """Telemetry of every recording in a directory, oldest first."""
+    records = []
+    for filename in sorted(os.listdir(recordings_dir)):
+        if not is_audio_file(filename):
+            continue
+        telemetry = read_sidecar(os.path.join(recordings_dir, filename)).get("telemetry")
+        if telemetry:
+            records.append(dict(telemetry, recording=filename))
+    return records
+
+
+def problems(telemetry, min_fps_ratio=0.8, max_drop_ratio=0.05):
+    """Reasons a session's capture fell short, empty if it was fine."""
+    found = []
+    audio = telemetry.get("audio") or {}
+    if audio.get("xruns"):
+        found.append(f"{audio['xruns']} audio xrun(s)")
+    if audio.get("ring_overruns"):
+        found.append(f"{audio['ring_overruns']} audio samples lost")
+    video = telemetry.get("video")
+    if video:
+        fps = video.get("effective_fps") or 0.0
+        if fps < min_fps_ratio * video["target_fps"]:
+            found.append(f"{fps:.1f} fps instead of {video['target_fps']:g}")
+        lost = video["frames_dropped"] + video["read_failures"]
+        if video["frames_read"] and lost / video["frames_read"] > max_drop_ratio:
+            found.append(f"{lost} of {video['frames_read']} frames lost")
+    return found
+
+
+def summarize(records, min_fps_ratio=0.8, max_drop_ratio=0.05):
+    """Per-station aggregates of session telemetry, worst station first."""
+    stations = {}
+    for record in records:
+        station = stations.setdefault(record.get("station", "unknown"), {
+            "sessions": 0, "flagged_sessions": 0, "xruns": 0,
+            "frames_read": 0, "frames_lost": 0, "_fps": [], "_first_frame": [], "_first_sample": []})
+        station["sessions"] += 1
+        if problems(record, min_fps_ratio, max_drop_ratio):
+            station["flagged_sessions"] += 1
+        audio = record.get("audio") or {}
+        station["xruns"] += audio.get("xruns") or 0
+        if audio.get("first_sample_ms") is not None:
+            station["_first_sample"].append(audio["first_sample_ms"])
+        video = record.get("video")
+        if video:
+            station["frames_read"] += video["frames_read"]
+            station["frames_lost"] += video["frames_dropped"] + video["read_failures"]
+            if video.get("effective_fps"):
+                station["_fps"].append(video["effective_fps"])
+            if video.get("first_frame_ms") is not None:
+                station["_first_frame"].append(video["first_frame_ms"])
+
+    summary = {}
+    for name, station in stations.items():
+        fps, first_frame, first_sample = station.pop("_fps"), station.pop("_first_frame"), station.pop("_first_sample")
+        station["mean_fps"] = round(float(np.mean(fps)), 1) if fps else None
+        station["worst_fps"] = round(float(np.min(fps)), 1) if fps else None
+        station["mean_first_frame_ms"] = round(float(np.mean(first_frame)), 1) if first_frame else None
+        station["mean_first_sample_ms"] = round(float(np.mean(first_sample)), 1) if first_sample else None
+        summary[name] = station
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["flagged_sessions"] / item[1]["sessions"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate capture telemetry from recording sidecars")
+    parser.add_argument("recordings_dir", nargs="?", default="recordings", help="Directory of recordings")
+    parser.add_argument("--min-fps-ratio", type=float, default=0.8,
+                        help="Flag sessions below this fraction of the target frame rate")
+    parser.add_argument("--max-drop-ratio", type=float, default=0.05,
+                        help="Flag sessions losing more than this fraction of frames")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    records = load_telemetry(args.recordings_dir)
+    if not records:
+        print(f"⚠️  No recordings with telemetry in {args.recordings_dir}")
+        return {}
+
+    print(f"{'station':20} {'sessions':>8} {'flagged':>7} {'mean fps':>8} {'worst':>6} "
+          f"{'xruns':>5} {'lost':>6} {'1st frame':>9} {'1st audio':>9}")
+    stations = summarize(records, args.min_fps_ratio, args.max_drop_ratio)
+    for name, s in stations.items():
+        fmt = lambda value, unit="": "-" if value is None else f"{value:g}{unit}"
+        print(f"{name[:20]:20} {s['sessions']:>8} {s['flagged_sessions']:>7} {fmt(s['mean_fps']):>8} "
+              f"{fmt(s['worst_fps']):>6} {s['xruns']:>5} {s['frames_lost']:>6} "
+              f"{fmt(s['mean_first_frame_ms'], ' ms'):>9} {fmt(s['mean_first_sample_ms'], ' ms'):>9}")
+
+    flagged = []
+    for record in records:
+        found = problems(record, args.min_fps_ratio, args.max_drop_ratio)
+        if found:
+            flagged.append({"recording": record["recording"], "station": record.get("station"), "problems": found})
+            print(f"⚠️  {record['recording']} ({record.get('station')}): {', '.join(found)}")
+    if not flagged:
+        print("✅ No capture problems found")
+
+    report = {"stations": stations, "flagged": flagged}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Camera and microphone kept open and warm between players.
+
+Opening a webcam takes 0.5-2 s and sometimes fails when it is reopened in
+quick succession, and opening an audio stream clips the start of a take. The
+DeviceManager opens both once when the recorder starts:
+
+- WarmCamera keeps the camera open and grabs (and discards) frames while no
+  session is using it, so the first frame of a session is fresh. A session
+  borrows it with acquire() and gives it back with release().
+- The microphone is an AudioInput (see capture_pipeline.py), which fills its
+  pre-roll while idle.
+
+A background thread reopens either device when it stops delivering, so
+unplugging and replugging a camera or microphone needs no restart. The
+microphone is never reopened under a take that is being recorded; that
+waits until the take has detached.
+"""
+
+import time
+import threading
+
+from capture_pipeline import AudioInput
+
+
+class WarmCamera:
+    """
+    A camera that stays open between sessions.
+
+    open_camera(index) must return an opened cv2.VideoCapture-like object
+    (or one whose isOpened() is False if the camera is missing).
+    """
+
+    def __init__(self, open_camera, index=0, grab_interval=0.01, max_grab_failures=5):
+        self.open_camera = open_camera
+        self.index = index
+        self.grab_interval = grab_interval
+        self.max_grab_failures = max_grab_failures
+        self.reconnects = 0
+        self._capture = None
+        self._in_use = False
+        self._grab_failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """True if the camera is open."""
+        capture = self._capture
+        return capture is not None and capture.isOpened()
+
+    def open(self):
+        """(Re)open the camera. Returns True if it is open afterwards."""
+        with self._lock:
+            if self._in_use:
+                return self.available
+            self._close_capture()
+            try:
+                self._capture = self.open_camera(self.index)
+            except Exception as e:
+                print(f"Warning: could not open camera {self.index}: {e}")
+                self._capture = None
+            self._grab_failures = 0
+            return self.available
+
+    def _close_capture(self):
+        if self._capture is not None:
+            try:
+                self._capture.release()
+            except Exception:
+                pass
+            self._capture = None
+
+    def keep_warm(self):
+        """
+        Grab one frame if the camera is idle; called in a loop by DeviceManager.
+
+        Returns False when the camera has stopped delivering and needs to be
+        reopened.
+        """
+        with self._lock:
+            if self._in_use:
+                return True
+            if not self.available:
+                return False
+            if self._capture.grab():
+                self._grab_failures = 0
+            else:
+                self._grab_failures += 1
+            return self._grab_failures < self.max_grab_failures
+
+    def acquire(self):
+        """Borrow the open camera for a session, or None if it is not available."""
+        with self._lock:
+            if self._in_use or not self.available:
+                return None
+            self._in_use = True
+            return self._capture
+
+    def release(self):
+        """Give the camera back after a session; it is kept open."""
+        with self._lock:
+            self._in_use = False
+
+    def close(self):
+        with self._lock:
+            self._in_use = False
+            self._close_capture()
+
+
+class DeviceManager:
+    """
+    Owns the recorder's microphone (AudioInput) and camera (WarmCamera).
+
+    start() opens both at the same time, optionally in the background, and
+    sets `ready` once both have been tried; a watchdog thread then keeps the
+    camera warm and reopens a device that has disappeared, at most once per
+    reconnect_interval seconds. The microphone counts as gone when no audio
+    has arrived for stall_seconds. audio_device and camera_index pick the
+    devices, for hosts with several stations (see stations.py).
+    """
+
+    def __init__(self, sample_rate, channels=1, preroll_seconds=1.0, input_stream=None,
+                 open_camera=None, camera_index=0, reconnect_interval=2.0, stall_seconds=2.0,
+                 audio_device=None):
+        self.sample_rate = sample_rate
+        self.audio_device = audio_device
+        self.channels = channels
+        self.preroll_seconds = preroll_seconds
+        self.input_stream = input_stream
+        self.reconnect_interval = reconnect_interval
+        self.stall_seconds = stall_seconds
+        self.camera = WarmCamera(open_camera, camera_index) if open_camera is not None else None
+        self.audio_input = None
+        self.audio_reconnects = 0
+        self.ready = threading.Event()
+        self._closed = threading.Event()
+        self._watchdog = None
+        self._last_samples = 0
+        self._last_audio_progress = time.monotonic()
+
+    def start(self, wait=True):
+        """
+        Open the devices concurrently and start the watchdog thread.
+
+        With wait=False this returns at once and the devices are opened in
+        the background; wait for `ready` before using them.
+        """
+        if wait:
+            self._open_all()
+        else:
+            threading.Thread(target=self._open_all, daemon=True).start()
+
+    def _open_all(self):
+        # A camera can take seconds to open, so it does not wait for the microphone
+        openers = [threading.Thread(target=self.open_audio, daemon=True)]
+        if self.camera is not None:
+            openers.append(threading.Thread(target=self.camera.open, daemon=True))
+        for opener in openers:
+            opener.start()
+        for opener in openers:
+            opener.join()
+        if self._closed.is_set():  # closed while opening
+            self._close_devices()
+        else:
+            self._watchdog = threading.Thread(target=self._watch, daemon=True)
+            self._watchdog.start()
+        self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        """Wait until start() has tried both devices. Returns False on timeout."""
+        return self.ready.wait(timeout)
+
+    def open_audio(self):
+        """
+        (Re)open the microphone stream. Returns True if it is open afterwards.
+
+        A stream a take is being recorded from is left alone.
+        """
+        if self.audio_input is not None and self.audio_input.capturing:
+            return self.audio_input.active
+        self.close_audio()
+        try:
+            audio_input = AudioInput(self.sample_rate, self.channels, self.preroll_seconds,
+                                     input_stream=self.input_stream, device=self.audio_device)
+            audio_input.start()
+        except Exception as e:
+            print(f"Warning: could not open the microphone: {e}")
+            return False
+        self.audio_input = audio_input
+        self._last_samples = 0
+        self._last_audio_progress = time.monotonic()
+        return True
+
+    def close_audio(self):
+        if self.audio_input is not None:
+            audio_input, self.audio_input = self.audio_input, None
+            try:
+                audio_input.close()
+            except Exception as e:
+                print(f"Warning: closing the microphone failed: {e}")
+
+    def audio_stalled(self):
+        """True if the microphone stream is missing or has stopped delivering audio."""
+        if self.audio_input is None:
+            return True
+        now = time.monotonic()
+        if self.audio_input.samples_seen != self._last_samples:
+            self._last_samples = self.audio_input.samples_seen
+            self._last_audio_progress = now
+        return now - self._last_audio_progress > self.stall_seconds
+
+    def _watch(self):
+        next_audio_check = next_camera_retry = time.monotonic()
+        while not self._closed.is_set():
+            now = time.monotonic()
+            if now >= next_audio_check:
+                next_audio_check = now + 0.5
+                # A stream a take is recorded from is reopened after the take, if still stalled
+                capturing = self.audio_input is not None and self.audio_input.capturing
+                if not capturing and self.audio_stalled() and now - self._last_audio_progress >= self.reconnect_interval:
+                    print("Microphone stopped delivering audio, reopening it...")
+                    if self.open_audio():
+                        self.audio_reconnects += 1
+                    else:
+                        self._last_audio_progress = now  # retry after reconnect_interval
+
+            if self.camera is not None:
+                if not self.camera.keep_warm() and now >= next_camera_retry:
+                    print("Camera stopped delivering frames, reopening it...")
+                    next_camera_retry = now + self.reconnect_interval
+                    if self.camera.open():
+                        self.camera.reconnects += 1
+                        print("✅ Camera reconnected")
+                self._closed.wait(self.camera.grab_interval)
+            else:
+                self._closed.wait(0.1)
+
+    def acquire_camera(self):
+        """Borrow the warm camera for a session (None if there is no working camera)."""
+        return self.camera.acquire() if self.camera is not None else None
+
+    def release_camera(self):
+        if self.camera is not None:
+            self.camera.release()
+
+    def close(self):
+        """Stop the watchdog and close both devices."""
+        self._closed.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=2)
+        self._close_devices()
+
+    def _close_devices(self):
+        if self.camera is not None:
+            self.camera.close()
+        self.close_audio()
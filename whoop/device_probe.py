@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Device and codec probes, run concurrently and cached on disk.
+
+Importing sounddevice, listing audio devices and finding a VideoWriter
+codec that works each take from a fraction of a second to several seconds,
+and their answers rarely change. ProbeCache keeps the results in
+<recordings>/device_probe.json for `ttl` seconds, so later starts skip the
+slow probes; probe_all runs whatever is not cached in parallel.
+
+Usage:
+    python3 device_probe.py            # show what is cached
+    python3 device_probe.py --refresh  # probe again now
+"""
+
+import os
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_CACHE_FILE = "device_probe.json"
+DEFAULT_TTL = 24 * 3600  # seconds
+
+
+class ProbeCache:
+    """Probe results in a JSON file, each valid for `ttl` seconds."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def fresh(self, key):
+        """True if a result for key was stored less than ttl seconds ago."""
+        entry = self._load().get(key)
+        return entry is not None and time.time() - entry["probed_at"] < self.ttl
+
+    def get(self, key, default=None):
+        """The stored result for key if it is fresh, else default."""
+        entry = self._load().get(key)
+        if entry is None or time.time() - entry["probed_at"] >= self.ttl:
+            return default
+        return entry["value"]
+
+    def _save(self, entries):
+        # A temporary file of its own, as several recorders (stations) may
+        # write the same cache at once
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def set(self, key, value):
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"value": value, "probed_at": time.time()}
+            self._save(entries)
+
+    def invalidate(self, key):
+        with self._lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
+    def cached(self, key, probe, refresh=False):
+        """Result of probe() from the cache, running it only if missing, stale or refresh."""
+        if not refresh and self.fresh(key):
+            return self.get(key)
+        value = probe()
+        self.set(key, value)
+        return value
+
+
+def probe_all(cache, probes, refresh=False):
+    """
+    Run named probes concurrently through the cache.
+
+    probes maps a cache key to a function; returns {key: result}, with None
+    for probes that raised.
+    """
+    if not probes:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {key: pool.submit(cache.cached, key, probe, refresh) for key, probe in probes.items()}
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"Warning: probing {key} failed: {e}")
+            results[key] = None
+    return results
+
+
+def probe_audio_inputs():
+    """Names of the audio input devices."""
+    import sounddevice as sd
+    return [d['name'] for d in sd.query_devices() if d['max_input_channels'] > 0]
+
+
+def video_codec_candidates():
+    """VideoWriter fourccs to try for MP4 files on this platform, best first."""
+    if platform.system() == "Windows":
+        # Try different codecs for better Windows compatibility
+        return ['mp4v', 'XVID', 'MJPG', 'WMV2']
+    return ['mp4v']
+
+
+def probe_video_codec(candidates=None, fps=30, size=(640, 480)):
+    """First fourcc a cv2.VideoWriter can open an MP4 file with, or None."""
+    import cv2
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "probe.mp4")
+        for codec_name in candidates or video_codec_candidates():
+            try:
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec_name), fps, size)
+                opened = writer.isOpened()
+                writer.release()
+                if opened:
+                    return codec_name
+            except Exception:
+                continue
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or refresh the cached device probes")
+    parser.add_argument("--recordings_dir", default=os.path.join(os.getcwd(), "recordings"))
+    parser.add_argument("--refresh", action="store_true", help="Probe again, ignoring the cache")
+    args = parser.parse_args()
+
+    cache = ProbeCache(os.path.join(args.recordings_dir, PROBE_CACHE_FILE))
+    started = time.monotonic()
+    results = probe_all(cache, {"audio_inputs": probe_audio_inputs, "video_codec": probe_video_codec},
+                        refresh=args.refresh)
+    for key, value in results.items():
+        print(f"{key}: {value}")
+    print(f"✅ Probed in {time.monotonic() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Exclusive lock shared by every process and thread using a recordings directory.
+
+The recorder, per-booth kiosks, the ingest service and
+submit_all_recordings.py all update the fingerprint and similarity indexes
+next to the recordings. Each read-modify-write of an index holds its lock,
+so one process never overwrites what another just added.
+
+The lock is an OS lock on a small sidecar file (fcntl.flock on Linux and
+macOS, msvcrt.locking on Windows), released automatically if the process
+dies.
+"""
+
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Reentrant exclusive lock on `path` (created if missing).
+
+    Use as a context manager. Threads of one process take turns through an
+    in-process lock first, so the OS lock is only taken once per process.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def _lock_file(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after ~10 s
+                        break
+                    except OSError:
+                        time.sleep(0.1)
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            f, self._file = self._file, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                f.close()
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
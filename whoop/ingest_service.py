@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Ingest service: scores recordings as they land in recordings/.
+
+Takes made by other tools or copied in from other booths (a wetransfer
+dump unpacked into recordings/, say) used to wait for someone to run
+submit_all_recordings.py. This service watches the directory instead,
+with inotify on Linux and by polling elsewhere, and sends every new WAV or
+FLAC through the duplicate check, a pool of warm scoring workers
+(scoring_pool.py) and the score outbox, like the recorder does with its
+own takes.
+
+A file is only picked up once it is complete: its size and modification
+time have not changed for `settle` seconds and it holds as much audio as
+its header declares. At most `max_pending` takes are in the pipeline at a time; when a
+large batch arrives at once the rest wait, as names only, until there is
+room, so a dump of a thousand files neither floods the scoring workers
+nor grows the queues.
+
+Takes the recorder saved itself are in the recordings manifest
+(recordings_manifest.py) with their own status and are left alone; so are
+takes this service already scored. On start it catches up with the files
+that arrived while it was not running.
+
+Usage:
+    python3 ingest_service.py                          # watch recordings/
+    python3 ingest_service.py --workers 4 --max-pending 16
+    python3 ingest_service.py --poll 2                 # poll every 2 s instead of inotify
+    python3 ingest_service.py --from-now               # leave the takes already there alone
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import argparse
+import threading
+from collections import deque
+
+from audio_storage import is_audio_file, audio_info, read_audio
+from job_pipeline import JobPipeline, Stage
+from recording_metadata import read_sidecar
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE, found_session_fields, session_key
+from score_outbox import ScoreOutbox, OUTBOX_FILE, SERVER_URL
+
+REAL_WAV = "recordings/real_chirp/GW150914_L1_shiftedslower.wav"
+CONSUMER = "ingest_service"  # the manifest cursor of the catch-up on start
+# Manifest statuses of takes this service scores; the others are done or the recorder's
+INGEST_STATUSES = ("unscored", "failed")
+SETTLE_SECONDS = 2.0
+
+
+# ---- watching ----
+
+class InotifyWatcher:
+    """Names of files written and closed in, or moved into, a directory (Linux inotify via ctypes)."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name that follows
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"cannot watch {directory}")
+
+    def read(self, timeout):
+        """
+        Names reported within timeout seconds. None in the list means events
+        were lost (the kernel queue overflowed) and the directory should be
+        listed again.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        names = []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        offset = 0
+        while offset + self.EVENT.size <= len(buffer):
+            _, mask, _, length = self.EVENT.unpack_from(buffer, offset)
+            offset += self.EVENT.size
+            name = buffer[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                names.append(None)
+            elif name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Names of files that appeared or changed in a directory, by listing it every `interval` seconds."""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._seen = {}  # name -> (size, mtime)
+        self._next_poll = 0.0
+
+    def read(self, timeout):
+        wait = self._next_poll - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self._next_poll:
+                return []
+        self._next_poll = time.monotonic() + self.interval
+        seen, names = {}, []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            seen[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            if self._seen.get(entry.name) != seen[entry.name]:
+                names.append(entry.name)
+        self._seen = seen
+        return names
+
+    def close(self):
+        pass
+
+
+def audio_complete(path):
+    """
+    Whether a recording looks fully written: a WAV as long as its RIFF
+    header says (writers fill the sizes in when they close it), a FLAC
+    decoding to as many samples as it declares.
+    """
+    try:
+        if path.lower().endswith(".wav"):
+            with open(path, "rb") as f:
+                header = f.read(12)
+            riff_size = struct.unpack("<I", header[4:8])[0] if header[:4] == b"RIFF" else 0
+            return 8 < riff_size + 8 <= os.path.getsize(path) and audio_info(path)[1] > 0
+        rate, frames = audio_info(path)
+        return frames > 0 and len(read_audio(path)[1]) == frames
+    except Exception:
+        return False
+
+
+def open_watcher(directory, poll_interval=None):
+    """An InotifyWatcher where inotify works (unless poll_interval is given), else a PollingWatcher."""
+    if poll_interval is None and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), polling {directory} instead")
+    return PollingWatcher(directory, poll_interval or 1.0)
+
+
+# ---- the service ----
+
+class IngestService:
+    """
+    Watches a recordings directory and scores and submits the takes that land in it.
+
+    run() watches until stop() is called; start() runs it on a thread.
+    close() stops watching, finishes the takes in the pipeline and shuts
+    the scoring workers down. stats counts the takes seen, skipped, scored,
+    submitted, flagged and failed, and the most that were in flight and
+    waiting at once.
+    """
+
+    def __init__(self, recordings_dir, real_wav=REAL_WAV, workers=2, max_pending=None,
+                 settle=SETTLE_SECONDS, poll_interval=None, outbox=None, manifest=None,
+                 scoring_timeout=120, from_now=False):
+        self.recordings_dir = str(recordings_dir)
+        self.real_wav = str(real_wav)
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers  # takes in the pipeline at once
+        self.settle = settle  # seconds a file must stay unchanged
+        self.poll_interval = poll_interval  # None: inotify if possible
+        self.scoring_timeout = scoring_timeout
+        self.from_now = from_now
+        self._owns_outbox = outbox is None
+        self.outbox = outbox or ScoreOutbox(os.path.join(self.recordings_dir, OUTBOX_FILE), SERVER_URL)
+        self._owns_manifest = manifest is None
+        self.manifest = manifest or RecordingsManifest(os.path.join(self.recordings_dir, MANIFEST_FILE))
+        self.stats = {"seen": 0, "skipped": 0, "scored": 0, "submitted": 0, "flagged": 0, "failed": 0,
+                      "max_in_flight": 0, "max_waiting": 0}
+        self.pool = None
+        self.pipeline = None
+        self.watcher = None
+        self._settling = {}  # path -> ((size, mtime), time.monotonic() it was last seen changing)
+        self._ready = deque()  # complete takes waiting for room in the pipeline
+        self._queued = set()  # paths settling, ready or in the pipeline
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._in_flight = 0
+        self._lock = threading.Lock()  # _queued and _in_flight, also changed by pipeline workers
+        self._catch_up_seq = None
+        self._catch_up_seqs = {}  # path -> seq of the takes queued by the catch-up
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _start_workers(self):
+        from scoring_pool import start_pool
+        self.pool = start_pool(self.workers, self.real_wav)
+        self.pipeline = JobPipeline([
+            Stage("Checking for duplicates", self.screen_recording),
+            Stage("Scoring", self.score_recording, workers=self.workers),
+            Stage("Submitting", self.submit_score),
+        ], on_status=self._job_status)
+        if self._owns_outbox:
+            self.outbox.start()
+
+    # ---- watching ----
+
+    def _notice(self, path):
+        """Start waiting for a file to settle (once)."""
+        name = os.path.basename(path)
+        if not is_audio_file(name) or session_key(name).endswith(".part"):
+            return
+        with self._lock:
+            if path in self._queued:
+                return
+            self._queued.add(path)
+        self._settling[path] = (None, time.monotonic())
+        self.stats["seen"] += 1
+
+    def _list_directory(self):
+        for entry in sorted(os.listdir(self.recordings_dir)):
+            self._notice(os.path.join(self.recordings_dir, entry))
+
+    def _catch_up(self):
+        """Queue the takes that arrived, or failed, while the service was not running."""
+        self.manifest.scan(self.recordings_dir)
+        self.manifest.release_stale()
+        sessions, self._catch_up_seq = self.manifest.new_since_last_run(CONSUMER)
+        if self.from_now:
+            self.manifest.set_cursor(CONSUMER, self.manifest.last_seq())
+            self._catch_up_seq = None
+            return
+        for session in sessions:
+            if session["status"] in INGEST_STATUSES and session["audio_path"] \
+                    and os.path.dirname(session["audio_path"]) == os.path.abspath(self.recordings_dir):
+                path = os.path.join(self.recordings_dir, os.path.basename(session["audio_path"]))
+                self._catch_up_seqs[path] = session["seq"]
+                self._notice(path)
+
+    def _check_settling(self):
+        """Move files that stopped changing and have a readable header to the ready queue."""
+        now = time.monotonic()
+        for path, (signature, since) in list(self._settling.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._settling[path]  # gone, e.g. a WAV compressed to FLAC
+                self._forget(path)
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._settling[path] = (current, now)
+            elif now - since >= self.settle:
+                del self._settling[path]
+                if audio_complete(path):
+                    self._ready.append(path)
+                else:
+                    # Picked up again if the writer was only stalled and the file changes
+                    print(f"⚠️  Not scoring {os.path.basename(path)} yet: incomplete or unreadable audio")
+                    self._forget(path)
+        self.stats["max_waiting"] = max(self.stats["max_waiting"], len(self._ready))
+
+    def _dispatch(self):
+        """Admit ready takes into the pipeline while there is room (the backpressure)."""
+        while self._ready and self._slots.acquire(blocking=False):
+            path = self._ready.popleft()
+            job = self._admit(path)
+            if job is None:
+                self._slots.release()
+                self._forget(path)
+                continue
+            with self._lock:
+                self._in_flight += 1
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            self.pipeline.submit(job)
+
+    def _forget(self, path, finished=False):
+        with self._lock:
+            self._queued.discard(path)
+            if finished:
+                self._in_flight -= 1
+
+    def _admit(self, path):
+        """The scoring job for a settled take, or None if it is not this service's to score."""
+        try:
+            stat = os.stat(path)
+            row = self.manifest.get(path)
+            if row is None or row["audio_path"] != os.path.abspath(path) \
+                    or (row["size"], row["mtime"]) != (stat.st_size, stat.st_mtime):
+                self.manifest.record(path, **(found_session_fields(path) if row is None else {}))
+                row = self.manifest.get(path)
+        except OSError:
+            return None
+        if row["status"] not in INGEST_STATUSES:
+            self.stats["skipped"] += 1  # saved by a recorder, or scored already
+            return None
+        # A take whose scoring failed was screened already and is tried again
+        return {"name": row["player"], "filepath": path, "recordings_dir": self.recordings_dir,
+                "trigger_sample": read_sidecar(path).get("trigger_sample"), "retry": row["status"] == "failed"}
+
+    def _open(self):
+        """Start the scoring workers, start watching and queue what arrived meanwhile (once)."""
+        if self.pool is None:
+            self._start_workers()
+        if self.watcher is None:
+            self.watcher = open_watcher(self.recordings_dir, self.poll_interval)
+            kind = "inotify" if isinstance(self.watcher, InotifyWatcher) else f"polling every {self.watcher.interval} s"
+            print(f"Watching {self.recordings_dir} ({kind})")
+            self._catch_up()
+
+    def run(self):
+        """Watch and ingest until stop() is called."""
+        self._open()
+        try:
+            while not self._stop.is_set():
+                # Wake often enough to notice files settling
+                for name in self.watcher.read(min(0.5, self.settle / 2 or 0.5)):
+                    if name is None:
+                        print("⚠️  Missed file events, listing the directory again")
+                        self._list_directory()
+                    else:
+                        self._notice(os.path.join(self.recordings_dir, name))
+                self._check_settling()
+                self._dispatch()
+        finally:
+            self.watcher.close()
+            self.watcher = None
+
+    def start(self):
+        """Start the scoring workers and watching, then ingest on a background thread."""
+        self._open()
+        self._thread = threading.Thread(target=self.run, name="ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def idle(self):
+        """Whether nothing is settling, waiting or being scored."""
+        with self._lock:
+            return not self._queued
+
+    def wait_idle(self, timeout=None):
+        """Wait until idle(); False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.idle():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=None):
+        """Stop watching, finish the takes in the pipeline and stop the workers."""
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.pipeline is not None:
+            if self.pipeline.pending:
+                print(f"Waiting for {self.pipeline.pending} recording(s) to be scored...")
+            self.pipeline.join(timeout)
+            self.pipeline.shutdown(wait=False)
+        if self._catch_up_seq is not None:
+            # Takes of the catch-up still settling, waiting or unfinished in
+            # the pipeline are caught up on again next time
+            with self._lock:
+                unfinished = [seq for path, seq in self._catch_up_seqs.items() if path in self._queued]
+            self.manifest.set_cursor(CONSUMER, min(unfinished) - 1 if unfinished else self._catch_up_seq)
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        if self._owns_outbox:
+            self.outbox.close(flush_timeout=10)
+        if self._owns_manifest:
+            self.manifest.close()
+
+    # ---- pipeline stages ----
+
+    def _job_status(self, job, message):
+        if job["status"] in ("done", "failed"):
+            if job["status"] == "failed":
+                self._note_status(job, "failed")
+            print(f"{os.path.basename(job['filepath'])}: {message}")
+            self._forget(job["filepath"], finished=True)
+            self._slots.release()
+
+    def _note_status(self, job, status, score=None):
+        with self._lock:
+            self.stats[status] += 1
+        try:
+            self.manifest.set_status(job["filepath"], status, score)
+        except Exception as e:
+            print("Recordings manifest not updated:", e)
+
+    def screen_recording(self, job):
+        """Pipeline stage: refuse duplicates and replays of the real chirp"""
+        try:
+            from whoop_fingerprint import shared_index, screen_submission, ALREADY_SUBMITTED
+            fingerprint_index = shared_index(self.recordings_dir, self.real_wav)
+            flag_reason = screen_submission(job["filepath"], fingerprint_index)
+        except Exception as e:
+            print("Fingerprint check unavailable:", e)
+            flag_reason = None
+        if flag_reason == ALREADY_SUBMITTED:
+            if not job["retry"]:
+                job["outcome"] = "Already submitted"
+                with self._lock:
+                    self.stats["skipped"] += 1
+                return False
+        elif flag_reason:
+            job["outcome"] = f"⚠️ Not submitted: {flag_reason}"
+            self._note_status(job, "flagged")
+            return False
+        return True
+
+    def score_recording(self, job):
+        """Pipeline stage: score the take on a warm worker"""
+        from scoring_pool import score_file
+        score = self.pool.submit(score_file, job["filepath"], job["trigger_sample"]).result(self.scoring_timeout)
+        job["score"] = {"name": job["name"], "score": score}
+        self._note_status(job, "scored", score)
+        return True
+
+    def submit_score(self, job):
+        """Pipeline stage: add similar players and queue the score for the leaderboard"""
+        score_dict = job["score"]
+        try:
+            from whoop_similarity import find_similar_players
+            score_dict["similar"] = find_similar_players(job["filepath"], self.recordings_dir)
+        except Exception as e:
+            print("Similarity search unavailable:", e)
+        self.outbox.add(score_dict)
+        job["outcome"] = f"🏆 {score_dict['name']}: {score_dict['score']} submitted"
+        self._note_status(job, "submitted", score_dict["score"])
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score and submit recordings as they land in a directory")
+    parser.add_argument("recordings_dir", nargs="?", default="recordings", help="Directory to watch")
+    parser.add_argument("--real_wav", default=REAL_WAV, help="Path to the real chirp .wav file")
+    parser.add_argument("--server-url", default=SERVER_URL, help="Leaderboard submit URL")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Scoring worker processes")
+    parser.add_argument("--max-pending", type=int,
+                        help="Takes in the pipeline at once; the rest wait (default: 4 per worker)")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="Seconds a file must stay unchanged before it is scored")
+    parser.add_argument("--poll", type=float, metavar="SECONDS",
+                        help="Poll the directory at this interval instead of using inotify")
+    parser.add_argument("--from-now", action="store_true",
+                        help="Only score takes that arrive from now on")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.recordings_dir):
+        print(f"❌ Recordings folder not found: {args.recordings_dir}")
+        return
+    if not os.path.exists(args.real_wav):
+        print(f"❌ Real chirp not found: {args.real_wav}")
+        return
+    outbox = ScoreOutbox(os.path.join(args.recordings_dir, OUTBOX_FILE), args.server_url)
+    service = IngestService(args.recordings_dir, args.real_wav, args.workers, args.max_pending,
+                            args.settle, args.poll, outbox=outbox, from_now=args.from_now)
+    outbox.start()
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        service.close(timeout=60)
+        outbox.close(flush_timeout=10)
+        stats = service.stats
+        print(f"✅ {stats['submitted']} take(s) submitted, "
+              f"{stats['flagged']} flagged, {stats['failed']} failed, {stats['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
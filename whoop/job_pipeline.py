@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Background job pipeline for the work that follows a recording.
+
+A finished take goes through a few slow steps (duplicate check, scoring,
+leaderboard submission) that used to run on the recording thread. A
+JobPipeline runs them on worker threads instead: every stage has its own
+queue and number of workers, a job moves to the next stage when its stage
+function returns, and the recorder is free to start the next player at
+once. Stages that touch a shared file (such as an index) use one worker so
+they never run concurrently.
+"""
+
+import time
+import queue
+import threading
+import traceback
+
+
+class Stage:
+    """One step of a JobPipeline: a function run on `workers` threads."""
+
+    def __init__(self, name, function, workers=1):
+        self.name = name
+        self.function = function
+        self.workers = workers
+
+
+class JobPipeline:
+    """
+    Runs jobs through a fixed sequence of stages on background threads.
+
+    A job is a dict. Each stage function takes the job and returns True to
+    pass it on to the next stage or False to end it there (e.g. a flagged
+    recording is not scored); job["outcome"] is reported as the final status
+    message. An exception ends the job too; it is stored in job["error"].
+    on_status(job, message) is called from worker threads whenever a job
+    enters a stage, finishes or fails. The seconds spent in each stage are
+    kept in job["timings"], and job["submitted_at"] / job["finished_at"]
+    hold time.monotonic() stamps for end-to-end latency.
+    """
+
+    def __init__(self, stages, on_status=None):
+        self.stages = list(stages)
+        self.on_status = on_status or (lambda job, message: None)
+        self._queues = [queue.Queue() for _ in self.stages]
+        self._threads = []
+        self._pending = 0
+        self._idle = threading.Condition()
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index,),
+                                          name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job):
+        """Queue a job at the first stage and return it."""
+        with self._idle:
+            self._pending += 1
+        job.setdefault("status", "queued")
+        job.setdefault("timings", {})
+        job["submitted_at"] = time.monotonic()
+        self._queues[0].put(job)
+        return job
+
+    @property
+    def pending(self):
+        """Number of submitted jobs that have not finished yet."""
+        with self._idle:
+            return self._pending
+
+    def _report(self, job, status, message):
+        job["status"] = status
+        try:
+            self.on_status(job, message)
+        except Exception as e:
+            print(f"Warning: status callback failed: {e}")
+
+    def _work(self, index):
+        stage = self.stages[index]
+        while True:
+            job = self._queues[index].get()
+            if job is None:
+                break
+            self._report(job, stage.name, f"{stage.name}...")
+            started = time.monotonic()
+            try:
+                carry_on = stage.function(job)
+            except Exception as e:
+                job["error"] = e
+                traceback.print_exc()
+                self._report(job, "failed", f"{stage.name} failed: {e}")
+                carry_on = False
+            else:
+                job["timings"][stage.name] = time.monotonic() - started
+                if carry_on and index + 1 < len(self.stages):
+                    self._queues[index + 1].put(job)
+                    continue
+                self._report(job, "done", job.get("outcome", "done"))
+            self._finish(job)
+
+    def _finish(self, job):
+        job["finished_at"] = time.monotonic()
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until every submitted job has finished. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, wait=True, timeout=None):
+        """Stop the workers, after finishing queued jobs if wait is True."""
+        if wait:
+            self.join(timeout)
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._queues[index].put(None)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Headless kiosk mode: record queued players back to back, without a GUI.
+
+Player names are queued from any mix of a file, stdin and a small local HTTP
+endpoint; the kiosk records them one after another with recorder_core's
+Recorder. Scoring and submission run in the background, so the next
+player's countdown starts as soon as the previous take is saved. After every
+session the kiosk prints its timings, any capture problems (see
+capture_telemetry.py) and the throughput so far, and at the end a summary
+with the sustained players-per-hour rate.
+
+Usage:
+    python3 kiosk.py Alice Bob Carol
+    python3 kiosk.py --names queue.txt --follow
+    python3 kiosk.py --stdin
+    python3 kiosk.py --http 5002 --keep-running
+    python3 kiosk.py --names queue.txt --profile scoring-8k
+    python3 kiosk.py --names queue.txt --auto-stop   # end each take once the player stops
+    python3 kiosk.py --names queue.txt --audio-storage flac   # keep takes as lossless FLAC
+    python3 kiosk.py --names queue.txt --quota 20   # keep recordings/ under 20 GB (recording_retention.py)
+    python3 kiosk.py --names queue.txt --quota 20 --drop-video-after 48 --archive-after 24
+
+    # One kiosk per booth on a host with several (see stations.py)
+    python3 kiosk.py --names left.txt --station left --audio-device 1 --camera 0
+    python3 kiosk.py --names right.txt --station right --audio-device 2 --camera 1
+
+    # Benchmark without devices, four times faster than real time
+    python3 kiosk.py A B C D --countdown 0 --sim-audio synthetic --sim-video synthetic --sim-speed 4
+
+    # Queue a player through the HTTP endpoint
+    curl -X POST "http://127.0.0.1:5002/queue?name=Alice"
+"""
+
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+
+from capture_profiles import PROFILES, DEFAULT_PROFILE, get_profile
+from audio_storage import STORAGE_FORMATS
+from capture_telemetry import problems
+from recorder_core import Recorder, RecorderEvents
+from recording_retention import BackgroundRetention, RetentionPolicy, hours_or_off, HOUR
+
+
+class KioskEvents(RecorderEvents):
+    """Console output for a recorder without a window"""
+
+    def job_status(self, job, message):
+        if job["status"] in ("done", "failed"):
+            latency = job.get("finished_at", time.monotonic()) - job["submitted_at"]
+            print(f"   [{job['name']}] {message} ({latency:.1f} s after saving)")
+
+
+class Kiosk:
+    """
+    Queue of player names and the loop that records them.
+
+    Name sources run on their own threads (see add_source) and call
+    enqueue(); once every source has returned, run() knows no more names
+    can arrive. With a BackgroundRetention, the retention rules run after
+    every session.
+    """
+
+    def __init__(self, recorder, gap=0.0, retention=None):
+        self.recorder = recorder
+        self.gap = gap  # seconds between sessions, e.g. to let players swap
+        self.retention = retention
+        self.names = queue.Queue()
+        self.sessions = []
+        self._sources = 0
+        self._sources_lock = threading.Lock()
+
+    def enqueue(self, name):
+        name = name.strip()
+        if name and not name.startswith("#"):
+            self.names.put(name)
+            return True
+        return False
+
+    def add_source(self, target, *args):
+        """Run a name source target(kiosk, *args) on a daemon thread."""
+        with self._sources_lock:
+            self._sources += 1
+
+        def run():
+            try:
+                target(self, *args)
+            except Exception as e:
+                print(f"Warning: name source stopped: {e}")
+            finally:
+                with self._sources_lock:
+                    self._sources -= 1
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def sources_left(self):
+        with self._sources_lock:
+            return self._sources
+
+    def run(self, keep_running=False, max_sessions=None):
+        """
+        Record queued players until the queue is empty and every source is
+        done (or forever with keep_running), then wait for their scores.
+        """
+        while max_sessions is None or len(self.sessions) < max_sessions:
+            try:
+                name = self.names.get(timeout=0.2)
+            except queue.Empty:
+                if not keep_running and self.sources_left() == 0 and self.names.empty():
+                    break
+                continue
+
+            print(f"\n▶ Session {len(self.sessions) + 1}: {name}")
+            started = time.monotonic()
+            try:
+                session = self.recorder.record_session(name)
+            except Exception as e:
+                print(f"❌ Session for {name} failed: {e}")
+                session = {"name": name, "job": None, "timings": {}}
+            session["started_at"] = started
+            session["ended_at"] = time.monotonic()
+            self.sessions.append(session)
+            self.print_session(session)
+            if self.retention is not None:
+                self.retention.kick()
+
+            if self.gap:
+                time.sleep(self.gap)
+
+        self.recorder.scoring_pipeline.join(timeout=self.recorder.scoring_timeout)
+        return self.report()
+
+    def players_per_hour(self):
+        """Sessions completed per hour, from the start of the first to the end of the last."""
+        if not self.sessions:
+            return 0.0
+        elapsed = self.sessions[-1]["ended_at"] - self.sessions[0]["started_at"]
+        return len(self.sessions) / elapsed * 3600 if elapsed > 0 else 0.0
+
+    def print_session(self, session):
+        timings = session["timings"]
+        parts = ", ".join(f"{step} {seconds:.2f} s" for step, seconds in timings.items())
+        total = session["ended_at"] - session["started_at"]
+        print(f"⏱  {session['name']}: {parts or 'no timings'} (total {total:.2f} s) "
+              f"- {self.players_per_hour():.1f} players/hour so far")
+        found = problems(session.get("telemetry") or {})
+        if found:
+            print(f"⚠️  Capture problems: {', '.join(found)}")
+
+    def report(self):
+        """Per-session timings and throughput as a JSON-friendly dict"""
+        rows = []
+        for session in self.sessions:
+            job = session["job"] or {}
+            row = {
+                "name": session["name"],
+                "status": job.get("status", "not saved"),
+                "score": (job.get("score") or {}).get("score"),
+                "session_seconds": round(session["ended_at"] - session["started_at"], 3),
+                **{f"{step}_seconds": round(seconds, 3) for step, seconds in session["timings"].items()},
+            }
+            for stage, seconds in job.get("timings", {}).items():
+                row[f"{stage.lower().replace(' ', '_')}_seconds"] = round(seconds, 3)
+            if "finished_at" in job:
+                row["save_to_result_seconds"] = round(job["finished_at"] - job["submitted_at"], 3)
+            telemetry = session.get("telemetry") or {}
+            audio, video = telemetry.get("audio") or {}, telemetry.get("video") or {}
+            row["audio_xruns"] = audio.get("xruns")
+            row["first_sample_ms"] = audio.get("first_sample_ms")
+            row["take_seconds"] = audio.get("take_seconds")
+            row["stop_reason"] = audio.get("stop_reason")
+            if video:
+                row["effective_fps"] = video["effective_fps"]
+                row["frames_lost"] = video["frames_dropped"] + video["read_failures"]
+                row["first_frame_ms"] = video["first_frame_ms"]
+            row["capture_problems"] = problems(telemetry)
+            rows.append(row)
+
+        scored = [s["job"]["finished_at"] for s in self.sessions if s["job"] and "finished_at" in s["job"]]
+        scored_per_hour = 0.0
+        if scored and self.sessions:
+            elapsed = max(scored) - self.sessions[0]["started_at"]
+            scored_per_hour = len(scored) / elapsed * 3600 if elapsed > 0 else 0.0
+        return {"sessions": rows,
+                "players_per_hour": round(self.players_per_hour(), 1),
+                "scored_per_hour": round(scored_per_hour, 1)}
+
+
+# ---- Name sources ----
+
+def names_from_file(kiosk, path, follow=False, poll_interval=0.5):
+    """Queue one name per line; with follow, keep watching for appended lines."""
+    with open(path) as f:
+        while True:
+            line = f.readline()
+            if line:
+                kiosk.enqueue(line)
+            elif follow:
+                time.sleep(poll_interval)
+            else:
+                return
+
+
+def names_from_stdin(kiosk):
+    for line in sys.stdin:
+        kiosk.enqueue(line)
+
+
+def names_from_http(kiosk, port, host="127.0.0.1"):
+    """Serve POST /queue?name=... (or JSON {"name": ...}) and GET /queue."""
+    from flask import Flask, request, jsonify
+
+    app = Flask(__name__)
+
+    @app.route("/queue", methods=["POST"])
+    def queue_name():
+        data = request.get_json(silent=True) or {}
+        name = request.args.get("name") or request.form.get("name") or data.get("name", "")
+        if not kiosk.enqueue(name):
+            return jsonify({"error": "missing name"}), 400
+        return jsonify({"queued": name.strip(), "waiting": kiosk.names.qsize()})
+
+    @app.route("/queue", methods=["GET"])
+    def queue_status():
+        return jsonify({"waiting": kiosk.names.qsize(), "recorded": len(kiosk.sessions),
+                        "players_per_hour": round(kiosk.players_per_hour(), 1)})
+
+    app.run(host=host, port=port, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record queued players back to back without a GUI")
+    parser.add_argument("players", nargs="*", help="Names to queue first")
+    parser.add_argument("--names", help="File with one player name per line")
+    parser.add_argument("--follow", action="store_true", help="Keep reading names appended to --names")
+    parser.add_argument("--stdin", action="store_true", help="Read player names from stdin")
+    parser.add_argument("--http", type=int, metavar="PORT", help="Accept names on http://127.0.0.1:PORT/queue")
+    parser.add_argument("--keep-running", action="store_true", help="Wait for more names when the queue is empty")
+    parser.add_argument("--countdown", type=int, default=3, help="Countdown in seconds")
+    parser.add_argument("--gap", type=float, default=0.0, help="Pause between players in seconds")
+    parser.add_argument("--no-video", action="store_true", help="Record audio only")
+    parser.add_argument("--profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="Capture profile: sample rate, WAV format, duration and video format")
+    parser.add_argument("--auto-stop", action="store_true", default=None,
+                        help="End each take once the player stops (the profile's duration is the longest)")
+    parser.add_argument("--min-duration", type=float, help="Shortest take with auto-stop, in seconds")
+    parser.add_argument("--hangover", type=float, help="Seconds of quiet that end a take with auto-stop")
+    parser.add_argument("--audio-storage", choices=STORAGE_FORMATS,
+                        help="Keep saved takes as WAV or lossless FLAC (default: the profile's)")
+    parser.add_argument("--station", help="Station name for calibration and telemetry (default WHOOP_STATION or the hostname)")
+    parser.add_argument("--audio-device", help="Audio input device index or name (default: the system default)")
+    parser.add_argument("--camera", type=int, default=0, help="Camera index")
+    parser.add_argument("--recordings_dir", default=None, help="Where to save recordings")
+    retention_rules = parser.add_argument_group("retention between sessions (see recording_retention.py)")
+    retention_rules.add_argument("--quota", type=float, metavar="GB",
+                                 help="Keep the recordings under this many GB")
+    retention_rules.add_argument("--downscale-after", type=hours_or_off, metavar="HOURS",
+                                 help="Downscale videos older than this")
+    retention_rules.add_argument("--drop-video-after", type=hours_or_off, metavar="HOURS",
+                                 help="Delete videos older than this, keeping the audio")
+    retention_rules.add_argument("--archive-after", type=hours_or_off, metavar="HOURS",
+                                 help="Move takes older than this into the day bundles")
+    retention_rules.add_argument("--protect", type=hours_or_off, default=HOUR, metavar="HOURS",
+                                 help="Hours during which the quota leaves a take alone (default 1)")
+    parser.add_argument("--report", help="Write the per-session timing report to this JSON file")
+    simulation = parser.add_argument_group("simulated devices (see sim_devices.py)")
+    simulation.add_argument("--sim-audio", metavar="SOURCE",
+                            help="Replay a WAV/FLAC file, a directory of them or 'synthetic' instead of the microphone")
+    simulation.add_argument("--sim-video", metavar="SOURCE",
+                            help="Replay a video file or 'synthetic' instead of the webcam")
+    simulation.add_argument("--sim-speed", type=float, default=1.0, help="Playback speed, 4 is four times real time")
+    simulation.add_argument("--sim-latency", type=float, default=0.0, help="Device start-up latency in seconds")
+    simulation.add_argument("--sim-jitter", type=float, default=0.0, help="Random delay per block/frame in seconds")
+    simulation.add_argument("--sim-drop-rate", type=float, default=0.0, help="Fraction of blocks/frames dropped")
+    args = parser.parse_args()
+
+    input_stream = None
+    open_camera = False if args.no_video else None
+    if args.sim_audio or args.sim_video:
+        from sim_devices import simulated_input_stream, simulated_camera_opener
+        options = dict(speed=args.sim_speed, latency=args.sim_latency,
+                       jitter=args.sim_jitter, drop_rate=args.sim_drop_rate)
+        if args.sim_audio:
+            input_stream = simulated_input_stream(args.sim_audio, **options)
+        if args.sim_video and not args.no_video:
+            open_camera = simulated_camera_opener(args.sim_video, **options)
+
+    profile = get_profile(args.profile, auto_stop=args.auto_stop,
+                          min_duration=args.min_duration, hangover=args.hangover,
+                          audio_storage=args.audio_storage)
+    audio_device = args.audio_device
+    if audio_device is not None and audio_device.isdigit():
+        audio_device = int(audio_device)
+    recorder = Recorder(KioskEvents(), countdown_time=args.countdown, profile=profile,
+                        recordings_dir=args.recordings_dir, station=args.station,
+                        audio_device=audio_device, camera_index=args.camera,
+                        input_stream=input_stream, open_camera=open_camera)
+    recorder.start()
+    retention = None
+    policy = RetentionPolicy(quota_bytes=None if args.quota is None else int(args.quota * 1e9),
+                             downscale_video_after=args.downscale_after, drop_video_after=args.drop_video_after,
+                             archive_after=args.archive_after, protect_newer_than=args.protect or 0.0)
+    if args.quota is not None or any(rule is not None for rule in
+                                     (args.downscale_after, args.drop_video_after, args.archive_after)):
+        retention = BackgroundRetention(recorder.recordings_dir, policy)
+    kiosk = Kiosk(recorder, gap=args.gap, retention=retention)
+
+    for name in args.players:
+        kiosk.enqueue(name)
+    if args.names:
+        kiosk.add_source(names_from_file, args.names, args.follow)
+    if args.stdin:
+        kiosk.add_source(names_from_stdin)
+    if args.http:
+        kiosk.add_source(names_from_http, args.http)
+
+    try:
+        report = kiosk.run(keep_running=args.keep_running or bool(args.http))
+    except KeyboardInterrupt:
+        print("\nKiosk stopped by user")
+        report = kiosk.report()
+    finally:
+        recorder.close()
+
+    print(f"\n✅ {len(report['sessions'])} player(s) recorded - "
+          f"{report['players_per_hour']} players/hour, {report['scored_per_hour']} scored/hour")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
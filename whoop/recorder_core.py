@@ -0,0 +1,742 @@
+#!/usr/bin/env python3
+"""
+Record -> save -> score logic of the recorder, without any user interface.
+
+A Recorder owns the warm devices (DeviceManager) and the background scoring
+pipeline (JobPipeline) and runs one player's session at a time with
+record_session(name): countdown, audio (+ video) capture, save, and
+queueing the take for the duplicate check, scoring and leaderboard
+submission. Progress is reported through a RecorderEvents object, so the
+same logic drives the Tk window (audio_recorder.py) and the headless kiosk
+(kiosk.py). What is captured (sample rate, WAV format, duration, video size
+and frame rate) comes from a capture profile, see capture_profiles.py.
+
+Several Recorders can run side by side on one host, one per station, with
+one scoring pipeline between them (see stations.py).
+
+Scores go to a durable outbox in the recordings directory and are sent to
+the leaderboard in the background, so a leaderboard that is down loses
+nothing (see score_outbox.py). Every take gets a row in the recordings
+manifest (recordings_manifest.py) that follows it through scoring.
+
+Video is captured as cheap Motion-JPEG and transcoded to the archival MP4
+codec in the background, at low priority and never during a take (see
+video_transcode.py).
+
+Audio blocks and video frames are stamped on one time.monotonic() session
+clock; their alignment, corrected by the station's calibrated input
+latencies (av_sync.py), is saved in the recording's sidecar.
+
+cv2, sounddevice and requests are only imported when first needed, so a
+front end can show its window before any of them has loaded.
+"""
+
+import os
+import time
+import platform
+import functools
+import threading
+import subprocess
+from datetime import datetime, timedelta
+
+from capture_profiles import get_profile
+from device_probe import ProbeCache, PROBE_CACHE_FILE, probe_video_codec
+from capture_pipeline import FrameQueue, VideoEncoder, AudioCapture, AutoStop, DROP_OLDEST
+from capture_telemetry import VideoTelemetry, audio_telemetry, station_name
+from av_sync import load_calibration, av_sync_metadata, aligned_trigger_sample
+from device_manager import DeviceManager
+from job_pipeline import JobPipeline, Stage
+from recording_metadata import update_sidecar
+from video_transcode import Transcoder, INTERMEDIATE_EXTENSION, DEFAULT_ARCHIVE_CODEC
+from audio_storage import compress
+from score_outbox import ScoreOutbox, OUTBOX_FILE, SERVER_URL
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
+
+
+def sanitize_filename(filename):
+    """Sanitize filename for cross-platform compatibility, especially Windows"""
+    # Remove or replace invalid characters for Windows filenames
+    # Invalid characters: < > : " | ? * \ /
+    invalid_chars = r'<>:"|?*\/'
+    for char in invalid_chars:
+        filename = filename.replace(char, '_')
+
+    # Remove leading/trailing dots and spaces (Windows issue)
+    filename = filename.strip('. ')
+
+    # Ensure filename is not empty
+    if not filename:
+        filename = "recording"
+
+    # Windows reserved names
+    reserved_names = ['CON', 'PRN', 'AUX', 'NUL', 'COM1', 'COM2', 'COM3', 'COM4',
+                      'COM5', 'COM6', 'COM7', 'COM8', 'COM9', 'LPT1', 'LPT2',
+                      'LPT3', 'LPT4', 'LPT5', 'LPT6', 'LPT7', 'LPT8', 'LPT9']
+
+    if filename.upper() in reserved_names:
+        filename = f"user_{filename}"
+
+    return filename
+
+
+def open_webcam(index, width=None, height=None, fps=None):
+    """Open a webcam with cv2; the device manager keeps it open between sessions"""
+    import cv2
+    webcam = cv2.VideoCapture(index)
+    if webcam.isOpened():
+        # Ask for the capture profile's format; cameras that cannot do it
+        # keep their own, and the encoder scales and drops frames instead
+        if width and height:
+            webcam.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            webcam.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            webcam.set(cv2.CAP_PROP_FPS, fps)
+    if webcam.isOpened() and platform.system() == "Windows":
+        # Set buffer size to reduce latency on Windows
+        webcam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # Set frame format for better compatibility
+        webcam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
+    return webcam
+
+
+class RecorderEvents:
+    """
+    Receives a Recorder's progress. This base class prints to the console;
+    the Tk app and the kiosk override what they display differently.
+
+    Methods are called from the recording thread and the scoring workers.
+    """
+
+    def status(self, text):
+        print(text)
+
+    def countdown(self, text):
+        if text:
+            print(f"   {text}...")
+
+    def progress(self, value, maximum):
+        pass
+
+    def error(self, title, message):
+        print(f"❌ {title}: {message}")
+
+    def job_status(self, job, message):
+        print(f"   [{job['name']}] {message}")
+
+
+def build_scoring_pipeline(recorder_for, scoring_workers=2):
+    """
+    JobPipeline for the duplicate check, scoring and submission of takes.
+
+    recorder_for(job) is the Recorder whose stage methods handle a job and
+    whose events get its status, so one pipeline can serve several
+    recorders. The fingerprint and similarity stages update index files,
+    so they get one worker each.
+    """
+    return JobPipeline([
+        Stage("Checking for duplicates", lambda job: recorder_for(job).screen_recording(job)),
+        Stage("Scoring", lambda job: recorder_for(job).score_recording(job), workers=scoring_workers),
+        Stage("Submitting", lambda job: recorder_for(job).submit_score(job)),
+    ], on_status=lambda job, message: recorder_for(job).events.job_status(job, message))
+
+
+class Recorder:
+    """
+    Runs recording sessions back to back on warm devices.
+
+    profile is a capture profile or its name (the default profile if None);
+    sample_rate and duration override the profile's. input_stream and
+    open_camera choose the audio stream class and camera opener
+    (sounddevice.InputStream and open_webcam by default); pass
+    open_camera=False to record audio only.
+
+    station names the booth for calibration and telemetry (WHOOP_STATION or
+    the hostname by default), and audio_device and camera_index pick its
+    devices. With scoring_pipeline the takes go to a pipeline shared with
+    other recorders (see build_scoring_pipeline) instead of one of its own,
+    and likewise with transcoder a shared video Transcoder, with outbox
+    a shared ScoreOutbox and with manifest a shared RecordingsManifest.
+    """
+
+    def __init__(self, events=None, sample_rate=None, duration=None, countdown_time=3,
+                 preroll_seconds=1.0, recordings_dir=None, camera_index=0,
+                 input_stream=None, open_camera=None, scoring_workers=2, profile=None,
+                 station=None, audio_device=None, scoring_pipeline=None, transcoder=None,
+                 outbox=None, manifest=None):
+        self.events = events or RecorderEvents()
+        self.station = station or station_name()
+
+        # Recording parameters
+        self.profile = get_profile(profile, sample_rate=sample_rate, duration=duration)
+        self.sample_rate = self.profile.sample_rate  # Hz
+        self.duration = self.profile.duration  # seconds
+        self.countdown_time = countdown_time  # seconds
+        self.preroll_seconds = preroll_seconds  # audio kept from before the recording starts
+        self.recordings_dir = recordings_dir or os.path.join(os.getcwd(), "recordings")
+        self.audio_filepath = None
+        self.video_filepath = None  # the archival MP4 (once transcoded)
+        self.video_capture_path = None  # the file written while capturing
+        self.transcode_job = None
+        self.audio_trigger_sample = 0
+        self.audio_capture = None  # the last take's AudioCapture, for its clock
+        self.session_start = None  # time.monotonic() when the last take started
+        self.session_timestamp = None  # shared by the WAV and MP4 file names
+        self.video_start_time = None  # time.monotonic() of the first video frame
+        self.video_fps = None
+        self.calibration = None
+        self.capture_telemetry = {}  # capture quality of the last take, see capture_telemetry.py
+        self.is_recording = False
+        self.player_name = ""  # name of the player being recorded
+
+        # Webcam parameters
+        self.webcam = None
+        self.webcam_available = False
+        self.camera_index = camera_index
+        self.frame_queue_size = 60  # frames buffered between capture and encoding (~2 s)
+        self.frame_drop_policy = DROP_OLDEST  # what to drop when encoding falls behind
+
+        # The microphone and camera are opened once and kept warm for every player
+        if open_camera is None:
+            open_camera = functools.partial(open_webcam, width=self.profile.video_width,
+                                            height=self.profile.video_height, fps=self.profile.video_fps)
+        self.devices = DeviceManager(self.sample_rate, channels=1,
+                                     preroll_seconds=self.preroll_seconds,
+                                     input_stream=input_stream,
+                                     open_camera=open_camera or None,
+                                     camera_index=self.camera_index,
+                                     audio_device=audio_device)
+
+        # Slow probes (which video codec works) are cached between starts
+        self.probe_cache = ProbeCache(os.path.join(self.recordings_dir, PROBE_CACHE_FILE))
+        self._video_codec = None
+
+        # Scoring and submission of finished recordings run on background workers
+        self.scoring_timeout = 120  # seconds
+        self.submit_timeout = 10  # seconds
+        self._owns_pipeline = scoring_pipeline is None
+        self.scoring_pipeline = scoring_pipeline or build_scoring_pipeline(lambda job: self, scoring_workers)
+
+        # Captured video is converted to the archival codec between takes
+        self._owns_transcoder = transcoder is None
+        self.transcoder = transcoder or Transcoder()
+
+        # Scores wait on disk until the leaderboard has them
+        self._owns_outbox = outbox is None
+        self.outbox = outbox or ScoreOutbox(os.path.join(self.recordings_dir, OUTBOX_FILE), SERVER_URL)
+
+        # One row per take, updated as it is scored
+        self._owns_manifest = manifest is None
+        self.manifest = manifest or RecordingsManifest(os.path.join(self.recordings_dir, MANIFEST_FILE))
+
+    def start(self, wait=True):
+        """
+        Open the devices, concurrently; with wait=False in the background
+        (record_session waits for them).
+        """
+        self.devices.start(wait=wait)
+        if self._owns_outbox:
+            self.outbox.start()
+        try:
+            # Takes an earlier run saved but never scored
+            for key in self.manifest.release_stale():
+                print(f"Take {key} was never scored; left for submit_all_recordings.py")
+        except Exception as e:
+            print("Recordings manifest not checked:", e)
+        if self.devices.camera is not None and not self.probe_cache.fresh("video_codec"):
+            threading.Thread(target=self.video_codec, daemon=True).start()
+
+    def video_codec(self):
+        """Fourcc name of a VideoWriter codec that works here, or None (cached on disk)"""
+        if self._video_codec is None:
+            self._video_codec = self.probe_cache.cached("video_codec", probe_video_codec) or ""
+        return self._video_codec or None
+
+    @property
+    def camera_available(self):
+        return self.devices.camera is not None and self.devices.camera.available
+
+    def close(self):
+        """Close the devices and finish queued transcoding, scoring and submission (unless shared)"""
+        self.devices.close()
+        if self._owns_transcoder:
+            if self.transcoder.pending:
+                print(f"Waiting for {self.transcoder.pending} video(s) to be transcoded...")
+            self.transcoder.shutdown(wait=True, timeout=self.transcoder.timeout)
+        if self._owns_pipeline:
+            if self.scoring_pipeline.pending:
+                print(f"Waiting for {self.scoring_pipeline.pending} recording(s) to be scored...")
+            self.scoring_pipeline.shutdown(wait=True, timeout=self.scoring_timeout)
+        if self._owns_outbox:
+            self.outbox.close(flush_timeout=self.submit_timeout)
+        if self._owns_manifest:
+            self.manifest.close()
+
+    def record_session(self, name):
+        """
+        Record, save and queue one player's take.
+
+        Returns a dict with the session's files, its scoring job (None if the
+        take could not be saved), the seconds spent counting down, capturing
+        and saving, and the capture telemetry. Scoring finishes in the
+        background; the job's "status" becomes "done" or "failed".
+        """
+        session = {"name": name, "job": None, "timings": {}}
+        self.player_name = name
+
+        if not self.devices.ready.is_set():
+            self.events.status("Waiting for the microphone and camera...")
+            self.devices.wait_ready()
+
+        # Borrow the already open webcam; it is reconnected in the background
+        # if it went away, so each session decides again whether to film
+        self.webcam = self.devices.acquire_camera()
+        self.webcam_available = self.webcam is not None
+        if not self.webcam_available:
+            print("Warning: Webcam not available, recording audio only")
+
+        # No video is transcoded until the take is saved
+        self.transcoder.capture_started()
+        try:
+            # Countdown phase
+            started = time.monotonic()
+            self.events.status("Get ready! Recording will start in...")
+            for i in range(self.countdown_time, 0, -1):
+                self.events.countdown(str(i))
+                time.sleep(1)
+            self.events.countdown("")
+            session["timings"]["countdown"] = time.monotonic() - started
+
+            # Recording phase
+            started = time.monotonic()
+            self.session_start = started
+            self.calibration = load_calibration(self.recordings_dir, self.station)
+            self.video_start_time = self.video_fps = None
+            status_text = "🔴 RECORDING... Speak now!"
+            if self.webcam_available:
+                status_text += " (Audio + Video)"
+            self.events.status(status_text)
+            self.is_recording = True
+            self.events.progress(0, self.duration * 10)  # Update every 0.1 seconds
+
+            # Audio is streamed to disk while recording, so its file is named up front
+            self.audio_filepath = self.claim_recording_path()
+            self.video_filepath = self.video_capture_path = self.transcode_job = None
+            self.capture_telemetry = {"station": self.station, "profile": self.profile.name}
+
+            # Record video with audio synchronously if webcam available
+            try:
+                if self.webcam_available:
+                    self.record_video_with_audio()
+                else:
+                    self.record_audio_only()
+            except BaseException:
+                # A failed or interrupted take is not saved, not even its name
+                self.discard_recording()
+                raise
+            session["timings"]["capture"] = time.monotonic() - started
+
+            # Save the recordings
+            started = time.monotonic()
+            session["job"] = self.save_recording()
+            session["timings"]["save"] = time.monotonic() - started
+        finally:
+            self.transcoder.capture_finished()
+            self.is_recording = False
+            self.session_timestamp = None
+            self.events.progress(0, self.duration * 10)
+            # Hand the webcam back to the device manager, which keeps it warm
+            self.release_webcam()
+
+        session["audio"] = self.audio_filepath
+        session["video"] = self.video_filepath
+        session["transcode"] = self.transcode_job
+        session["telemetry"] = self.capture_telemetry
+        return session
+
+    def record_video_with_audio(self):
+        """Record video and audio synchronously to avoid timing issues"""
+        import cv2
+        audio_capture = None
+        try:
+            # The webcam was borrowed from the device manager in record_session
+            if not self.webcam or not self.webcam.isOpened():
+                print("Warning: Webcam not available for recording")
+                # Fall back to audio only
+                self.record_audio_only()
+                return
+
+            # Get webcam properties
+            # Nominal frame rate; the encoder measures the rate actually delivered
+            fps = self.webcam.get(cv2.CAP_PROP_FPS)
+            if not fps or fps <= 0 or fps > 120:
+                fps = 30
+            camera_fps = fps
+            # The video is written at most at the capture profile's size and
+            # frame rate: larger frames are scaled down by the encoder, and a
+            # faster camera has frames dropped before they are queued
+            frame_interval = 0.0
+            if fps > self.profile.video_fps:
+                fps = self.profile.video_fps
+                frame_interval = 1.0 / fps
+            width, height = self.profile.video_width, self.profile.video_height
+            camera_width = int(self.webcam.get(cv2.CAP_PROP_FRAME_WIDTH))
+            camera_height = int(self.webcam.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if 0 < camera_width <= width and 0 < camera_height <= height:
+                width, height = camera_width, camera_height  # never scale up
+
+            self.video_filepath = self.new_recording_path(".mp4")
+
+            # A working video codec (MP4 container, no audio), probed once
+            # with Windows-compatible fallbacks and then cached on disk
+            codec_name = self.video_codec()
+            intermediate = self.profile.video_intermediate
+            if intermediate:
+                # Capture to cheap Motion-JPEG; the MP4 is made after the take
+                video_filepath = self.new_recording_path(INTERMEDIATE_EXTENSION)
+                video_codec = cv2.VideoWriter_fourcc(*intermediate)
+            elif codec_name is None:
+                print("Warning: Could not initialize video writer with any codec")
+                # Fall back to audio only
+                self.record_audio_only()
+                return
+            else:
+                video_filepath = self.video_filepath
+                video_codec = cv2.VideoWriter_fourcc(*codec_name)
+            self.video_capture_path = video_filepath
+
+            # Encoding runs on its own thread, fed through a bounded queue, so
+            # writing frames never slows down reading them from the camera.
+            # The writer is opened once the real camera frame rate is known.
+            frame_queue = FrameQueue(self.frame_queue_size, self.frame_drop_policy)
+            encoder = VideoEncoder(
+                frame_queue,
+                lambda measured_fps: cv2.VideoWriter(video_filepath, video_codec,
+                                                     measured_fps, (width, height)),
+                nominal_fps=fps,
+                frame_size=(width, height)
+            )
+            encoder.start()
+
+            # Start audio recording in the background
+            audio_capture = self.start_audio_capture()
+            video_telemetry = VideoTelemetry(camera_fps, fps, started=audio_capture.started_at)
+
+            # Capture video until the audio is complete, so both cover the
+            # same take; the audio clock decides when the duration is up.
+            # webcam.read() blocks until the camera has a new frame, so the
+            # loop runs at whatever rate the camera delivers.
+            start_time = time.time()
+            frame_count = 0
+            last_progress = -1
+            next_frame_due = 0.0
+
+            try:
+                while not audio_capture.finished() and time.time() - start_time < self.duration + 5:
+                    ret, frame = self.webcam.read()
+                    if ret:
+                        # Drop frames beyond the profile's frame rate before
+                        # they cost any encoding (with slack for read jitter)
+                        now = time.monotonic()
+                        keep = now >= next_frame_due - frame_interval / 4
+                        video_telemetry.read(now, kept=keep)
+                        if keep:
+                            frame_queue.put((now, frame))
+                            if frame_count == 0:
+                                self.video_start_time = now
+                            frame_count += 1
+                            next_frame_due = max(next_frame_due + frame_interval, now - frame_interval / 4)
+                    else:
+                        # Handle frame read failures
+                        video_telemetry.read_failed()
+                        print("Warning: Failed to read frame from webcam")
+                        break
+
+                    # Update progress bar (only when it moves, not every frame)
+                    progress_value = int(audio_capture.progress * self.duration * 10)
+                    if progress_value != last_progress:
+                        self.events.progress(progress_value, self.duration * 10)
+                        last_progress = progress_value
+            finally:
+                # Let the encoder drain whatever is still queued
+                frame_queue.close()
+
+            # Wait for audio recording to complete
+            audio_capture.wait(timeout=self.duration + 5)
+            self.capture_telemetry["audio"] = audio_telemetry(audio_capture)
+            audio_capture = None
+            encoder.join()
+            if encoder.error is not None and not intermediate:
+                # The cached codec stopped working (e.g. after an OpenCV update)
+                self.probe_cache.invalidate("video_codec")
+                self._video_codec = None
+            elif encoder.error is None and encoder.frames_written and intermediate:
+                # Runs once no station is capturing any more
+                self.transcode_job = self.transcoder.submit(video_filepath, self.video_filepath,
+                                                            codec_name or DEFAULT_ARCHIVE_CODEC)
+
+            video = video_telemetry.summary(frame_queue.dropped, encoder.frames_written, encoder.fps)
+            self.capture_telemetry["video"] = video
+            self.video_fps = encoder.fps
+            print(f"Recorded {frame_count} video frames "
+                  f"({encoder.frames_written} written, {frame_queue.dropped} dropped, "
+                  f"camera {video['effective_fps'] or 0.0:.1f} fps, encoded {encoder.fps or 0.0:.1f} fps)")
+
+        except Exception as e:
+            error_msg = f"Error during synchronized recording: {e}"
+            print(error_msg)
+            # Stop the audio stream of the failed attempt before starting over
+            if audio_capture is not None:
+                audio_capture.stop()
+            # On Windows, provide additional troubleshooting info
+            if platform.system() == "Windows":
+                print("Windows troubleshooting:")
+                print("- Check camera permissions in Windows Settings")
+                print("- Close other apps using the camera")
+                print("- Try running as administrator")
+            # Fall back to audio only
+            self.record_audio_only()
+        finally:
+            self.release_webcam()
+
+    def record_audio_only(self):
+        """Record audio only when no webcam is available"""
+        try:
+            # Record audio
+            audio_capture = self.start_audio_capture()
+
+            # Update progress bar during recording
+            deadline = time.time() + self.duration + 5
+            while not audio_capture.finished(timeout=0.1) and time.time() < deadline:
+                self.events.progress(int(audio_capture.progress * self.duration * 10), self.duration * 10)
+
+            audio_capture.wait(timeout=0)  # Finish the WAV file
+            self.capture_telemetry["audio"] = audio_telemetry(audio_capture)
+
+        except Exception as e:
+            print(f"Error during audio recording: {e}")
+            raise
+
+    def new_recording_path(self, extension):
+        """Path in the recordings directory for a new file of the current player"""
+        name = self.player_name
+        safe_name = sanitize_filename(name) if name else "anonymous"
+        # One timestamp per session, so a take's WAV, MP4 and sidecar share a name
+        timestamp = self.session_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Ensure recordings directory exists
+        os.makedirs(self.recordings_dir, exist_ok=True)
+
+        return os.path.join(self.recordings_dir, f"{safe_name}_{timestamp}{extension}")
+
+    def claim_recording_path(self):
+        """
+        Pick the session's timestamp and create its empty WAV file.
+
+        Stations sharing a recordings directory can start the same player in
+        the same second; creating the file exclusively makes the later one
+        move on to the next second instead of writing over the take.
+        """
+        now = datetime.now()
+        for offset in range(60):
+            self.session_timestamp = (now + timedelta(seconds=offset)).strftime("%Y%m%d_%H%M%S")
+            path = self.new_recording_path(".wav")
+            try:
+                with open(path, "x"):
+                    return path
+            except FileExistsError:
+                continue
+        raise RuntimeError(f"no free file name for {self.player_name} in {self.recordings_dir}")
+
+    def discard_recording(self):
+        """Remove the WAV file claimed for a take that is not saved"""
+        try:
+            os.remove(self.audio_filepath)
+        except OSError:
+            pass
+
+    def release_webcam(self):
+        """Give the session's webcam back to the device manager"""
+        if self.webcam is not None:
+            self.webcam = None
+            self.devices.release_camera()
+
+    def start_audio_capture(self):
+        """Start streaming microphone input to self.audio_filepath"""
+        # The stream callback feeds a ring buffer that a writer thread appends
+        # to the WAV file block by block, so nothing is held in memory. With
+        # the always-open input the file starts with the pre-roll.
+        audio_input = self.devices.audio_input
+        if audio_input is not None and not audio_input.active:
+            audio_input = None
+        auto_stop = None
+        if self.profile.auto_stop:
+            auto_stop = AutoStop(self.sample_rate, self.profile.min_duration, self.profile.hangover)
+        audio_capture = AudioCapture(self.audio_filepath, self.sample_rate, self.duration,
+                                     channels=1, input_stream=self.devices.input_stream,
+                                     audio_input=audio_input, dtype=self.profile.dtype,
+                                     auto_stop=auto_stop)
+        audio_capture.start()
+        self.audio_trigger_sample = audio_capture.trigger_sample
+        self.audio_capture = audio_capture
+        return audio_capture
+
+    def save_recording(self):
+        """Check the recorded WAV file and queue it for scoring and submission. Returns the job."""
+        try:
+            name = self.player_name
+
+            # The WAV file was already written while recording
+            filepath = self.audio_filepath
+            filename = os.path.basename(filepath)
+            if not os.path.exists(filepath) or os.path.getsize(filepath) <= 44:
+                self.discard_recording()
+                raise RuntimeError("no audio was captured")
+
+            # Where "go" was in the file, so scoring can skip most of the pre-roll,
+            # and where the audio and video sit on the session clock
+            trigger_sample = self.audio_trigger_sample
+            av_sync = {}
+            if self.audio_capture is not None and self.session_start is not None:
+                calibration = self.calibration or load_calibration(self.recordings_dir, self.station)
+                trigger_sample = aligned_trigger_sample(self.audio_capture, calibration["audio_latency"])
+                video_start = self.video_start_time if self.video_fps else None
+                av_sync = av_sync_metadata(self.session_start, self.audio_capture,
+                                           video_start, self.video_fps, calibration)
+            update_sidecar(filepath, player=name, profile=self.profile.name, sample_rate=self.sample_rate,
+                           trigger_sample=trigger_sample,
+                           stream_trigger_sample=self.audio_trigger_sample,
+                           preroll_seconds=self.audio_trigger_sample / self.sample_rate,
+                           av_sync=av_sync,
+                           telemetry=self.capture_telemetry)
+            video_saved = self.video_capture_path and os.path.exists(self.video_capture_path)
+            if video_saved:
+                # Renamed to the MP4 by the transcoder
+                update_sidecar(filepath, video=os.path.basename(self.video_capture_path))
+            if self.profile.audio_storage == "flac":
+                # Scoring and the indexes read the FLAC from here on
+                try:
+                    filepath = self.audio_filepath = compress(filepath)
+                    filename = os.path.basename(filepath)
+                except (RuntimeError, ValueError) as e:
+                    print(f"Keeping {filename} as WAV: {e}")
+
+            try:
+                self.manifest.record(filepath, player=name or "anonymous", station=self.station,
+                                     video_path=self.video_filepath if video_saved else None,
+                                     metrics=self.capture_telemetry, status="pending")
+            except Exception as e:
+                print("Recordings manifest not updated:", e)
+
+            saved_msg = f"✅ Saved {filename}"
+            if self.webcam_available:
+                if video_saved:
+                    saved_msg += f" (+ {os.path.basename(self.video_capture_path)})"
+                else:
+                    saved_msg += " (video recording may have failed)"
+            self.events.status(saved_msg)
+
+            # Duplicate check, scoring and submission run in the background so
+            # the next player can start right away
+            return self.scoring_pipeline.submit({
+                "name": name or "anonymous",
+                "filepath": filepath,
+                "recordings_dir": os.path.dirname(filepath),
+                "trigger_sample": trigger_sample,
+                "station": self.station,
+            })
+
+        except Exception as e:
+            self.events.status("❌ Save failed - check console")
+            self.events.error("Error", f"Failed to save recording: {str(e)}")
+            return None
+
+    def note_status(self, job, status, score=None):
+        """Record how far a take got in the manifest; scoring goes on if that fails"""
+        try:
+            self.manifest.set_status(job["filepath"], status, score)
+        except Exception as e:
+            print("Recordings manifest not updated:", e)
+
+    def screen_recording(self, job):
+        """Pipeline stage: refuse duplicates and replays of the real chirp"""
+        try:
+            from whoop_fingerprint import shared_index, screen_submission, ALREADY_SUBMITTED
+            real_wav = os.path.join(job["recordings_dir"], "real_chirp", "GW150914_L1_shiftedslower.wav")
+            fingerprint_index = shared_index(job["recordings_dir"], real_wav)
+            flag_reason = screen_submission(job["filepath"], fingerprint_index)
+        except Exception as e:
+            print("Fingerprint check unavailable:", e)
+            flag_reason = None
+
+        if flag_reason == ALREADY_SUBMITTED:
+            print(f"Recording not submitted again: {job['filepath']}")
+            job["outcome"] = "Already submitted"
+            return False
+        if flag_reason:
+            print(f"Recording not submitted: {flag_reason}")
+            job["outcome"] = f"⚠️ Not submitted: {flag_reason}"
+            self.note_status(job, "flagged")
+            return False
+        return True
+
+    def score_recording(self, job):
+        """Pipeline stage: score the recording with the service or whoop_gamescore.py"""
+        filepath = job["filepath"]
+        score_dict = None
+        scoring_url = os.environ.get("WHOOP_SCORING_URL")
+
+        import requests
+        if scoring_url:
+            # Send the freshly written take to the scoring service
+            with open(filepath, 'rb') as f:
+                wav_bytes = f.read()
+            response = requests.post(
+                scoring_url, data=wav_bytes,
+                params={"name": job["name"], "trigger_sample": job["trigger_sample"]},
+                headers={"Content-Type": "audio/flac" if filepath.endswith(".flac") else "audio/wav"},
+                timeout=self.scoring_timeout
+            )
+            if response.status_code == 200:
+                score_dict = response.json()
+                print("Scoring service output:", score_dict)
+            else:
+                print("Scoring service error:", response.text.strip())
+        else:
+            # Run whoop_gamescore.py on the saved WAV
+            result = subprocess.run(
+                ["python3", "whoop_gamescore.py", filepath],
+                capture_output=True, text=True, timeout=self.scoring_timeout
+            )
+
+            if result.returncode == 0:
+                # whoop_gamescore.py prints a dictionary like {"name": "Alice", "score": 87.0}
+                score_dict = eval(result.stdout.strip())
+                print("Whoop.py output:", score_dict)
+            else:
+                print("Whoop.py error:", result.stderr.strip())
+
+        if score_dict is None:
+            job["outcome"] = "❌ Scoring failed - check console"
+            self.note_status(job, "failed")
+            return False
+        job["score"] = score_dict
+        self.note_status(job, "scored", score_dict.get("score"))
+        return True
+
+    def submit_score(self, job):
+        """Pipeline stage: add similar players and queue the score for the leaderboard"""
+        score_dict = job["score"]
+
+        # Who sounds most like this player?
+        try:
+            from whoop_similarity import find_similar_players
+            score_dict["similar"] = find_similar_players(job["filepath"], job["recordings_dir"])
+        except Exception as e:
+            print("Similarity search unavailable:", e)
+
+        # Stored first, then sent to the Flask server in the background
+        self.outbox.add(score_dict)
+        print(f"Score {score_dict.get('score')} queued for the leaderboard")
+        job["outcome"] = f"🏆 Score {score_dict.get('score')} submitted"
+        self.note_status(job, "submitted", score_dict.get("score"))
+        return True
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+JSON sidecar files holding metadata about a recording.
+
+Everything the recorder knows about a take that does not fit in the WAV
+file itself (for example where in the file the player pressed start) is
+kept next to it as <recording>.json, so scoring and later tools can use it
+without parsing filenames.
+"""
+
+import os
+import json
+import threading
+
+# Recorders, pipeline stages and transcoders update sidecars from several threads
+_update_lock = threading.Lock()
+
+
+def sidecar_path(recording_path):
+    """Path of the sidecar file belonging to a WAV or MP4 recording."""
+    return os.path.splitext(str(recording_path))[0] + ".json"
+
+
+def read_sidecar(recording_path):
+    """Metadata stored for a recording, or an empty dict if there is none."""
+    try:
+        with open(sidecar_path(recording_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_sidecar(recording_path, **fields):
+    """Merge fields into a recording's sidecar file and return the result."""
+    with _update_lock:
+        metadata = read_sidecar(recording_path)
+        metadata.update(fields)
+        path = sidecar_path(recording_path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, path)
+    return metadata
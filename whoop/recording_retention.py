@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Retention rules and a disk quota for the recordings directory.
+
+A full-day event leaves hundreds of takes in recordings/, most of the space
+in their videos. The retention manager keeps the directory in bounds while
+never deleting a take's audio:
+
+- videos older than `downscale_video_after` are re-encoded at `video_width`
+  pixels wide, and older than `drop_video_after` deleted
+- takes older than `archive_after` move into one zip bundle per day,
+  recordings/archive/YYYY-MM-DD.zip, with 16-bit audio stored as FLAC
+- above `quota_bytes`, the oldest videos are deleted and then the oldest
+  days archived early (sessions younger than `protect_newer_than` are
+  left alone) until the directory fits
+
+Every rule is off unless it is asked for. Takes the recordings manifest
+(recordings_manifest.py) lists as not scored yet are never archived,
+whatever their age. recordings/archive/index.json lists every archived take
+with its bundle and sidecar, so archived takes can be read and rescored one
+by one without unpacking a bundle. Ages come from the files' modification
+times. Moved and deleted files are noted in the manifest if there is one.
+
+Usage:
+    python3 recording_retention.py recordings/ --quota 20      # keep it under 20 GB
+    python3 recording_retention.py recordings/ --downscale-after 6 --drop-video-after 48 --archive-after 24
+    python3 recording_retention.py recordings/ --list          # archived takes
+    python3 recording_retention.py recordings/ --rescore --real_wav path/to/chirp.wav
+    python3 kiosk.py --names queue.txt --quota 20               # between sessions
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from dataclasses import dataclass, field
+
+from audio_storage import is_audio_file, audio_aliases, compress, read_audio
+from recording_metadata import read_sidecar, sidecar_path, update_sidecar
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
+from video_transcode import transcode, lower_priority, ARCHIVE_EXTENSION, INTERMEDIATE_EXTENSION, \
+    DEFAULT_ARCHIVE_CODEC
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_INDEX_FILE = "index.json"
+VIDEO_EXTENSIONS = (ARCHIVE_EXTENSION, INTERMEDIATE_EXTENSION)
+HOUR = 3600  # seconds
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Manifest statuses of takes still waiting for or in scoring, or to be scored again
+UNSCORED_STATUSES = ("pending", "unscored", "failed")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """What to keep, for how long. Ages are in seconds; None (the default) turns a rule off."""
+    quota_bytes: "int | None" = None
+    downscale_video_after: "float | None" = None
+    video_width: int = 320  # pixels, for downscaled videos
+    drop_video_after: "float | None" = None
+    archive_after: "float | None" = None
+    protect_newer_than: float = HOUR  # the quota never touches younger sessions
+
+
+@dataclass
+class StoredSession:
+    """The files of one take in the recordings directory."""
+    stem: str  # path without extension
+    audio: "str | None" = None
+    videos: list = field(default_factory=list)  # archival MP4 first
+    modified: float = 0.0  # modification time of the audio, else of the video
+
+    @property
+    def day(self):
+        return datetime.fromtimestamp(self.modified).strftime("%Y-%m-%d")
+
+
+def find_sessions(recordings_dir):
+    """Sessions with audio or video directly in recordings_dir, oldest first."""
+    sessions = {}
+    for entry in sorted(os.listdir(recordings_dir)):
+        path = os.path.join(recordings_dir, entry)
+        stem, extension = os.path.splitext(path)
+        if stem.endswith(".part") or not os.path.isfile(path):
+            continue  # still being written
+        if is_audio_file(path):
+            sessions.setdefault(stem, StoredSession(stem)).audio = path
+        elif extension.lower() in VIDEO_EXTENSIONS:
+            sessions.setdefault(stem, StoredSession(stem)).videos.append(path)
+    for session in sessions.values():
+        session.videos.sort(key=lambda path: not path.lower().endswith(ARCHIVE_EXTENSION))
+        session.modified = os.path.getmtime(session.audio or session.videos[0])
+    return sorted(sessions.values(), key=lambda session: session.modified)
+
+
+def directory_size(path):
+    """Bytes used by the files under path."""
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(directory, filename))
+            except OSError:
+                pass  # removed meanwhile
+    return total
+
+
+def video_width(path):
+    """Frame width of a video file, 0 if it cannot be opened."""
+    import cv2
+    video = cv2.VideoCapture(path)
+    try:
+        return int(video.get(cv2.CAP_PROP_FRAME_WIDTH)) if video.isOpened() else 0
+    finally:
+        video.release()
+
+
+class ArchiveIndex:
+    """
+    The takes stored in the day bundles, in recordings/archive/index.json.
+
+    Entries are keyed by the file name inside the bundle and hold the
+    bundle, the take's sidecar and when it was archived.
+    """
+
+    def __init__(self, recordings_dir):
+        self.archive_dir = os.path.join(str(recordings_dir), ARCHIVE_DIR)
+        self.path = os.path.join(self.archive_dir, ARCHIVE_INDEX_FILE)
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, name):
+        """Entry of an archived take by file name (WAV or FLAC), or None."""
+        for alias in audio_aliases(os.path.basename(str(name))):
+            if alias in self.entries:
+                return alias, self.entries[alias]
+        return None
+
+    def bundle_path(self, entry):
+        return os.path.join(self.archive_dir, entry["bundle"])
+
+    def read(self, name):
+        """Decode one archived take. Returns (rate, data) like read_audio."""
+        found = self.find(name)
+        if found is None:
+            raise KeyError(f"{name} is not archived")
+        member, entry = found
+        with zipfile.ZipFile(self.bundle_path(entry)) as bundle:
+            return read_audio(io.BytesIO(bundle.read(member)))
+
+    def save(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.archive_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _note_video(session, index, **fields):
+    """Record a change to a session's video in its sidecar, wherever that is."""
+    if os.path.exists(session.stem + ".json"):
+        update_sidecar(session.stem + ".wav", **fields)
+    else:
+        found = index.find(session.stem + ".wav")
+        if found is not None:
+            found[1]["sidecar"].update(fields)
+
+
+def downscale_video(session, width, index):
+    """Re-encode a session's video at `width` pixels wide. Returns the bytes freed."""
+    before = sum(os.path.getsize(path) for path in session.videos)
+    target = session.stem + ARCHIVE_EXTENSION
+    transcode(session.videos[0], target, DEFAULT_ARCHIVE_CODEC, width=width)
+    for path in session.videos:
+        if path != target:
+            os.remove(path)
+    session.videos = [target]
+    _note_video(session, index, video=os.path.basename(target), video_width=width)
+    return before - os.path.getsize(target)
+
+
+def drop_video(session, index):
+    """Delete a session's video, keeping its audio. Returns the bytes freed."""
+    freed = 0
+    for path in session.videos:
+        freed += os.path.getsize(path)
+        os.remove(path)
+    session.videos = []
+    _note_video(session, index, video=None, video_dropped=True)
+    return freed
+
+
+def _bundle_audio(path, scratch):
+    """(file name, bytes, zip compression) to store a take's audio with."""
+    if path.lower().endswith(".wav"):
+        try:
+            # Lossless and several times smaller than deflating the WAV
+            flac = compress(path, os.path.join(scratch, os.path.basename(os.path.splitext(path)[0]) + ".flac"),
+                            keep_wav=True)
+            with open(flac, "rb") as f:
+                return os.path.basename(flac), f.read(), zipfile.ZIP_STORED
+        except (ValueError, RuntimeError):
+            pass  # e.g. 32-bit samples: deflate the WAV instead
+    with open(path, "rb") as f:
+        compression = zipfile.ZIP_STORED if path.lower().endswith(".flac") else zipfile.ZIP_DEFLATED
+        return os.path.basename(path), f.read(), compression
+
+
+def _write_bundle(bundle, members):
+    """Add members {name: (bytes, compression)} to a zip, replacing it only once complete."""
+    partial = bundle + ".part"
+    with zipfile.ZipFile(partial, "w") as out:
+        if os.path.exists(bundle):
+            with zipfile.ZipFile(bundle) as old:
+                for info in old.infolist():
+                    if info.filename not in members:
+                        out.writestr(info, old.read(info.filename))
+        for name, (data, compression) in members.items():
+            out.writestr(name, data, compress_type=compression)
+    os.replace(partial, bundle)
+
+
+def archive_sessions(sessions, index):
+    """
+    Move the audio and sidecars of sessions into their day bundles.
+
+    The bundles and the index are written before anything is deleted, so
+    an interrupted run loses nothing. Returns the bytes freed.
+    """
+    by_day = {}
+    for session in sessions:
+        if session.audio:
+            by_day.setdefault(session.day, []).append(session)
+    freed = 0
+    os.makedirs(index.archive_dir, exist_ok=True)
+    for day, day_sessions in sorted(by_day.items()):
+        bundle_name = f"{day}.zip"
+        members, entries = {}, {}
+        with tempfile.TemporaryDirectory(dir=index.archive_dir) as scratch:
+            for session in day_sessions:
+                name, data, compression = _bundle_audio(session.audio, scratch)
+                sidecar = read_sidecar(session.audio)
+                members[name] = (data, compression)
+                if sidecar:
+                    members[os.path.splitext(name)[0] + ".json"] = (json.dumps(sidecar, indent=2).encode(),
+                                                                    zipfile.ZIP_DEFLATED)
+                entries[name] = {"bundle": bundle_name, "day": day, "bytes": len(data),
+                                 "archived_at": time.time(), "sidecar": sidecar}
+        _write_bundle(os.path.join(index.archive_dir, bundle_name), members)
+        index.entries.update(entries)
+        index.save()
+        for session in day_sessions:
+            freed += os.path.getsize(session.audio)
+            os.remove(session.audio)
+            if os.path.exists(sidecar_path(session.audio)):
+                freed += os.path.getsize(sidecar_path(session.audio))
+                os.remove(sidecar_path(session.audio))
+            session.audio = None
+        freed -= sum(len(data) for data, _ in members.values())
+    return freed
+
+
+def unscored_sessions(recordings_dir):
+    """Keys of the sessions the recordings manifest lists as not scored yet."""
+    manifest_path = os.path.join(recordings_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return set()
+    manifest = RecordingsManifest(manifest_path)
+    try:
+        return {row["session"] for status in UNSCORED_STATUSES for row in manifest.sessions(status)}
+    finally:
+        manifest.close()
+
+
+def enforce(recordings_dir, policy=None, now=None):
+    """
+    Apply the retention rules and the quota to a recordings directory.
+
+    Returns a report: the sessions downscaled, stripped of video and
+    archived, the bytes used before and after, and whether the directory
+    is still over the quota (only audio younger than protect_newer_than or
+    not scored yet is left then).
+    """
+    policy = policy or RetentionPolicy()
+    now = time.time() if now is None else now
+    index = ArchiveIndex(recordings_dir)
+    report = {"downscaled": [], "videos_dropped": [], "archived": [],
+              "bytes_before": directory_size(recordings_dir)}
+
+    moved = {}  # session stem -> manifest fields
+    unscored = unscored_sessions(recordings_dir)
+
+    def archivable(session):
+        # Scoring reads the take from where it was saved
+        return session.audio and os.path.basename(session.stem) not in unscored
+
+    def drop(session):
+        report["videos_dropped"].append(os.path.basename(session.stem))
+        moved.setdefault(session.stem, {})["video_path"] = None
+        return drop_video(session, index)
+
+    def archive(sessions):
+        report["archived"].extend(os.path.basename(session.stem) for session in sessions)
+        for session in sessions:
+            moved.setdefault(session.stem, {}).update(
+                audio_path=None, archived_in=os.path.join(index.archive_dir, f"{session.day}.zip"))
+        return archive_sessions(sessions, index)
+
+    # Rules by age
+    sessions = find_sessions(recordings_dir)
+    for session in sessions:
+        age = now - session.modified
+        if not session.videos:
+            continue
+        if policy.drop_video_after is not None and age >= policy.drop_video_after:
+            drop(session)
+        elif policy.downscale_video_after is not None and age >= policy.downscale_video_after \
+                and video_width(session.videos[0]) > policy.video_width:
+            try:
+                downscale_video(session, policy.video_width, index)
+                report["downscaled"].append(os.path.basename(session.stem))
+                moved.setdefault(session.stem, {})["video_path"] = session.videos[0]
+            except RuntimeError as e:
+                print(f"⚠️  Could not downscale {session.videos[0]}: {e}")
+    if policy.archive_after is not None:
+        due = [session for session in sessions if archivable(session) and now - session.modified >= policy.archive_after]
+        if due:
+            archive(due)
+
+    # The quota: oldest videos first, then the oldest days' audio
+    usage = directory_size(recordings_dir)
+    if policy.quota_bytes is not None and usage > policy.quota_bytes:
+        candidates = [session for session in find_sessions(recordings_dir)
+                      if now - session.modified >= policy.protect_newer_than]
+        for session in candidates:
+            if usage <= policy.quota_bytes:
+                break
+            if session.videos:
+                usage -= drop(session)
+        days = sorted({session.day for session in candidates if archivable(session)})
+        for day in days:
+            if usage <= policy.quota_bytes:
+                break
+            usage -= archive([session for session in candidates if archivable(session) and session.day == day])
+
+    if index.entries:
+        index.save()  # video changes of archived takes
+    manifest_path = os.path.join(recordings_dir, MANIFEST_FILE)
+    if moved and os.path.exists(manifest_path):
+        manifest = RecordingsManifest(manifest_path)
+        try:
+            for stem, fields in moved.items():
+                if manifest.get(stem) is not None:
+                    manifest.update(stem, **fields)
+        finally:
+            manifest.close()
+    report["bytes_after"] = directory_size(recordings_dir)
+    report["over_quota"] = policy.quota_bytes is not None and report["bytes_after"] > policy.quota_bytes
+    return report
+
+
+def rescore_archived(recordings_dir, real_wav, names=None):
+    """
+    Score archived takes straight from their bundles.
+
+    Returns a list of {"name", "file", "score"}; names limits it to some
+    file names. Each bundle is opened once and only the takes asked for
+    are decompressed.
+    """
+    from whoop_gamescore import compare_mimic_data, get_player_name
+    index = ArchiveIndex(recordings_dir)
+    rate_real, data_real = read_audio(real_wav)
+    members = sorted(index.entries) if names is None else [found[0] for found in map(index.find, names) if found]
+    by_bundle = {}
+    for member in members:
+        by_bundle.setdefault(index.entries[member]["bundle"], []).append(member)
+    results = []
+    for bundle_name, bundle_members in sorted(by_bundle.items()):
+        with zipfile.ZipFile(os.path.join(index.archive_dir, bundle_name)) as bundle:
+            for member in bundle_members:
+                rate, data = read_audio(io.BytesIO(bundle.read(member)))
+                trigger_sample = index.entries[member]["sidecar"].get("trigger_sample")
+                score = compare_mimic_data(data, rate, data_real, rate_real, trigger_sample=trigger_sample)
+                name = index.entries[member]["sidecar"].get("player") or get_player_name(member)
+                results.append({"name": name, "file": member, "score": score})
+    return results
+
+
+def policy_arguments(policy):
+    """Command-line options of this script that give `policy`."""
+    def hours(seconds):
+        return "off" if seconds is None else f"{seconds / HOUR:g}"
+    arguments = ["--downscale-after", hours(policy.downscale_video_after),
+                 "--video-width", str(policy.video_width),
+                 "--drop-video-after", hours(policy.drop_video_after),
+                 "--archive-after", hours(policy.archive_after),
+                 "--protect", hours(policy.protect_newer_than)]
+    if policy.quota_bytes is not None:
+        arguments += ["--quota", repr(policy.quota_bytes / 1e9)]
+    return arguments
+
+
+class BackgroundRetention:
+    """
+    Runs this script on a recordings directory in a low-priority child
+    process, e.g. between kiosk sessions; kick() starts a run unless one
+    is still going.
+    """
+
+    def __init__(self, recordings_dir, policy=None):
+        self.recordings_dir = recordings_dir
+        self.policy = policy or RetentionPolicy()
+        self._process = None
+
+    def kick(self):
+        """Start a run; returns False if the previous one has not finished."""
+        if self._process is not None and self._process.poll() is None:
+            return False
+        command = [sys.executable, os.path.join(HERE, "recording_retention.py"), self.recordings_dir,
+                   *policy_arguments(self.policy)]
+        options = {}
+        if platform.system() == "Windows":
+            options["creationflags"] = subprocess.IDLE_PRIORITY_CLASS
+        self._process = subprocess.Popen(command, **options)
+        return True
+
+    def wait(self, timeout=None):
+        """Wait for the current run. Returns its exit code, None if none ran."""
+        return None if self._process is None else self._process.wait(timeout)
+
+
+def hours_or_off(text):
+    return None if text.lower() in ("off", "never", "none") else float(text) * HOUR
+
+
+def main():
+    defaults = RetentionPolicy()
+    parser = argparse.ArgumentParser(description="Keep the recordings directory within its retention rules and quota")
+    parser.add_argument("recordings_dir", help="Directory of recordings")
+    parser.add_argument("--quota", type=float, help="Disk quota in GB for the whole directory")
+    parser.add_argument("--downscale-after", type=hours_or_off, default=defaults.downscale_video_after,
+                        help="Hours after which videos are downscaled (default off)")
+    parser.add_argument("--video-width", type=int, default=defaults.video_width, help="Width of downscaled videos")
+    parser.add_argument("--drop-video-after", type=hours_or_off, default=defaults.drop_video_after,
+                        help="Hours after which videos are deleted, the audio is kept (default off)")
+    parser.add_argument("--archive-after", type=hours_or_off, default=defaults.archive_after,
+                        help="Hours after which takes move into the day bundles (default off)")
+    parser.add_argument("--protect", type=hours_or_off, default=defaults.protect_newer_than,
+                        help="Hours during which the quota leaves a session alone")
+    parser.add_argument("--list", action="store_true", help="List the archived takes")
+    parser.add_argument("--rescore", action="store_true", help="Score the archived takes from their bundles")
+    parser.add_argument("--real_wav", default="recordings/real_chirp/GW150914_L1_shiftedslower.wav",
+                        help="Path to the real chirp .wav file, for --rescore")
+    args = parser.parse_args()
+
+    if args.list:
+        index = ArchiveIndex(args.recordings_dir)
+        for member, entry in sorted(index.entries.items()):
+            print(f"{entry['bundle']}  {member}  {entry['bytes'] / 1e3:.0f} kB")
+        print(f"{len(index)} archived take(s)")
+        return index
+    if args.rescore:
+        results = rescore_archived(args.recordings_dir, args.real_wav)
+        for result in sorted(results, key=lambda r: r["score"], reverse=True):
+            print(f"{result['score']:6.1f}  {result['file']}")
+        return results
+
+    if args.quota is None and args.downscale_after is args.drop_video_after is args.archive_after is None:
+        print("⚠️  No quota or retention rule given, nothing to do")
+        return None
+    lower_priority()
+    policy = RetentionPolicy(
+        quota_bytes=None if args.quota is None else int(args.quota * 1e9),
+        downscale_video_after=args.downscale_after, video_width=args.video_width,
+        drop_video_after=args.drop_video_after, archive_after=args.archive_after,
+        protect_newer_than=args.protect or 0.0)
+    report = enforce(args.recordings_dir, policy)
+    print(f"✅ Retention: {len(report['downscaled'])} video(s) downscaled, "
+          f"{len(report['videos_dropped'])} dropped, {len(report['archived'])} take(s) archived; "
+          f"{report['bytes_before'] / 1e6:.1f} MB -> {report['bytes_after'] / 1e6:.1f} MB")
+    if report["over_quota"]:
+        print(f"❌ {args.recordings_dir} is still over its {args.quota:g} GB quota: "
+              f"only recent takes and archived audio are left")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+SQLite manifest of the recordings directory.
+
+recordings/manifest.sqlite3 holds one row per session: the player's name as
+typed (so "Thomas_Lars (Maastricht)" survives, which splitting the file
+name on "_" cannot do), station, time, audio and video paths, duration,
+sample rate, a SHA-256 of the decoded audio, the capture telemetry and the
+score status. The recorder writes the row when it saves a take and updates
+the status as the take is screened, scored and submitted.
+
+Every change to a row stamps it with the next value of a change counter
+(seq), and consumers remember the last seq they handled, so "what is new
+since the last run" is an index range query costing O(changes), not a
+rescan of every file. Takes that arrive without the recorder (copied in,
+wetransfer dumps) are picked up by scan(), which skips the directory
+entirely when its modification time has not changed and otherwise only
+reads the files it does not know yet.
+
+Usage:
+    python3 recordings_manifest.py                   # scan recordings/ and count sessions by status
+    python3 recordings_manifest.py recordings/ --list
+    python3 recordings_manifest.py --since-last-run report   # what changed since the last report run
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+import numpy as np
+
+from audio_storage import AUDIO_EXTENSIONS, is_audio_file, audio_info, audio_aliases, read_audio
+from recording_metadata import read_sidecar
+from video_transcode import ARCHIVE_EXTENSION, INTERMEDIATE_EXTENSION
+
+MANIFEST_FILE = "manifest.sqlite3"
+# pending: saved, waiting in the scoring pipeline; unscored: found by scan()
+STATUSES = ("pending", "unscored", "flagged", "failed", "scored", "submitted")
+COLUMNS = ("player", "station", "recorded_at", "audio_path", "video_path", "archived_in", "duration",
+           "sample_rate", "content_hash", "size", "mtime", "metrics", "score", "status")
+SESSION_EXTENSIONS = (*AUDIO_EXTENSIONS, ARCHIVE_EXTENSION, INTERMEDIATE_EXTENSION, ".json")
+# A take pending for longer was left behind by a recorder that stopped
+STALE_PENDING_AFTER = 30 * 60  # seconds
+
+
+def session_key(path):
+    """A session's key: its file name without extension, shared by audio, video and sidecar."""
+    name = os.path.basename(str(path))
+    stem, extension = os.path.splitext(name)
+    # A key itself may contain dots ("Dr. No_20250101_120000")
+    return stem if extension.lower() in SESSION_EXTENSIONS else name
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def audio_hash(path):
+    """
+    SHA-256 of a recording's sample rate, format and samples, so a take
+    stored as WAV or as FLAC has the same hash. Files that cannot be
+    decoded are hashed as they are.
+    """
+    try:
+        rate, data = read_audio(path)
+    except Exception:
+        return file_hash(path)
+    digest = hashlib.sha256(f"{rate} {data.dtype.str} {data.shape}\n".encode())
+    digest.update(np.ascontiguousarray(data))
+    return digest.hexdigest()
+
+
+def recorded_time(path, default=None):
+    """When a take was recorded, from the _YYYYMMDD_HHMMSS ending of its name (else default)."""
+    try:
+        return datetime.strptime("_".join(session_key(path).split("_")[-2:]), "%Y%m%d_%H%M%S").timestamp()
+    except ValueError:
+        return default
+
+
+class RecordingsManifest:
+    """
+    The sessions in a recordings directory, in a SQLite file.
+
+    record() adds or refreshes a session from its audio file, update() and
+    set_status() change its fields, and changes_since() / new_since_last_run()
+    return the sessions changed after a point, oldest change first. Paths
+    are stored relative to the manifest's directory and returned absolute.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.directory = os.path.dirname(os.path.abspath(self.path))
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Autocommit, with explicit BEGIN IMMEDIATE so seq is unique across processes
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                              id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              session TEXT NOT NULL UNIQUE,
+                              player TEXT,
+                              station TEXT,
+                              recorded_at REAL,
+                              audio_path TEXT,
+                              video_path TEXT,
+                              archived_in TEXT,
+                              duration REAL,
+                              sample_rate INTEGER,
+                              content_hash TEXT,
+                              size INTEGER,
+                              mtime REAL,
+                              metrics TEXT,
+                              score REAL,
+                              status TEXT NOT NULL DEFAULT 'unscored',
+                              updated_at REAL NOT NULL,
+                              seq INTEGER NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_seq ON sessions (seq)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_player ON sessions (player)")
+            db.execute("CREATE TABLE IF NOT EXISTS cursors (consumer TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db = db
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ---- paths ----
+
+    def _relative(self, path):
+        return None if path is None else os.path.relpath(os.path.abspath(str(path)), self.directory)
+
+    def _absolute(self, path):
+        return None if path is None else os.path.join(self.directory, path)
+
+    def _row(self, cursor, values):
+        row = {description[0]: value for description, value in zip(cursor.description, values)}
+        for column in ("audio_path", "video_path", "archived_in"):
+            if column in row:
+                row[column] = self._absolute(row[column])
+        if row.get("metrics"):
+            row["metrics"] = json.loads(row["metrics"])
+        return row
+
+    # ---- writing ----
+
+    def _write(self, db, session, fields):
+        """Insert or update a session's fields and stamp it with the next seq (inside a transaction)."""
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown manifest fields: {', '.join(sorted(unknown))}")
+        if "status" in fields and fields["status"] not in STATUSES:
+            raise ValueError(f"Unknown status {fields['status']!r}, expected one of {', '.join(STATUSES)}")
+        fields = dict(fields)
+        for column in ("audio_path", "video_path", "archived_in"):
+            if column in fields:
+                fields[column] = self._relative(fields[column])
+        if fields.get("metrics") is not None:
+            fields["metrics"] = json.dumps(fields["metrics"])
+        seq = db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM sessions").fetchone()[0]
+        fields.update(updated_at=time.time(), seq=seq)
+        names = ", ".join(fields)
+        marks = ", ".join("?" * len(fields))
+        updates = ", ".join(f"{name} = excluded.{name}" for name in fields)
+        db.execute(f"INSERT INTO sessions (session, {names}) VALUES (?, {marks}) "
+                   f"ON CONFLICT (session) DO UPDATE SET {updates}", (session, *fields.values()))
+        return seq
+
+    def update(self, session, **fields):
+        """Set fields of a session (a key or any of its paths), creating it if needed. Returns its seq."""
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._write(db, session_key(session), fields)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return seq
+
+    def set_status(self, session, status, score=None):
+        """Record how far a session got: screened out, scored or submitted (with its score)."""
+        fields = {"status": status}
+        if score is not None:
+            fields["score"] = score
+        return self.update(session, **fields)
+
+    def release_stale(self, older_than=STALE_PENDING_AFTER):
+        """
+        Put sessions "pending" for more than older_than seconds back to
+        "unscored", where submit_all_recordings.py and the ingest service
+        pick them up: their recorder crashed or was killed before scoring
+        them. Returns the keys of the sessions released.
+        """
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                keys = [key for (key,) in db.execute("SELECT session FROM sessions WHERE status = 'pending' "
+                                                     "AND updated_at < ? ORDER BY seq",
+                                                     (time.time() - older_than,))]
+                for key in keys:
+                    self._write(db, key, {"status": "unscored"})
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return keys
+
+    def _file_fields(self, audio_path):
+        """What record() reads from an audio file: sizes, header and hash."""
+        stat = os.stat(audio_path)
+        try:
+            sample_rate, frames = audio_info(audio_path)
+            duration = frames / sample_rate
+        except Exception:
+            sample_rate = duration = None  # unreadable; still listed
+        return {"audio_path": audio_path, "size": stat.st_size, "mtime": stat.st_mtime,
+                "sample_rate": sample_rate, "duration": duration, "content_hash": audio_hash(audio_path),
+                "recorded_at": recorded_time(audio_path, stat.st_mtime)}
+
+    def record(self, audio_path, **fields):
+        """
+        Add or refresh the session of an audio file. fields (player, station,
+        video_path, metrics, status, ...) override what is read from the file;
+        a session whose audio changed goes back to "unscored" unless a status
+        is given. A take only converted between WAV and FLAC keeps its status
+        and score.
+        """
+        values = self._file_fields(audio_path)
+        values.update(fields)
+        key = session_key(audio_path)
+        previous = self.get(key)
+        converted = previous is not None and previous["audio_path"] is not None and \
+            os.path.abspath(previous["audio_path"]) in audio_aliases(os.path.abspath(str(audio_path)))
+        if previous is not None and "status" not in fields and not converted \
+                and previous["content_hash"] != values["content_hash"]:
+            values.update(status="unscored", score=None)
+        return self.update(key, **values)
+
+    # ---- reading ----
+
+    def get(self, session):
+        """A session's row as a dict, or None."""
+        with self._lock:
+            cursor = self._connect().execute("SELECT * FROM sessions WHERE session = ?", (session_key(session),))
+            values = cursor.fetchone()
+            return None if values is None else self._row(cursor, values)
+
+    def sessions(self, status=None):
+        """Every session (or those with a status), oldest recording first."""
+        query, params = "SELECT * FROM sessions", ()
+        if status is not None:
+            query, params = query + " WHERE status = ?", (status,)
+        with self._lock:
+            cursor = self._connect().execute(query + " ORDER BY recorded_at, id", params)
+            return [self._row(cursor, values) for values in cursor.fetchall()]
+
+    def last_seq(self):
+        """seq of the latest change (0 for an empty manifest)."""
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(MAX(seq), 0) FROM sessions").fetchone()[0]
+
+    def changes_since(self, seq, limit=None):
+        """Sessions changed after seq, in the order they changed."""
+        with self._lock:
+            cursor = self._connect().execute("SELECT * FROM sessions WHERE seq > ? ORDER BY seq LIMIT ?",
+                                             (seq, -1 if limit is None else limit))
+            return [self._row(cursor, values) for values in cursor.fetchall()]
+
+    def cursor(self, consumer):
+        """The last seq a consumer has handled (0 if it never ran)."""
+        with self._lock:
+            found = self._connect().execute("SELECT seq FROM cursors WHERE consumer = ?", (consumer,)).fetchone()
+            return found[0] if found else 0
+
+    def set_cursor(self, consumer, seq):
+        """Remember that a consumer has handled every change up to seq."""
+        with self._lock:
+            self._connect().execute("INSERT INTO cursors (consumer, seq) VALUES (?, ?) "
+                                    "ON CONFLICT (consumer) DO UPDATE SET seq = excluded.seq", (consumer, seq))
+
+    def new_since_last_run(self, consumer):
+        """
+        (sessions changed since consumer's last run, seq to pass to
+        set_cursor once they are handled). A run that fails before
+        set_cursor sees the same sessions again next time.
+        """
+        changes = self.changes_since(self.cursor(consumer))
+        return changes, changes[-1]["seq"] if changes else self.cursor(consumer)
+
+    # ---- files not written by the recorder ----
+
+    def scan(self, recordings_dir=None):
+        """
+        Add the audio files in recordings_dir the manifest does not know,
+        and forget the audio of sessions whose file has gone. Returns the
+        number of sessions changed.
+
+        The directory is only listed if its modification time changed since
+        the last scan (files being added, removed or renamed), and only new
+        files are read and hashed.
+        """
+        recordings_dir = recordings_dir or self.directory
+        listed_at = str(os.stat(recordings_dir).st_mtime_ns)
+        key = f"scan_mtime:{os.path.abspath(recordings_dir)}"
+        with self._lock:
+            found = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if found and found[0] == listed_at:
+            return 0
+
+        present = {entry for entry in os.listdir(recordings_dir)
+                   if is_audio_file(entry) and not session_key(entry).endswith(".part")}
+        prefix = self._relative(recordings_dir)
+        prefix = "" if prefix == "." else prefix + os.sep
+        with self._lock:
+            known = dict(self._connect().execute(
+                "SELECT audio_path, session FROM sessions WHERE audio_path IS NOT NULL").fetchall())
+        known = {path[len(prefix):]: session for path, session in known.items()
+                 if path.startswith(prefix) and os.sep not in path[len(prefix):]}
+
+        changed, added = 0, set()
+        for entry in sorted(present - set(known)):
+            path = os.path.join(recordings_dir, entry)
+            fields = found_session_fields(path)
+            if self.get(path) is None:
+                fields["status"] = "unscored"
+            try:
+                self.record(path, **fields)
+            except OSError:
+                continue  # gone again
+            added.add(session_key(entry))
+            changed += 1
+        for entry in sorted(set(known) - present):
+            if known[entry] in added:
+                continue  # e.g. a WAV since compressed to FLAC
+            self.update(known[entry], audio_path=None)
+            changed += 1
+
+        with self._lock:
+            self._connect().execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, listed_at))
+        return changed
+
+
+def found_session_fields(path):
+    """Manifest fields of a take the recorder did not save, from its sidecar and file name."""
+    sidecar = read_sidecar(path)
+    fields = {"player": sidecar.get("player"), "metrics": sidecar.get("telemetry")}
+    if not fields["player"]:
+        from whoop_gamescore import get_player_name
+        fields["player"] = get_player_name(path)
+    if sidecar.get("telemetry", {}).get("station"):
+        fields["station"] = sidecar["telemetry"]["station"]
+    if sidecar.get("video"):
+        fields["video_path"] = os.path.join(os.path.dirname(path), sidecar["video"])
+    return fields
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a recordings directory into its manifest and list it")
+    parser.add_argument("recordings_dir", nargs="?", default="recordings", help="Recordings directory")
+    parser.add_argument("--list", action="store_true", help="List every session")
+    parser.add_argument("--since-last-run", metavar="NAME",
+                        help="List the sessions changed since the last run with this name, and remember this one")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.recordings_dir):
+        print(f"❌ Recordings folder not found: {args.recordings_dir}")
+        return None
+    manifest = RecordingsManifest(os.path.join(args.recordings_dir, MANIFEST_FILE))
+    try:
+        started = time.perf_counter()
+        changed = manifest.scan()
+        print(f"✅ Scanned {args.recordings_dir} in {(time.perf_counter() - started) * 1000:.0f} ms, "
+              f"{changed} session(s) added or changed")
+
+        if args.since_last_run:
+            rows, seq = manifest.new_since_last_run(args.since_last_run)
+            manifest.set_cursor(args.since_last_run, seq)
+        else:
+            rows = manifest.sessions()
+        if args.list or args.since_last_run:
+            for row in rows:
+                score = "" if row["score"] is None else f" {row['score']}"
+                duration = "?" if row["duration"] is None else f"{row['duration']:.1f} s"
+                print(f"   {row['player']}: {row['session']} ({duration}, {row['status']}{score})")
+
+        counts = {}
+        for row in manifest.sessions():
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+        print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "No sessions")
+        return rows
+    finally:
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
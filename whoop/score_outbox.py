@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Durable outbox for leaderboard submissions.
+
+A score is written to <recordings>/score_outbox.sqlite3 before anything is
+sent, so a leaderboard that is down or restarting loses nothing: the score
+waits in the outbox until it is delivered. A background sender posts the
+pending scores in batches over one keep-alive requests.Session, backing
+off exponentially while the server is unreachable, and marks them sent
+once the server has answered. Submitting a score therefore costs one local
+write, not an HTTP round trip.
+
+Every score carries a submission_id, so a batch that is sent again (the
+server stored it but the answer was lost, or two recorders share an
+outbox) is only counted once by server.py. Servers without the batch
+endpoint (/submit-scores) get the scores one at a time.
+
+Usage:
+    python3 score_outbox.py                      # what is waiting in recordings/
+    python3 score_outbox.py --flush              # send it now
+    python3 score_outbox.py path/to/score_outbox.sqlite3 --server-url http://host:5000/submit-score
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import threading
+
+OUTBOX_FILE = "score_outbox.sqlite3"
+SERVER_URL = "http://127.0.0.1:5000/submit-score"
+KEEP_SENT_SECONDS = 7 * 24 * 3600  # delivered scores are kept this long for reference
+
+
+def batch_url(server_url):
+    """Batch endpoint next to a /submit-score URL (None if there is none)."""
+    return server_url + "s" if server_url.rstrip("/").endswith("/submit-score") else None
+
+
+class ScoreOutbox:
+    """
+    Scores waiting for the leaderboard, in a SQLite file.
+
+    add(score) stores a score and wakes the sender started by start();
+    flush(timeout) sends everything now, in the caller's thread. close()
+    stops the sender; whatever could not be sent stays in the file and
+    goes out the next time an outbox on it is started.
+    """
+
+    def __init__(self, path, server_url=SERVER_URL, batch_size=20, timeout=10,
+                 retry_delay=1.0, max_retry_delay=60.0):
+        self.path = str(path)
+        self.server_url = server_url
+        self.batch_size = batch_size
+        self.timeout = timeout  # seconds per HTTP request
+        self.retry_delay = retry_delay  # seconds after the first failure, doubled each time
+        self.max_retry_delay = max_retry_delay
+        self.stats = {"sent": 0, "requests": 0, "failures": 0}
+        self.last_error = None
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._send_lock = threading.Lock()  # one batch in flight at a time
+        self._session = None
+        self._use_batches = batch_url(server_url) is not None
+        self._failures = 0  # consecutive failed sends
+        self._retry_at = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- storage ----
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=FULL")  # a stored score survives a power cut
+            db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+                              id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              submission_id TEXT NOT NULL UNIQUE,
+                              payload TEXT NOT NULL,
+                              created_at REAL NOT NULL,
+                              attempts INTEGER NOT NULL DEFAULT 0,
+                              last_error TEXT,
+                              sent_at REAL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent_at, id)")
+            db.execute("DELETE FROM outbox WHERE sent_at < ?", (time.time() - KEEP_SENT_SECONDS,))
+            db.commit()
+            self._db = db
+        return self._db
+
+    def add(self, score):
+        """Store a score for the leaderboard and return its submission_id."""
+        score = dict(score)
+        score.setdefault("submission_id", uuid.uuid4().hex)
+        with self._db_lock:
+            db = self._connect()
+            db.execute("INSERT OR IGNORE INTO outbox (submission_id, payload, created_at) VALUES (?, ?, ?)",
+                       (score["submission_id"], json.dumps(score), time.time()))
+            db.commit()
+        self._wake.set()
+        return score["submission_id"]
+
+    def pending(self):
+        """Number of scores not yet delivered."""
+        with self._db_lock:
+            return self._connect().execute("SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL").fetchone()[0]
+
+    def pending_scores(self, limit=None):
+        """The undelivered scores, oldest first, as dicts with their attempts and last error."""
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT id, payload, created_at, attempts, last_error FROM outbox "
+                "WHERE sent_at IS NULL ORDER BY id LIMIT ?", (-1 if limit is None else limit,)).fetchall()
+        return [{"id": row_id, "score": json.loads(payload), "created_at": created_at,
+                 "attempts": attempts, "last_error": last_error}
+                for row_id, payload, created_at, attempts, last_error in rows]
+
+    def _mark(self, ids, error=None):
+        marks = ",".join("?" * len(ids))
+        with self._db_lock:
+            db = self._connect()
+            if error is None:
+                db.execute(f"UPDATE outbox SET sent_at = ?, attempts = attempts + 1, last_error = NULL "
+                           f"WHERE id IN ({marks})", (time.time(), *ids))
+            else:
+                db.execute(f"UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id IN ({marks})",
+                           (error, *ids))
+            db.commit()
+
+    # ---- sending ----
+
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            # One kept-alive connection is all a trickle of batches needs
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._session = session
+        return self._session
+
+    def _post(self, scores):
+        """Deliver scores to the server; raises on failure."""
+        session = self._get_session()
+        if self._use_batches:
+            self.stats["requests"] += 1
+            response = session.post(batch_url(self.server_url), json=scores, timeout=self.timeout)
+            if response.status_code not in (404, 405):
+                response.raise_for_status()
+                return
+            print("Leaderboard has no batch endpoint, submitting scores one at a time")
+            self._use_batches = False
+        for score in scores:
+            self.stats["requests"] += 1
+            session.post(self.server_url, json=score, timeout=self.timeout).raise_for_status()
+
+    def send_batch(self):
+        """
+        Send the oldest pending scores (up to batch_size).
+
+        Returns the number delivered, 0 if nothing was pending; raises the
+        error if the server could not be reached.
+        """
+        with self._send_lock:
+            batch = self.pending_scores(self.batch_size)
+            if not batch:
+                return 0
+            ids = [entry["id"] for entry in batch]
+            try:
+                self._post([entry["score"] for entry in batch])
+            except Exception as e:
+                self._mark(ids, error=str(e))
+                self.stats["failures"] += 1
+                self.last_error = str(e)
+                raise
+            self._mark(ids)
+            self.stats["sent"] += len(ids)
+            return len(ids)
+
+    def flush(self, timeout=None):
+        """Send every pending score now; True if the outbox is empty afterwards."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                if self.send_batch() == 0:
+                    self._failures = 0
+                    return True
+            except Exception:
+                return False
+        return self.pending() == 0
+
+    def _next_delay(self):
+        """Seconds to wait after another failed send: exponential, with some jitter."""
+        self._failures += 1
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self._failures - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = None
+            if time.monotonic() >= self._retry_at:
+                try:
+                    if self.send_batch():
+                        self._failures = 0
+                        continue  # there may be more
+                    self._failures = 0
+                except Exception as e:
+                    delay = self._next_delay()
+                    self._retry_at = time.monotonic() + delay
+                    print(f"Leaderboard unreachable ({e}); {self.pending()} score(s) kept, retrying in {delay:.1f} s")
+            if self._retry_at > time.monotonic():
+                wait = self._retry_at - time.monotonic()
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background sender (once); it first sends what an earlier run left."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="score-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, flush_timeout=None):
+        """
+        Stop the sender, giving the remaining scores up to flush_timeout
+        seconds to go out. Undelivered scores stay in the file.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+        if flush_timeout and self.pending():
+            self.flush(flush_timeout)
+        left = self.pending()
+        if left:
+            print(f"⚠️  {left} score(s) not yet submitted, kept in {self.path}")
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or send the scores waiting for the leaderboard")
+    parser.add_argument("outbox", nargs="?", default=os.path.join("recordings", OUTBOX_FILE),
+                        help="Outbox file (default: recordings/score_outbox.sqlite3)")
+    parser.add_argument("--server-url", default=SERVER_URL, help="Leaderboard submit URL")
+    parser.add_argument("--flush", action="store_true", help="Send the pending scores now")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.outbox):
+        print(f"✅ No outbox at {args.outbox}")
+        return
+    outbox = ScoreOutbox(args.outbox, args.server_url)
+    try:
+        if args.flush:
+            if outbox.flush(timeout=60):
+                print(f"✅ {outbox.stats['sent']} score(s) submitted in {outbox.stats['requests']} request(s)")
+            else:
+                print(f"❌ Leaderboard unreachable: {outbox.last_error}")
+        for entry in outbox.pending_scores():
+            score = entry["score"]
+            waiting = time.time() - entry["created_at"]
+            error = f", last error: {entry['last_error']}" if entry["last_error"] else ""
+            print(f"   {score.get('name')}: {score.get('score')} "
+                  f"(waiting {waiting:.0f} s, {entry['attempts']} attempt(s){error})")
+        print(f"{outbox.pending()} score(s) pending")
+    finally:
+        outbox.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Pool of warm scoring worker processes.
+
+Importing pycbc and loading the real chirp take longer than scoring a take,
+so every worker does both once when it starts and then scores one take
+after another. Used by the HTTP scoring service (scoring_service.py) and
+the ingest service (ingest_service.py).
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+PCM_DTYPES = {"int16": np.int16, "int32": np.int32, "float32": np.float32}
+
+_worker_real = None  # (rate, data) of the real chirp, loaded once per worker
+
+
+def _init_worker(real_wav):
+    """Import the scoring engine and load the real chirp once per worker."""
+    global _worker_real
+    from audio_storage import read_audio
+    import whoop_gamescore  # noqa: F401 - pays the pycbc import up front
+    _worker_real = read_audio(real_wav)
+
+
+def _warm_up(delay):
+    """Job used to start every worker before the first request."""
+    time.sleep(delay)  # keeps this worker busy so the next job goes elsewhere
+    return os.getpid()
+
+
+def score_payload(payload, rate, dtype, channels, trigger_sample=None):
+    """
+    Score one upload inside a worker.
+
+    payload is either a complete WAV or FLAC file (rate is None) or raw
+    interleaved PCM samples of the given dtype and channel count.
+    trigger_sample marks the end of the pre-roll, if the recording has one.
+    """
+    from whoop_gamescore import compare_mimic_data
+    from audio_storage import read_audio
+
+    if rate is None:
+        rate, data = read_audio(io.BytesIO(payload))
+    else:
+        data = np.frombuffer(payload, dtype=PCM_DTYPES[dtype])
+        if channels > 1:
+            data = data.reshape(-1, channels)
+
+    rate_real, data_real = _worker_real
+    return compare_mimic_data(data, rate, data_real, rate_real, trigger_sample=trigger_sample)
+
+
+def score_file(path, trigger_sample=None):
+    """Score a WAV or FLAC recording inside a worker, which reads it itself."""
+    with open(path, "rb") as f:
+        return score_payload(f.read(), None, None, 1, trigger_sample)
+
+
+def start_pool(workers, real_wav):
+    """Create a ProcessPoolExecutor of scoring workers and start every one of them."""
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(real_wav,))
+    # ProcessPoolExecutor starts processes lazily; submitting one job per
+    # worker makes them all import pycbc now instead of on the first request
+    pids = {f.result() for f in [pool.submit(_warm_up, 0.5) for _ in range(workers)]}
+    print(f"Scoring pool ready with {len(pids)} warm worker(s)")
+    return pool
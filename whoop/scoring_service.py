@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Local HTTP scoring service with a pool of warm scoring workers.
+
+Lets every booth at an event use one fast machine for scoring. Recorders
+POST their audio straight from memory to /score, either as a WAV or FLAC
+file or as raw PCM samples, and get the score back as JSON. Each job runs in one of a
+pool of worker processes that have already imported pycbc and loaded the
+real chirp (scoring_pool.py), so no request pays that start-up cost.
+
+Usage:
+    python3 scoring_service.py --workers 4 --port 5001
+
+    # Score a WAV file
+    curl --data-binary @recordings/Alice_20250919_120000.wav \
+         "http://127.0.0.1:5001/score?name=Alice"
+
+    # Score raw 16-bit mono PCM and also put it on the leaderboard
+    curl --data-binary @take.pcm -H "Content-Type: application/octet-stream" \
+         "http://127.0.0.1:5001/score?name=Alice&rate=44100&dtype=int16&submit=1"
+
+Recordings that start with a pre-roll pass ?trigger_sample= (the sample
+where recording was triggered) so the window scored matches the real chirp.
+"""
+
+import os
+import argparse
+from concurrent.futures import TimeoutError
+import numpy as np
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+
+from scoring_pool import PCM_DTYPES, score_payload, start_pool as start_scoring_pool
+
+# Leaderboard server that /score?submit=1 forwards results to
+SERVER_URL = "http://127.0.0.1:5000/submit-score"
+
+REAL_WAV = "recordings/real_chirp/GW150914_L1_shiftedslower.wav"
+
+# Longest we wait for a worker before answering with an error
+JOB_TIMEOUT = 60  # seconds
+
+# Largest accepted upload (a 5 s 44.1 kHz int16 take is ~441 KB)
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+app = Flask(__name__)
+CORS(app)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+pool = None  # ProcessPoolExecutor, created by start_pool
+pool_workers = 0
+
+
+def start_pool(workers, real_wav):
+    """Create the worker pool and start every worker."""
+    global pool, pool_workers
+    pool_workers = workers
+    pool = start_scoring_pool(workers, real_wav)
+    return pool
+
+
+# ---- HTTP side ----
+
+def submit_to_leaderboard(result):
+    """Forward a score to the leaderboard server. Returns True on success."""
+    import requests
+    try:
+        response = requests.post(SERVER_URL, json=result, timeout=5)
+        return response.status_code == 200
+    except Exception as e:
+        print("Failed to submit score:", e)
+        return False
+
+
+@app.route("/score", methods=["POST"])
+def score():
+    payload = request.get_data(cache=False)
+    if not payload:
+        return jsonify({"error": "empty body"}), 400
+
+    # A WAV or FLAC upload describes itself; raw PCM needs its format in the query
+    is_wav = payload[:4] in (b"RIFF", b"fLaC") or request.mimetype in ("audio/wav", "audio/x-wav", "audio/wave",
+                                                                        "audio/flac")
+    rate = None
+    dtype = request.args.get("dtype", "int16")
+    channels = request.args.get("channels", 1, type=int)
+    trigger_sample = request.args.get("trigger_sample", type=int)
+    if not is_wav:
+        rate = request.args.get("rate", type=int)
+        if not rate or rate <= 0:
+            return jsonify({"error": "raw PCM uploads need a positive ?rate="}), 400
+        if dtype not in PCM_DTYPES:
+            return jsonify({"error": f"dtype must be one of {sorted(PCM_DTYPES)}"}), 400
+        if channels < 1 or len(payload) % (np.dtype(PCM_DTYPES[dtype]).itemsize * channels):
+            return jsonify({"error": "body length does not match dtype and channels"}), 400
+
+    try:
+        score_value = pool.submit(score_payload, payload, rate, dtype, channels, trigger_sample).result(timeout=JOB_TIMEOUT)
+    except TimeoutError:
+        return jsonify({"error": "scoring timed out"}), 503
+    except Exception as e:
+        return jsonify({"error": f"scoring failed: {e}"}), 500
+
+    result = {"name": request.args.get("name", "Unknown"), "score": score_value}
+    if request.args.get("submit", "0").lower() in ("1", "true", "yes"):
+        result["submitted"] = submit_to_leaderboard(result)
+    return jsonify(result)
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    return {"status": "ok", "workers": pool_workers}
+
+
+def main():
+    global SERVER_URL
+    parser = argparse.ArgumentParser(description="HTTP scoring service with a warm worker pool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of scoring worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--real_wav", default=REAL_WAV, help="Path to the real chirp .wav file")
+    parser.add_argument("--server_url", default=SERVER_URL,
+                        help="Leaderboard submit URL used for ?submit=1")
+    args = parser.parse_args()
+
+    SERVER_URL = args.server_url
+    start_pool(args.workers, args.real_wav)
+    try:
+        # threaded, so requests wait on the pool concurrently
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,38 @@ app = Flask(__name__)
 CORS(app)  # allow cross-origin requests
 
 scores = []  # in-memory list (will reset if server restarts)
+submission_ids = set()  # scores already added, so a resent score counts once
 
-@app.route("/submit-score", methods=["POST"])
-def submit_score():
-    data = request.json
+def add_score(data):
+    submission_id = data.get("submission_id")
+    if submission_id is not None:
+        if submission_id in submission_ids:
+            return
+        submission_ids.add(submission_id)
     scores.append({
         "name": data.get("name", "Unknown"),
-        "score": data.get("score", 0)
+        "score": data.get("score", 0),
+        "similar": data.get("similar", [])
     })
+
+@app.route("/submit-score", methods=["POST"])
+def submit_score():
+    add_score(request.json)
     # sort high-to-low
     scores.sort(key=itemgetter("score"), reverse=True)
     return {"status": "ok"}
 
+@app.route("/submit-scores", methods=["POST"])
+def submit_scores():
+    # a batch from a recorder's outbox (score_outbox.py)
+    data = request.json
+    if not isinstance(data, list):
+        return {"status": "error", "error": "expected a list of scores"}, 400
+    for item in data:
+        add_score(item)
+    scores.sort(key=itemgetter("score"), reverse=True)
+    return {"status": "ok", "received": len(data)}
+
 @app.route("/leaderboard", methods=["GET"])
 def leaderboard():
     return jsonify(scores)
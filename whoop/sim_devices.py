@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Simulated microphone and camera for testing and benchmarking without devices.
+
+SimulatedInputStream has the interface of sounddevice.InputStream and
+SimulatedCamera the parts of cv2.VideoCapture the recorder uses, so either
+can be handed to recorder_core.Recorder (input_stream= / open_camera=) in
+place of the real thing. They replay WAV/MP4 files from the recordings
+corpus, or synthetic signals from synthetic_corpus.py, in real time or
+faster, and can inject:
+
+- latency: delay before the first block/frame, like opening a real device
+- jitter: random extra delay of up to this many seconds per block/frame
+- drop_rate: fraction of blocks/frames lost; lost audio blocks are reported
+  to the callback as an input overflow, like a real xrun
+- fail_after (camera only): stop delivering frames after this many, like a
+  camera being unplugged
+
+Usage:
+    recorder = Recorder(input_stream=simulated_input_stream("recordings/", speed=4.0),
+                        open_camera=simulated_camera_opener(fps=30, drop_rate=0.05))
+
+    # or from the kiosk
+    python3 kiosk.py Alice Bob --countdown 0 --sim-audio synthetic --sim-video synthetic --sim-speed 4
+"""
+
+import os
+import time
+import threading
+import functools
+from math import gcd
+import numpy as np
+from scipy.signal import resample_poly
+
+from audio_storage import read_audio, find_audio_files
+
+SYNTHETIC = "synthetic"
+
+
+class CallbackFlags:
+    """Stand-in for sounddevice.CallbackFlags."""
+
+    def __init__(self, input_overflow=False):
+        self.input_overflow = input_overflow
+
+    def __bool__(self):
+        return self.input_overflow
+
+
+def to_float_audio(data):
+    """Convert WAV samples of any dtype to float32 in [-1, 1], shape (samples, channels)."""
+    if data.dtype.kind == "i":
+        data = data.astype(np.float32) / np.iinfo(data.dtype).max
+    elif data.dtype.kind == "u":
+        data = (data.astype(np.float32) - 128) / 128
+    data = data.astype(np.float32)
+    return data.reshape(len(data), -1)
+
+
+def fit_channels(data, channels):
+    """Downmix or duplicate channels so data has exactly `channels` columns."""
+    if data.shape[1] == channels:
+        return data
+    return np.repeat(data.mean(axis=1, keepdims=True), channels, axis=1)
+
+
+def load_audio_source(source, sample_rate, channels=1, seed=0):
+    """
+    Signal to replay, as float32 (samples, channels) at sample_rate.
+
+    source is SYNTHETIC (a synthetic mimic), a WAV or FLAC file, a directory
+    or list of them (played one after another), or an array.
+    """
+    if isinstance(source, np.ndarray):
+        return fit_channels(source.astype(np.float32).reshape(len(source), -1), channels)
+    if source is None or source == SYNTHETIC:
+        from synthetic_corpus import MimicParams, mimic_signal
+        rng = np.random.default_rng(seed)
+        signal = mimic_signal(rng, mimic_params=MimicParams(sample_rate=sample_rate, channels=channels))
+        return signal.astype(np.float32)
+
+    if isinstance(source, (list, tuple)):
+        files = list(source)
+    elif os.path.isdir(source):
+        files = find_audio_files(source)
+    else:
+        files = [source]
+    if not files:
+        raise ValueError(f"No WAV or FLAC files to replay in {source}")
+
+    parts = []
+    for path in files:
+        rate, data = read_audio(path)
+        data = fit_channels(to_float_audio(data), channels)
+        if rate != sample_rate:
+            g = gcd(int(rate), int(sample_rate))
+            data = resample_poly(data, sample_rate // g, rate // g, axis=0).astype(np.float32)
+        parts.append(data)
+    return np.concatenate(parts)
+
+
+class SimulatedInputStream:
+    """
+    Drop-in for sounddevice.InputStream that plays a signal to the callback.
+
+    Blocks of `blocksize` samples are delivered from a thread every
+    blocksize / samplerate / speed seconds; the source loops. Use
+    simulated_input_stream() to fix the simulation options and pass the
+    result wherever a stream class is expected.
+    """
+
+    def __init__(self, samplerate, channels=1, dtype='float32', callback=None, blocksize=1024,
+                 source=SYNTHETIC, speed=1.0, latency=0.0, jitter=0.0, drop_rate=0.0, seed=0, device=None):
+        self.samplerate = samplerate
+        self.device = device  # accepted like sounddevice's, for recorders bound to a device
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize
+        self.speed = speed
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.signal = load_audio_source(source, samplerate, channels, seed)
+        self.blocks_delivered = 0
+        self.blocks_dropped = 0
+        self._rng = np.random.default_rng(seed)
+        self._position = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._thread is not None and not self._stopped.is_set()
+
+    def _next_block(self):
+        indices = (self._position + np.arange(self.blocksize)) % len(self.signal)
+        self._position = (self._position + self.blocksize) % len(self.signal)
+        return self.signal[indices]
+
+    def _run(self):
+        period = self.blocksize / self.samplerate / self.speed
+        due = time.monotonic() + self.latency
+        overflow = False
+        while True:
+            delay = due - time.monotonic()
+            if self.jitter:
+                delay += self._rng.uniform(0, self.jitter)
+            if self._stopped.wait(max(delay, 0)):
+                return
+            due += period
+            block = self._next_block()
+            if self.drop_rate and self._rng.random() < self.drop_rate:
+                self.blocks_dropped += 1
+                overflow = True
+                continue
+            self.callback(block, len(block), None, CallbackFlags(overflow))
+            self.blocks_delivered += 1
+            overflow = False
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+def simulated_input_stream(source=SYNTHETIC, **options):
+    """Stream class for Recorder(input_stream=...) replaying source with the given options."""
+    return functools.partial(SimulatedInputStream, source=source, **options)
+
+
+def synthetic_frame(index, width, height):
+    """A test-card frame with a bar that moves one step per frame."""
+    frame = np.full((height, width, 3), 40, dtype=np.uint8)
+    x = (index * 8) % width
+    frame[:, x:x + 8] = (0, 200, 255)
+    frame[:16, :min(width, (index % 100) * width // 100)] = 255
+    return frame
+
+
+class SimulatedCamera:
+    """
+    Stand-in for cv2.VideoCapture delivering frames at `fps * speed`.
+
+    source is SYNTHETIC (moving test card) or a video file, which is looped
+    and resized to width x height. read() blocks until the next frame is
+    due, like a real camera.
+    """
+
+    def __init__(self, source=SYNTHETIC, fps=30.0, width=640, height=480, speed=1.0,
+                 latency=0.0, jitter=0.0, drop_rate=0.0, fail_after=None, seed=0):
+        import cv2
+        self._cv2 = cv2
+        self.source = source
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.fail_after = fail_after
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self._rng = np.random.default_rng(seed)
+        self._index = 0
+        self._video = None
+        self._opened = True
+        if source != SYNTHETIC:
+            self._video = cv2.VideoCapture(source)
+            if not self._video.isOpened():
+                self._opened = False
+        time.sleep(latency)  # opening a real camera takes a while
+        self._due = time.monotonic()
+
+    def isOpened(self):
+        return self._opened
+
+    def _source_frame(self):
+        self._index += 1
+        if self._video is None:
+            return synthetic_frame(self._index, self.width, self.height)
+        ok, frame = self._video.read()
+        if not ok:
+            self._video.set(self._cv2.CAP_PROP_POS_FRAMES, 0)  # loop
+            ok, frame = self._video.read()
+            if not ok:
+                return None
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = self._cv2.resize(frame, (self.width, self.height))
+        return frame
+
+    def read(self):
+        if not self._opened or (self.fail_after is not None and self.frames_delivered >= self.fail_after):
+            return False, None
+        period = 1.0 / (self.fps * self.speed)
+        while True:
+            delay = self._due - time.monotonic()
+            if self.jitter:
+                delay += self._rng.uniform(0, self.jitter)
+            if delay > 0:
+                time.sleep(delay)
+            # A camera that fell behind does not deliver a burst of old frames
+            self._due = max(self._due + period, time.monotonic())
+            frame = self._source_frame()
+            if self.drop_rate and self._rng.random() < self.drop_rate:
+                self.frames_dropped += 1
+                continue
+            if frame is None:
+                return False, None
+            self.frames_delivered += 1
+            return True, frame
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        cv2 = self._cv2
+        return {cv2.CAP_PROP_FPS: float(self.fps),
+                cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+                cv2.CAP_PROP_FRAME_HEIGHT: float(self.height)}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self._opened = False
+        if self._video is not None:
+            self._video.release()
+
+
+def simulated_camera_opener(source=SYNTHETIC, **options):
+    """Camera opener for Recorder(open_camera=...) returning SimulatedCameras."""
+    def open_camera(index):
+        return SimulatedCamera(source, seed=index, **options)
+    return open_camera
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Several recording stations (booths) driven from one host.
+
+A Station binds a name to an audio input device and a camera. A
+StationGroup runs one Recorder per station, each with its own warm devices
+and capture pipeline, and one scoring pipeline for all of them: takes from
+every booth go through the same scoring workers and the same submission
+queue, and the stages that update index files still run one job at a time.
+Their scores go through one outbox (score_outbox.py), and their videos
+share one Transcoder, which waits until no booth is capturing.
+Recordings share one directory; calibration and telemetry are kept per
+station name.
+
+Stations are written NAME[:AUDIO[:CAMERA]]: AUDIO is a sounddevice input
+index or name (empty for the default input), CAMERA a camera index, or
+"none" for audio only (empty for the station's position in the list).
+
+Usage:
+    # Two booths in one Tk window
+    WHOOP_STATIONS="left:1:0,right:2:1" python3 audio_recorder.py
+
+    # Or one headless kiosk per booth, scored by one scoring service
+    WHOOP_SCORING_URL=http://127.0.0.1:5001/score python3 kiosk.py --station left --audio-device 1 --camera 0
+    WHOOP_SCORING_URL=http://127.0.0.1:5001/score python3 kiosk.py --station right --audio-device 2 --camera 1
+
+    python3 stations.py "left:1:0,right:2:1"   # check a station list
+"""
+
+import os
+import argparse
+import threading
+from dataclasses import dataclass
+
+from recorder_core import Recorder, build_scoring_pipeline
+from score_outbox import ScoreOutbox, OUTBOX_FILE, SERVER_URL
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
+from video_transcode import Transcoder
+
+
+@dataclass(frozen=True)
+class Station:
+    """A booth: its name, audio input device and camera index (None for audio only)."""
+    name: str
+    audio_device: "int | str | None" = None  # None is the default input
+    camera_index: "int | None" = 0
+
+
+def parse_station(spec, position=0):
+    """Station from NAME[:AUDIO[:CAMERA]]; an empty CAMERA is `position`."""
+    name, _, rest = spec.strip().partition(":")
+    audio, _, camera = rest.partition(":")
+    name, audio, camera = name.strip(), audio.strip(), camera.strip()
+    if not name:
+        raise ValueError(f"Station {spec!r} has no name")
+    audio_device = None
+    if audio:
+        audio_device = int(audio) if audio.isdigit() else audio
+    if camera.lower() in ("none", "-"):
+        camera_index = None
+    elif camera:
+        if not camera.isdigit():
+            raise ValueError(f"Station {name!r}: camera must be an index or 'none', not {camera!r}")
+        camera_index = int(camera)
+    else:
+        camera_index = position
+    return Station(name, audio_device, camera_index)
+
+
+def parse_stations(specs):
+    """Stations from a comma-separated list (or a list) of station specs."""
+    if isinstance(specs, str):
+        specs = [spec for spec in specs.split(",") if spec.strip()]
+    stations = [parse_station(spec, position) for position, spec in enumerate(specs)]
+    names = [station.name for station in stations]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Station names must be unique: {', '.join(duplicates)}")
+    cameras = [station.camera_index for station in stations if station.camera_index is not None]
+    if len(cameras) != len(set(cameras)):
+        raise ValueError("Two stations cannot share a camera")
+    return stations
+
+
+class StationGroup:
+    """
+    One Recorder per station and the scoring pipeline they share.
+
+    add() creates a station's recorder (keyword arguments go to Recorder);
+    start() opens every station's devices at the same time and close()
+    closes them and then finishes the queued scoring. The score outbox and
+    the recordings manifest are created with the first station, in its
+    recordings directory, and the outbox starts sending right away: a window
+    per station (audio_recorder.py) opens its own devices without start().
+    """
+
+    def __init__(self, scoring_workers=2):
+        self.recorders = {}
+        self.scoring_pipeline = build_scoring_pipeline(self.recorder_for, scoring_workers)
+        self.transcoder = Transcoder()
+        self.outbox = None
+        self.manifest = None
+
+    def recorder_for(self, job):
+        return self.recorders[job["station"]]
+
+    def add(self, station, events=None, **options):
+        """Create and return the Recorder for a station."""
+        if station.name in self.recorders:
+            raise ValueError(f"Station {station.name!r} was added twice")
+        if station.camera_index is None:
+            options["open_camera"] = False
+        if self.outbox is None:
+            recordings_dir = options.get("recordings_dir") or os.path.join(os.getcwd(), "recordings")
+            self.outbox = ScoreOutbox(os.path.join(recordings_dir, OUTBOX_FILE), SERVER_URL).start()
+            self.manifest = RecordingsManifest(os.path.join(recordings_dir, MANIFEST_FILE))
+        recorder = Recorder(events, station=station.name, audio_device=station.audio_device,
+                            camera_index=station.camera_index or 0,
+                            scoring_pipeline=self.scoring_pipeline, transcoder=self.transcoder,
+                            outbox=self.outbox, manifest=self.manifest, **options)
+        self.recorders[station.name] = recorder
+        return recorder
+
+    def start(self, wait=True):
+        """Open every station's devices concurrently; with wait, until all are ready."""
+        for recorder in self.recorders.values():
+            recorder.start(wait=False)
+        if wait:
+            for recorder in self.recorders.values():
+                recorder.devices.wait_ready()
+
+    def close(self):
+        """Close every station's devices, then finish the queued transcoding, scoring and submission."""
+        closers = [threading.Thread(target=recorder.close, daemon=True) for recorder in self.recorders.values()]
+        for closer in closers:
+            closer.start()
+        for closer in closers:
+            closer.join()
+        if self.transcoder.pending:
+            print(f"Waiting for {self.transcoder.pending} video(s) to be transcoded...")
+        self.transcoder.shutdown(wait=True, timeout=self.transcoder.timeout)
+        if self.scoring_pipeline.pending:
+            print(f"Waiting for {self.scoring_pipeline.pending} recording(s) to be scored...")
+        timeout = max((r.scoring_timeout for r in self.recorders.values()), default=120)
+        self.scoring_pipeline.shutdown(wait=True, timeout=timeout)
+        if self.outbox is not None:
+            submit_timeout = max(r.submit_timeout for r in self.recorders.values())
+            self.outbox.close(flush_timeout=submit_timeout)
+        if self.manifest is not None:
+            self.manifest.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a list of recording stations")
+    parser.add_argument("stations", help="NAME[:AUDIO[:CAMERA]],... as in WHOOP_STATIONS")
+    args = parser.parse_args()
+
+    try:
+        stations = parse_stations(args.stations)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return []
+    for station in stations:
+        audio = "default input" if station.audio_device is None else f"audio {station.audio_device}"
+        camera = "no camera" if station.camera_index is None else f"camera {station.camera_index}"
+        print(f"✅ {station.name}: {audio}, {camera}")
+    return stations
+
+if __name__ == "__main__":
+    main()
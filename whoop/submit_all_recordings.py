@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import os
+import argparse
 import subprocess
-import requests
 from pathlib import Path
+from whoop_fingerprint import load_index, screen_submission, ALREADY_SUBMITTED
+from whoop_similarity import find_similar_players
+from score_outbox import ScoreOutbox, OUTBOX_FILE
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
 
 # URL of your Flask server
 SERVER_URL = "http://127.0.0.1:5000/submit-score"
@@ -10,9 +14,32 @@ SERVER_URL = "http://127.0.0.1:5000/submit-score"
 # Path to the recordings folder
 RECORDINGS_DIR = Path("recordings")
 
-def submit_wav(wav_path):
-    """Run whoop.py on a WAV file and POST the result to the server"""
+# Reference chirp, also used to catch recordings that simply replay it
+REAL_WAV = RECORDINGS_DIR / "real_chirp" / "GW150914_L1_shiftedslower.wav"
+
+# Name under which the manifest remembers how far the last run got
+CONSUMER = "submit_all_recordings"
+
+# Takes that still need a score; the recorder submits its own takes itself,
+# and the ones it left "pending" when it stopped are released to "unscored"
+UNSUBMITTED = ("unscored", "failed")
+
+def submit_wav(wav_path, fingerprint_index=None, outbox=None, manifest=None, resubmit=False):
+    """Run whoop.py on a WAV file and queue the result for the server"""
     try:
+        # Skip duplicates and replays of the real chirp before scoring
+        if fingerprint_index is not None:
+            reason = screen_submission(wav_path, fingerprint_index)
+            if reason == ALREADY_SUBMITTED:
+                if not resubmit:
+                    print(f"⚠️  Skipped {wav_path}: {reason}")
+                    return
+            elif reason:
+                print(f"⚠️  Skipped {wav_path}: {reason}")
+                if manifest is not None:
+                    manifest.set_status(wav_path, "flagged")
+                return
+
         # Run whoop.py and capture output
         result = subprocess.run(
             ["python3", "whoop_gamescore.py", str(wav_path)],
@@ -21,6 +48,8 @@ def submit_wav(wav_path):
         )
         if result.returncode != 0:
             print(f"❌ Whoop.py failed for {wav_path}: {result.stderr.strip()}")
+            if manifest is not None:
+                manifest.set_status(wav_path, "failed")
             return
 
         # Parse the output as a dictionary
@@ -30,33 +59,65 @@ def submit_wav(wav_path):
             print(f"❌ Failed to parse whoop.py output for {wav_path}: {e}")
             return
 
-        # POST to server
-        response = requests.post(SERVER_URL, json=score_dict)
-        if response.status_code == 200:
-            print(f"✅ Submitted {wav_path}: {score_dict}")
+        # Add the players who sound most like this one
+        score_dict["similar"] = find_similar_players(wav_path, RECORDINGS_DIR)
+
+        # Stored in the outbox, which posts it to the server in batches
+        if outbox is None:
+            single = ScoreOutbox(RECORDINGS_DIR / OUTBOX_FILE, SERVER_URL)
+            single.add(score_dict)
+            single.close(flush_timeout=10)
         else:
-            print(f"❌ Failed to submit {wav_path}: {response.text}")
+            outbox.add(score_dict)
+        if manifest is not None:
+            manifest.set_status(wav_path, "submitted", score_dict.get("score"))
+        print(f"✅ Queued {wav_path}: {score_dict}")
 
     except Exception as e:
         print(f"❌ Error processing {wav_path}: {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Score and submit the recordings not yet on the leaderboard")
+    parser.add_argument("--all", action="store_true",
+                        help="Submit every recording again, e.g. to a fresh leaderboard")
+    args = parser.parse_args()
+
     # Check recordings folder
     if not RECORDINGS_DIR.exists():
         print(f"❌ Recordings folder not found: {RECORDINGS_DIR}")
         return
 
-    wav_files = sorted(RECORDINGS_DIR.glob("*.wav"))
+    # Only takes added or changed since the last run are looked at
+    manifest = RecordingsManifest(RECORDINGS_DIR / MANIFEST_FILE)
+    manifest.scan(RECORDINGS_DIR)
+    manifest.release_stale()
+    if args.all:
+        sessions, seq = manifest.sessions(), manifest.last_seq()
+    else:
+        sessions, seq = manifest.new_since_last_run(CONSUMER)
+        sessions = [session for session in sessions if session["status"] in UNSUBMITTED]
+    # Failed takes passed screening before, so they are sent again like --all
+    wav_files = [(session["audio_path"], args.all or session["status"] == "failed") for session in sessions
+                 if session["audio_path"] and os.path.exists(session["audio_path"])]
     if not wav_files:
-        print(f"❌ No .wav files found in {RECORDINGS_DIR}")
+        print(f"✅ No new recordings to submit in {RECORDINGS_DIR}")
+        manifest.set_cursor(CONSUMER, seq)
+        manifest.close()
         return
 
     print(f"Submitting {len(wav_files)} recordings to server...")
 
-    for wav in wav_files:
-        submit_wav(wav)
+    fingerprint_index = load_index(RECORDINGS_DIR, str(REAL_WAV))
+    outbox = ScoreOutbox(RECORDINGS_DIR / OUTBOX_FILE, SERVER_URL).start()
+    for wav, resubmit in wav_files:
+        submit_wav(wav, fingerprint_index, outbox, manifest, resubmit)
+    # Takes that failed again come back next run
+    manifest.set_cursor(CONSUMER, seq)
+    manifest.close()
 
+    # Whatever the server did not take stays in the outbox for next time
+    outbox.close(flush_timeout=30)
     print("✅ Done submitting all recordings.")
 
 
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic chirp templates and mimic recordings.
+
+The real chirp template is not part of the repository and the bundled
+recordings have no ground truth, so this module synthesises both: an
+inspiral-style chirp template, and "mimic" recordings derived from it at a
+controlled SNR, time offset, frequency shift, sample rate, channel count and
+duration. Every file is generated from (seed, index) alone, so any subset of
+a corpus can be regenerated exactly, in any order, at any scale.
+
+Usage:
+    python3 synthetic_corpus.py test_recordings/synthetic --count 100 --seed 1
+"""
+
+import os
+import json
+import argparse
+from dataclasses import dataclass, asdict
+import numpy as np
+from scipy.io import wavfile
+
+
+@dataclass
+class ChirpParams:
+    """Shape of a synthetic chirp template."""
+    sample_rate: int = 44100
+    duration: float = 5.0  # seconds of audio, including silence
+    start_time: float = 1.5  # seconds before the chirp starts
+    chirp_length: float = 1.5  # seconds from start to merger
+    start_frequency: float = 40.0  # Hz
+    end_frequency: float = 400.0  # Hz, frequency at merger
+    ringdown: float = 0.05  # seconds of exponential decay after merger
+    amplitude: float = 0.8  # peak amplitude, full scale is 1.0
+
+
+@dataclass
+class MimicParams:
+    """How a synthetic mimic recording deviates from the template."""
+    # Amplitude SNR of the chirp against full-band white noise. Only a few
+    # percent of that noise falls in the 10-600 Hz scoring band, so scores
+    # span the whole 0-100 range for SNRs between about 0.01 and 0.2.
+    snr: float = 0.1
+    time_offset: float = 0.0  # seconds, positive is later than the template
+    frequency_shift: float = 1.0  # multiplicative, 1.1 whoops 10% higher
+    sample_rate: int = 44100
+    channels: int = 1
+    duration: float = 5.0  # seconds
+    gain: float = 0.5  # peak amplitude of the mixture before clipping
+
+
+def chirp_signal(params=None, frequency_shift=1.0, time_offset=0.0,
+                 sample_rate=None, duration=None):
+    """
+    Generate an inspiral-style chirp as a float64 array in [-1, 1].
+
+    The frequency follows f(t) ~ (t_merger - t)^(-3/8) from start_frequency
+    to end_frequency and the amplitude grows as f^(2/3), like a compact
+    binary inspiral, followed by a short ringdown. frequency_shift,
+    time_offset, sample_rate and duration let mimics reuse the same shape.
+    """
+    params = params or ChirpParams()
+    sample_rate = sample_rate or params.sample_rate
+    duration = params.duration if duration is None else duration
+
+    t = np.arange(int(round(duration * sample_rate))) / sample_rate
+    start = params.start_time + time_offset
+    merger = start + params.chirp_length
+
+    # tau^(-3/8) law, scaled so the sweep spans the requested frequencies
+    ratio = (params.end_frequency / params.start_frequency) ** (-8.0 / 3.0)
+    tau_start = params.chirp_length / (1.0 - ratio)
+    tau = np.clip(merger + tau_start * ratio - t, tau_start * ratio, None)
+    freq = params.start_frequency * (tau / tau_start) ** (-3.0 / 8.0) * frequency_shift
+
+    inspiral = (t >= start) & (t < merger)
+    after = t >= merger
+    envelope = np.where(inspiral, (freq / freq.max()) ** (2.0 / 3.0), 0.0)
+    envelope = np.where(after, np.exp(-(t - merger) / max(params.ringdown, 1e-6)), envelope)
+    envelope[t < start] = 0.0
+
+    phase = 2 * np.pi * np.cumsum(freq) / sample_rate
+    signal = envelope * np.sin(phase)
+    peak = np.abs(signal).max()
+    if peak > 0:
+        signal *= params.amplitude / peak
+    return signal
+
+
+def mimic_signal(rng, chirp_params=None, mimic_params=None):
+    """
+    Generate a mimic recording as a float64 (samples, channels) array.
+
+    The template chirp is shifted in time and frequency, mixed with white
+    noise at the requested SNR (ratio of the chirp's RMS over its active part
+    to the noise RMS), scaled to `gain` and clipped like a real microphone.
+    """
+    chirp_params = chirp_params or ChirpParams()
+    mimic_params = mimic_params or MimicParams()
+
+    chirp = chirp_signal(chirp_params, mimic_params.frequency_shift, mimic_params.time_offset,
+                         mimic_params.sample_rate, mimic_params.duration)
+    active = chirp[np.abs(chirp) > 0]
+    chirp_rms = np.sqrt(np.mean(active ** 2)) if len(active) else 1.0
+    noise_rms = chirp_rms / mimic_params.snr if mimic_params.snr > 0 else 0.0
+
+    channels = []
+    for _ in range(mimic_params.channels):
+        channels.append(chirp + rng.normal(0.0, noise_rms, len(chirp)))
+    mixture = np.stack(channels, axis=1)
+
+    peak = np.abs(mixture).max()
+    if peak > 0:
+        mixture *= mimic_params.gain / peak
+    return np.clip(mixture, -1.0, 1.0)
+
+
+def to_int16(signal):
+    """Convert a float signal in [-1, 1] to int16 the way the recorder does."""
+    return (np.clip(signal, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def write_wav(path, signal, sample_rate):
+    """Write a float signal as a 16-bit WAV file, mono or multi-channel."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = to_int16(signal)
+    if data.ndim == 2 and data.shape[1] == 1:
+        data = data[:, 0]
+    wavfile.write(path, sample_rate, data)
+
+
+def sample_mimic_params(rng, snr_range=(0.01, 0.3), offset_range=(-0.5, 0.5),
+                        shift_range=(0.8, 1.25), sample_rates=(44100,),
+                        channel_options=(1,), duration_range=(5.0, 5.0)):
+    """Draw a random MimicParams from the given ranges."""
+    return MimicParams(
+        snr=float(np.exp(rng.uniform(np.log(snr_range[0]), np.log(snr_range[1])))),
+        time_offset=float(rng.uniform(*offset_range)),
+        frequency_shift=float(np.exp(rng.uniform(np.log(shift_range[0]), np.log(shift_range[1])))),
+        sample_rate=int(rng.choice(sample_rates)),
+        channels=int(rng.choice(channel_options)),
+        duration=float(rng.uniform(*duration_range)),
+    )
+
+
+def item_rng(seed, index):
+    """Independent random generator for one corpus item."""
+    return np.random.default_rng([seed, index])
+
+
+def generate_item(seed, index, chirp_params=None, **ranges):
+    """
+    Generate corpus item `index` of the corpus with the given seed.
+
+    Returns (mimic_params, signal). Items depend only on (seed, index), so
+    corpora of any size agree on the items they share.
+    """
+    rng = item_rng(seed, index)
+    mimic_params = sample_mimic_params(rng, **ranges)
+    return mimic_params, mimic_signal(rng, chirp_params, mimic_params)
+
+
+def item_filename(index, seed):
+    """Recorder-style filename, so get_player_name returns "synthetic <index>"."""
+    return f"synthetic_{index:06d}_{seed:08d}_000000.wav"
+
+
+def generate_corpus(output_dir, count, seed=0, chirp_params=None, start=0, **ranges):
+    """
+    Write a template and `count` mimic recordings to output_dir.
+
+    The template is written as template.wav and the ground truth of every
+    mimic as one JSON object per line in manifest.jsonl. Items are generated
+    and written one at a time, so memory use does not grow with count.
+    Returns the path of the manifest.
+    """
+    chirp_params = chirp_params or ChirpParams()
+    os.makedirs(output_dir, exist_ok=True)
+
+    template_path = os.path.join(output_dir, "template.wav")
+    write_wav(template_path, chirp_signal(chirp_params), chirp_params.sample_rate)
+
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    with open(manifest_path, "a" if start else "w") as manifest:
+        for index in range(start, start + count):
+            mimic_params, signal = generate_item(seed, index, chirp_params, **ranges)
+            filename = item_filename(index, seed)
+            write_wav(os.path.join(output_dir, filename), signal, mimic_params.sample_rate)
+            manifest.write(json.dumps({"file": filename, "seed": seed, "index": index,
+                                       **asdict(mimic_params)}) + "\n")
+    return manifest_path
+
+
+def read_manifest(manifest_path):
+    """Read the ground truth written by generate_corpus."""
+    with open(manifest_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic whoop corpus")
+    parser.add_argument("output_dir", help="Directory to write template.wav, mimics and manifest.jsonl to")
+    parser.add_argument("--count", type=int, default=100, help="Number of mimic recordings")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--start", type=int, default=0,
+                        help="First item index, to extend an existing corpus")
+    parser.add_argument("--snr", type=float, nargs=2, default=(0.01, 0.3), metavar=("MIN", "MAX"),
+                        help="Full-band amplitude SNR range")
+    parser.add_argument("--offset", type=float, nargs=2, default=(-0.5, 0.5), metavar=("MIN", "MAX"),
+                        help="Time offset range in seconds")
+    parser.add_argument("--shift", type=float, nargs=2, default=(0.8, 1.25), metavar=("MIN", "MAX"),
+                        help="Frequency shift factor range")
+    parser.add_argument("--duration", type=float, nargs=2, default=(5.0, 5.0), metavar=("MIN", "MAX"),
+                        help="Mimic duration range in seconds")
+    parser.add_argument("--sample_rates", type=int, nargs="+", default=[44100])
+    parser.add_argument("--channels", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    manifest_path = generate_corpus(
+        args.output_dir, args.count, args.seed, start=args.start,
+        snr_range=tuple(args.snr), offset_range=tuple(args.offset),
+        shift_range=tuple(args.shift), sample_rates=tuple(args.sample_rates),
+        channel_options=tuple(args.channels), duration_range=tuple(args.duration))
+    print(f"✅ Wrote {args.count} recordings and {manifest_path}")
+    return manifest_path
+
+
+if __name__ == "__main__":
+    main()
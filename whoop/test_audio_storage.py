@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for storing recordings as lossless FLAC (audio_storage.py).
+
+Uses the synthetic corpus and the simulated devices from sim_devices.py,
+so no microphone, camera or real chirp template is needed.
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from audio_storage import archive, compress, read_audio
+from capture_profiles import get_profile
+from recorder_core import Recorder
+from recording_metadata import read_sidecar
+from sim_devices import simulated_input_stream
+from synthetic_corpus import generate_corpus, read_manifest
+
+
+def test_flac_scores_identically():
+    """A FLAC decodes to the WAV's samples and gets the same score"""
+    print("Testing FLAC round trip and scores...")
+    from scipy.io import wavfile
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = read_manifest(generate_corpus(tmp, 3, seed=5))
+        template = os.path.join(tmp, "template.wav")
+        wav_bytes = flac_bytes = 0
+        for item in manifest:
+            wav = os.path.join(tmp, item["file"])
+            rate, data = wavfile.read(wav)
+            wav_score = compare_mimic(wav, template)
+            wav_bytes += os.path.getsize(wav)
+            flac = compress(wav)
+            flac_bytes += os.path.getsize(flac)
+            assert not os.path.exists(wav)
+            flac_rate, flac_data = read_audio(flac)
+            assert flac_rate == rate and flac_data.dtype == data.dtype and np.array_equal(flac_data, data)
+            with open(flac, "rb") as f:
+                assert np.array_equal(read_audio(io.BytesIO(f.read()))[1], data)  # an upload
+            assert compare_mimic(flac, template) == wav_score, item["file"]
+        assert flac_bytes < wav_bytes
+
+    print(f"✅ Identical samples and scores, {100 * (1 - flac_bytes / wav_bytes):.0f}% smaller")
+
+
+def test_archive_keeps_recordings_known():
+    """Archived WAVs are not flagged as duplicates of themselves, and 32-bit takes stay WAV"""
+    print("\nTesting archiving a recordings directory...")
+    from whoop_fingerprint import load_index, screen_submission, ALREADY_SUBMITTED
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = read_manifest(generate_corpus(tmp, 2, seed=6))
+        os.remove(os.path.join(tmp, "template.wav"))
+        index = load_index(tmp)
+        for item in manifest:
+            assert screen_submission(os.path.join(tmp, item["file"]), index) is None
+        index.save()
+
+        converted, before, after = archive(tmp)
+        assert len(converted) == 2 and after < before
+        index = load_index(tmp)
+        for flac in converted:
+            assert screen_submission(flac, index) == ALREADY_SUBMITTED
+        assert archive(tmp) == ([], 0, 0)
+
+    try:
+        get_profile("archival-48k", audio_storage="flac")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("32-bit FLAC storage was accepted")
+
+    print(f"✅ {len(converted)} recordings archived, {before} -> {after} bytes")
+
+
+def test_recorder_saves_flac():
+    """With FLAC storage a session keeps only the FLAC, which is what gets scored"""
+    print("\nTesting FLAC storage in the recorder...")
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            profile = get_profile("scoring-8k", audio_storage="flac")
+            recorder = Recorder(profile=profile, duration=1, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp, input_stream=simulated_input_stream(), open_camera=False)
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Ivy")
+                assert recorder.scoring_pipeline.join(timeout=60)
+            finally:
+                recorder.close()
+
+            audio = session["audio"]
+            assert audio.endswith(".flac") and os.path.exists(audio), audio
+            assert not os.path.exists(os.path.splitext(audio)[0] + ".wav")
+            assert session["job"]["filepath"] == audio and session["job"]["status"] == "done"
+            rate, data = read_audio(audio)
+            telemetry = session["telemetry"]["audio"]
+            assert rate == 8000 and len(data) == telemetry["preroll_samples"] + telemetry["samples_captured"], len(data)
+            assert read_sidecar(audio)["trigger_sample"] == session["job"]["trigger_sample"]
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ Saved {os.path.basename(audio)} ({len(data)} samples) and scored it")
+
+
+if __name__ == "__main__":
+    print("Running audio storage tests...\n")
+
+    tests = [test_flac_scores_identically, test_archive_keeps_recordings_known, test_recorder_saves_flac]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All audio storage tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for ending a take once the player stops (capture_pipeline.AutoStop).
+
+Uses the simulated devices from sim_devices.py, so no microphone or camera
+is needed.
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from capture_pipeline import AudioCapture, AutoStop
+from recorder_core import Recorder
+from recording_metadata import read_sidecar
+from sim_devices import SimulatedInputStream, simulated_input_stream, simulated_camera_opener
+
+RATE = 8000
+
+
+def whoop_then_quiet(whoop_start, whoop_seconds, total_seconds, level=0.3, seed=0):
+    """A tone from whoop_start for whoop_seconds over faint noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(total_seconds * RATE)) / RATE
+    signal = rng.normal(0, 0.002, len(t))
+    whoop = (t >= whoop_start) & (t < whoop_start + whoop_seconds)
+    signal[whoop] += level * np.sin(2 * np.pi * 200 * t[whoop])
+    return signal.astype(np.float32)
+
+
+def capture(source, duration, min_duration=1.0, hangover=0.4):
+    """Capture source with auto-stop; returns (seconds captured, stop reason)"""
+    stream = lambda **kwargs: SimulatedInputStream(source=source, speed=10.0, **kwargs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "take.wav")
+        audio_capture = AudioCapture(path, RATE, duration, input_stream=stream,
+                                     auto_stop=AutoStop(RATE, min_duration, hangover))
+        audio_capture.start()
+        assert audio_capture.wait(timeout=5)
+        with wave.open(path, "rb") as wf:
+            assert wf.getnframes() == audio_capture.samples_captured
+        return audio_capture.samples_captured / RATE, audio_capture.stop_reason
+
+
+def test_stops_after_the_player():
+    """A 1 s whoop ends the take one hangover after it stops"""
+    print("Testing auto-stop after a whoop...")
+
+    seconds, reason = capture(whoop_then_quiet(0.5, 1.0, 10.0), duration=5)
+    block = 1024 / RATE
+    # It stops on the first block boundary after the hangover
+    assert reason == "silence" and 1.9 <= seconds <= 1.9 + 2 * block, (seconds, reason)
+
+    print(f"✅ Stopped after {seconds:.2f} s instead of 5 s")
+
+
+def test_min_and_max_bounds():
+    """A short burst still gets min_duration, and silence runs to the full duration"""
+    print("\nTesting auto-stop bounds...")
+
+    block = 1024 / RATE
+    seconds, reason = capture(whoop_then_quiet(0.0, 0.1, 10.0), duration=5, min_duration=1.0)
+    assert reason == "silence" and 1.0 <= seconds <= 1.0 + block, (seconds, reason)
+    silent, reason = capture(whoop_then_quiet(0.0, 0.0, 10.0), duration=2)
+    assert reason == "duration" and silent == 2.0, (silent, reason)
+
+    print(f"✅ Burst kept for {seconds:.2f} s, silence for the full {silent:g} s")
+
+
+def test_short_take_scores_like_full_take():
+    """A take that stopped early is padded to the template, not stretched"""
+    print("\nTesting scoring of a short take...")
+    from whoop_gamescore import compare_mimic_data
+    from synthetic_corpus import chirp_signal, mimic_signal, MimicParams
+
+    template = (chirp_signal() * 32767).astype(np.int16)
+    take = (mimic_signal(np.random.default_rng(3), mimic_params=MimicParams(snr=0.05))[:, 0] * 32767).astype(np.int16)
+    short = take[:int(3.3 * 44100)]  # the chirp ends at 3.05 s
+
+    full_score = compare_mimic_data(take, 44100, template, 44100, trigger_sample=0)
+    short_score = compare_mimic_data(short, 44100, template, 44100, trigger_sample=0)
+    stretched_score = compare_mimic_data(short, 44100, template, 44100)
+    print(f"   full take: {full_score}, stopped at 3.3 s: {short_score}, stretched: {stretched_score}")
+    # Without the noise after the whoop the short take matches at least as well
+    assert full_score > 20 and short_score >= full_score - 3.0 and stretched_score < full_score / 2
+
+    print("✅ The short take scores as well as the full one")
+
+
+def test_recorder_stops_audio_and_video_together():
+    """With the booth profile a session ends well before the maximum duration"""
+    print("\nTesting auto-stop in the recorder...")
+    import cv2
+
+    # Whoops of 0.3 s once a second, so there is always one within min_duration
+    source = whoop_then_quiet(0.0, 0.3, 1.0)
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(profile="booth", duration=4, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp, input_stream=simulated_input_stream(source),
+                                open_camera=simulated_camera_opener(fps=15, width=320, height=240))
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Gil")
+            finally:
+                recorder.close()
+
+            audio = session["telemetry"]["audio"]
+            assert audio["stop_reason"] == "silence", audio
+            assert 1.5 <= audio["take_seconds"] < 2.8, audio
+            assert session["timings"]["capture"] < 3.5, session["timings"]
+            video = cv2.VideoCapture(session["video"])
+            frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+            assert frames <= (audio["take_seconds"] + 0.3) * 15, frames
+            assert read_sidecar(session["audio"])["telemetry"]["audio"]["take_seconds"] == audio["take_seconds"]
+            assert session["job"]["status"] == "done"
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ {audio['take_seconds']:.2f} s take of at most 4 s, {frames} video frames")
+
+
+if __name__ == "__main__":
+    print("Running auto-stop tests...\n")
+
+    tests = [test_stops_after_the_player, test_min_and_max_bounds, test_short_take_scores_like_full_take,
+             test_recorder_stops_audio_and_video_together]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All auto-stop tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
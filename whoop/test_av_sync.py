@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for audio/video alignment and latency calibration (av_sync.py).
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from av_sync import save_calibration, load_calibration, clap_offset
+from capture_pipeline import AudioClock
+from capture_telemetry import station_name
+from recorder_core import Recorder
+from recording_metadata import read_sidecar, update_sidecar
+from sim_devices import simulated_input_stream, simulated_camera_opener
+
+
+def test_audio_clock_ignores_late_blocks():
+    """The clock anchors on the least delayed block, so callback jitter does not move it"""
+    print("Testing audio clock...")
+
+    rate, block = 8000, 256
+    clock = AudioClock(rate)
+    rng = np.random.default_rng(0)
+    for i in range(40):
+        # Block i is complete at 100 s + (i + 1) * 32 ms and arrives up to 20 ms late
+        arrival = 100.0 + (i + 1) * block / rate + rng.uniform(0, 0.02)
+        clock.block(i * block, block, arrival)
+    clock.block(40 * block, block, 100.0 + 41 * block / rate)  # one on time
+
+    assert abs(clock.time_of(0) - 100.0) < 1e-9
+    assert clock.sample_at(101.0) == rate and clock.blocks == 41
+
+    print("✅ Clock anchored to the on-time block")
+
+
+def test_clap_offset():
+    """A clap 250 ms later in the video than in the audio is measured as +0.25 s"""
+    print("\nTesting clap detection...")
+    import cv2
+
+    rate, fps = 8000, 20
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = os.path.join(tmp, "calibration_20250101_000000.wav")
+        audio = np.random.default_rng(1).normal(0, 300, 3 * rate).astype(np.int16)
+        audio[int(1.25 * rate):int(1.27 * rate)] = 20000  # the clap
+        with wave.open(wav_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(audio.tobytes())
+
+        writer = cv2.VideoWriter(wav_path[:-4] + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 48))
+        for i in range(3 * fps):
+            frame = np.full((48, 64, 3), 230 if i >= 30 else 20, dtype=np.uint8)  # hands at 1.5 s
+            writer.write(frame)
+        writer.release()
+
+        update_sidecar(wav_path, av_sync={"audio_start": -0.5, "video_start": -0.5, "video_fps": fps})
+        offset = clap_offset(wav_path)
+
+    assert abs(offset - 0.25) < 0.01, offset
+    print(f"✅ Video {offset * 1000:+.0f} ms off the audio")
+
+
+def test_recorder_aligns_audio_and_video():
+    """A take's WAV and MP4 share a name, and the sidecar places both on the session clock"""
+    print("\nTesting A/V alignment in the recorder...")
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            save_calibration(tmp, station_name(), audio_latency=0.1, video_latency=0.05)
+            assert load_calibration(tmp, "another station")["audio_latency"] == 0.0
+
+            recorder = Recorder(sample_rate=8000, duration=1, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp, input_stream=simulated_input_stream(),
+                                open_camera=simulated_camera_opener(fps=20, width=160, height=120))
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Fay")
+            finally:
+                recorder.close()
+
+            assert os.path.splitext(session["audio"])[0] == os.path.splitext(session["video"])[0]
+            metadata = read_sidecar(session["audio"])
+            sync = metadata["av_sync"]
+            assert sync["audio_latency"] == 0.1 and sync["video_latency"] == 0.05
+            # The pre-roll starts ~0.5 s before the trigger, the video just after it
+            assert -0.8 < sync["audio_start"] < -0.5 and 0 <= sync["trigger_time"] < 0.1
+            assert 0.4 < sync["av_offset"] < 1.0
+            # The trigger moves by the audio latency, give or take one stream block
+            shift = metadata["trigger_sample"] - metadata["stream_trigger_sample"]
+            assert 790 <= shift <= 800 + 1024 + 10, shift
+            assert session["job"]["trigger_sample"] == metadata["trigger_sample"]
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ A/V offset {sync['av_offset']} s, trigger moved by {shift} samples")
+
+
+if __name__ == "__main__":
+    print("Running A/V sync tests...\n")
+
+    tests = [test_audio_clock_ignores_late_blocks, test_clap_offset, test_recorder_aligns_audio_and_video]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All A/V sync tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Tests for the capture pipeline building blocks in capture_pipeline.py.
+
+These run without a camera or microphone.
+"""
+
+import os
+import sys
+import wave
+import tempfile
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from capture_pipeline import (FrameQueue, VideoEncoder, AudioRingBuffer, WavStreamWriter,
+                              PrerollBuffer, AudioInput, AudioCapture, DROP_OLDEST, DROP_NEWEST)
+
+
+class RecordingWriter:
+    """Stand-in for cv2.VideoWriter that keeps the frames it is given."""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frames = []
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def release(self):
+        self.released = True
+
+
+class IdleStream:
+    """Stand-in for sd.InputStream whose callback the test calls itself."""
+
+    def __call__(self, samplerate, channels, dtype, callback):
+        return self
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FlakyCamera:
+    """Stand-in for cv2.VideoCapture that stops delivering after `frames` grabs."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.grabs = 0
+        self.released = False
+
+    def isOpened(self):
+        return not self.released
+
+    def grab(self):
+        self.grabs += 1
+        return self.grabs <= self.frames
+
+    def release(self):
+        self.released = True
+
+
+class BlockStream:
+    """Stand-in for sd.InputStream that feeds a signal to the callback in blocks."""
+
+    def __init__(self, signal, blocksize=512):
+        self.signal = signal
+        self.blocksize = blocksize
+
+    def __call__(self, samplerate, channels, dtype, callback):
+        self.callback = callback
+        return self
+
+    def start(self):
+        def feed():
+            for i in range(0, len(self.signal), self.blocksize):
+                block = self.signal[i:i + self.blocksize].reshape(-1, 1)
+                self.callback(block, len(block), None, None)
+        self.thread = threading.Thread(target=feed)
+        self.thread.start()
+
+    def stop(self):
+        self.thread.join()
+
+    def close(self):
+        pass
+
+
+def test_frame_queue_drop_policies():
+    """A full queue drops the oldest or the newest frame, never blocks"""
+    print("Testing frame queue drop policies...")
+
+    oldest = FrameQueue(maxsize=3, policy=DROP_OLDEST)
+    newest = FrameQueue(maxsize=3, policy=DROP_NEWEST)
+    for i in range(5):
+        oldest.put((i, i))
+        newest.put((i, i))
+    oldest.close()
+    newest.close()
+
+    assert oldest.dropped == 2 and newest.dropped == 2
+    assert [oldest.get()[1] for _ in range(3)] == [2, 3, 4]
+    assert [newest.get()[1] for _ in range(3)] == [0, 1, 2]
+    assert oldest.get() is None and newest.get() is None
+
+    print("✅ Frame queue drops frames according to its policy")
+
+
+def test_encoder_uses_measured_fps():
+    """The encoder opens its writer at the rate frames were captured"""
+    print("\nTesting video encoder frame rate...")
+
+    frame_queue = FrameQueue(maxsize=100)
+    writers = []
+
+    def open_writer(fps):
+        writers.append(RecordingWriter(fps))
+        return writers[-1]
+
+    encoder = VideoEncoder(frame_queue, open_writer, nominal_fps=30, warmup_frames=10)
+    encoder.start()
+    # 12 fps camera, timestamps in seconds
+    for i in range(36):
+        frame_queue.put((i / 12.0, f"frame{i}"))
+    frame_queue.close()
+    encoder.join(timeout=5)
+
+    assert len(writers) == 1
+    assert abs(writers[0].fps - 12.0) < 0.01
+    assert writers[0].frames == [f"frame{i}" for i in range(36)]
+    assert writers[0].released and encoder.frames_written == 36
+
+    print("✅ Video encoder writes every frame at the measured rate")
+
+
+def test_encoder_short_recording():
+    """Recordings shorter than the warm-up are still written"""
+    print("\nTesting video encoder on a short recording...")
+
+    frame_queue = FrameQueue()
+    writers = []
+    encoder = VideoEncoder(frame_queue, lambda fps: writers.append(RecordingWriter(fps)) or writers[-1],
+                           nominal_fps=30, warmup_frames=10)
+    encoder.start()
+    frame_queue.put((0.0, "only frame"))
+    frame_queue.close()
+    encoder.join(timeout=5)
+
+    assert writers[0].fps == 30 and writers[0].frames == ["only frame"]
+
+    print("✅ Short recordings fall back to the nominal frame rate")
+
+
+def test_audio_ring_buffer_wraps():
+    """Samples come out in order across the wrap-around, overruns are counted"""
+    print("\nTesting audio ring buffer...")
+
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(6, dtype=np.float32).reshape(-1, 1))
+    assert ring.read(max_samples=4)[:, 0].tolist() == [0, 1, 2, 3]
+    ring.write(np.arange(6, 12, dtype=np.float32).reshape(-1, 1))
+    assert ring.available() == 8
+    assert ring.write(np.zeros((3, 1), dtype=np.float32)) == 0 and ring.overruns == 3
+    assert ring.read()[:, 0].tolist() == list(range(4, 12))
+
+    print("✅ Ring buffer keeps samples in order")
+
+
+def test_audio_capture_streams_to_wav():
+    """A capture writes exactly `duration` seconds as int16, like the old save path"""
+    print("\nTesting streamed audio capture...")
+
+    sample_rate = 8000
+    signal = (0.5 * np.sin(2 * np.pi * 440 * np.arange(3 * sample_rate) / sample_rate)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.wav")
+        capture = AudioCapture(path, sample_rate, duration=2, ring_seconds=3,
+                               input_stream=BlockStream(signal))
+        capture.start()
+        assert capture.wait(timeout=5)
+
+        with wave.open(path, 'rb') as wf:
+            assert wf.getframerate() == sample_rate and wf.getsampwidth() == 2
+            written = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    expected = (signal[:2 * sample_rate] * 32767).astype(np.int16)
+    assert capture.ring.overruns == 0
+    assert np.array_equal(written, expected)
+
+    print(f"✅ Streamed {len(written)} samples to the WAV file")
+
+
+def test_preroll_is_prepended():
+    """A capture attached to an open input starts with the last second before "go\""""
+    print("\nTesting pre-roll capture...")
+
+    buffer = PrerollBuffer(capacity=4)
+    buffer.write(np.arange(3, dtype=np.float32).reshape(-1, 1))
+    assert buffer.snapshot()[:, 0].tolist() == [0, 1, 2]
+    buffer.write(np.arange(3, 10, dtype=np.float32).reshape(-1, 1))
+    assert buffer.snapshot()[:, 0].tolist() == [6, 7, 8, 9]
+
+    sample_rate = 8000
+    signal = np.linspace(-0.9, 0.9, 4 * sample_rate, dtype=np.float32).reshape(-1, 1)
+    audio_input = AudioInput(sample_rate, preroll_seconds=0.5, input_stream=IdleStream())
+    audio_input.start()
+
+    def feed(start, stop):
+        for i in range(start, stop, 500):
+            audio_input._callback(signal[i:min(i + 500, stop)], 500, None, None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.wav")
+        trigger = int(1.5 * sample_rate)
+        feed(0, trigger)
+        capture = AudioCapture(path, sample_rate, duration=1, audio_input=audio_input)
+        capture.start()
+        feed(trigger, len(signal))
+        assert capture.wait(timeout=5)
+        audio_input.close()
+
+        with wave.open(path, 'rb') as wf:
+            written = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    preroll = sample_rate // 2
+    assert capture.trigger_sample == preroll and capture.trigger_stream_sample == trigger
+    expected = (signal[trigger - preroll:trigger + sample_rate, 0] * 32767).astype(np.int16)
+    assert np.array_equal(written, expected)
+
+    print(f"✅ {capture.trigger_sample} samples of pre-roll prepended")
+
+
+def test_scoring_window_skips_preroll():
+    """Scoring cuts a pre-roll recording to the template length around the whoop"""
+    print("\nTesting scoring window...")
+    from whoop_gamescore import scoring_window
+
+    rate = 100
+    data = np.zeros(600)
+    data[50:150] = 1.0  # whoop started half a second before the trigger at 100
+    window = scoring_window(data, rate, duration=5.0, trigger_sample=100)
+    assert len(window) == 500 and window[0] == 1.0 and window.sum() == 100
+    assert scoring_window(data, rate, 5.0, None) is data
+    assert len(scoring_window(data, rate, 5.0, trigger_sample=0)) == 500
+
+    # A long take whose whoop only starts two seconds after the trigger
+    data = np.zeros(1200)
+    data[400:750] = 1.0
+    window = scoring_window(data, rate, duration=5.0, trigger_sample=100)
+    assert len(window) == 500 and window.sum() == 350
+    # Of the windows holding all of it, the one starting nearest the trigger is used
+    assert window[0] == 0.0 and np.flatnonzero(window)[0] == 150
+
+    print("✅ Scoring window keeps early and late whoops and matches the template length")
+
+
+def test_device_manager_keeps_camera_warm():
+    """The camera is grabbed while idle, lent to sessions and reopened when it fails"""
+    print("\nTesting device manager...")
+    import time
+    from device_manager import DeviceManager
+
+    cameras = []
+
+    def open_camera(index):
+        # The first camera "disappears" after 20 frames, the second keeps working
+        cameras.append(FlakyCamera(frames=20 if not cameras else 10 ** 9))
+        return cameras[-1]
+
+    devices = DeviceManager(8000, input_stream=IdleStream(), open_camera=open_camera,
+                            reconnect_interval=0.05, stall_seconds=60)
+    devices.start()
+    try:
+        deadline = time.monotonic() + 5
+        while devices.camera.reconnects == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert devices.camera.reconnects == 1 and cameras[0].released
+        assert devices.audio_input is not None and devices.audio_input.active
+
+        camera = devices.acquire_camera()
+        assert camera is cameras[1] and devices.acquire_camera() is None
+        grabs = camera.grabs
+        time.sleep(0.1)
+        assert camera.grabs == grabs  # not grabbed while a session has it
+        devices.release_camera()
+        time.sleep(0.1)
+        assert camera.grabs > grabs and not camera.released
+    finally:
+        devices.close()
+    assert cameras[1].released and devices.audio_input is None
+
+    print("✅ Device manager keeps the camera warm and reconnects it")
+
+
+def test_microphone_not_reopened_mid_take():
+    """A stalled microphone is reopened only once the take recording from it is done"""
+    print("\nTesting microphone watchdog during a take...")
+    import time
+    from device_manager import DeviceManager
+
+    class Take:
+        def prepend(self, block):
+            pass
+
+    devices = DeviceManager(8000, input_stream=IdleStream(), reconnect_interval=0.05, stall_seconds=0.05)
+    devices.start()
+    try:
+        audio_input = devices.audio_input
+        take = Take()
+        audio_input.attach(take)
+        time.sleep(1.2)  # IdleStream never delivers, so the stream counts as stalled
+        assert devices.audio_input is audio_input and audio_input.active
+        assert devices.open_audio() and devices.audio_input is audio_input
+        assert devices.audio_reconnects == 0
+
+        audio_input.detach(take)
+        deadline = time.monotonic() + 5
+        while devices.audio_reconnects == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert devices.audio_reconnects > 0 and not audio_input.active
+    finally:
+        devices.close()
+
+    print("✅ Microphone kept open during the take and reopened after it")
+
+
+if __name__ == "__main__":
+    print("Running capture pipeline tests...\n")
+
+    tests = [test_frame_queue_drop_policies, test_encoder_uses_measured_fps, test_encoder_short_recording,
+             test_audio_ring_buffer_wraps, test_audio_capture_streams_to_wav, test_preroll_is_prepended,
+             test_scoring_window_skips_preroll, test_device_manager_keeps_camera_warm,
+             test_microphone_not_reopened_mid_take]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All capture pipeline tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
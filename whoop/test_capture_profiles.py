@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for capture profiles (capture_profiles.py) from capture to scoring.
+
+Uses the simulated devices from sim_devices.py, so no microphone or camera
+is needed.
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+import numpy as np
+from scipy.signal import resample_poly
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from capture_profiles import get_profile, PROFILES
+from capture_pipeline import AudioCapture
+from recorder_core import Recorder
+from recording_metadata import read_sidecar
+from sim_devices import simulated_input_stream, simulated_camera_opener, SimulatedInputStream
+
+
+def test_profiles_resolve():
+    """Profiles are looked up by name and fields can be overridden"""
+    print("Testing profile lookup...")
+
+    assert get_profile().name == "standard" and get_profile().sample_rate == 44100
+    profile = get_profile("scoring-8k", duration=2, sample_rate=None)
+    assert profile.sample_rate == 8000 and profile.duration == 2 and profile.dtype == "int16"
+    assert get_profile(profile) is profile
+    for bad in ({"profile": "no-such-profile"}, {"dtype": "float64"}):
+        try:
+            get_profile(**bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad} was accepted")
+
+    print(f"✅ {len(PROFILES)} profiles: {', '.join(PROFILES)}")
+
+
+def test_int32_capture():
+    """An archival capture writes 32-bit samples at full resolution"""
+    print("\nTesting 32-bit WAV capture...")
+
+    rate = 48000
+    signal = (0.5 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)).astype(np.float32)
+    stream = lambda **kwargs: SimulatedInputStream(source=signal, speed=20.0, **kwargs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "take.wav")
+        capture = AudioCapture(path, rate, duration=0.5, input_stream=stream, dtype="int32")
+        capture.start()
+        assert capture.wait(timeout=5)
+        with wave.open(path, "rb") as wf:
+            assert wf.getsampwidth() == 4 and wf.getframerate() == rate
+            data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int32)
+
+    assert len(data) == rate // 2
+    expected = signal[:rate // 2].astype(np.float64) * 2147483647
+    assert np.max(np.abs(data - expected)) <= 1.0
+
+    print("✅ 32-bit samples written")
+
+
+def test_recorder_honours_profile():
+    """The scoring-8k profile is used for the WAV, the video and the sidecar"""
+    print("\nTesting recorder with the scoring-8k profile...")
+    import cv2
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(profile="scoring-8k", duration=1, countdown_time=0,
+                                preroll_seconds=0.5, recordings_dir=tmp,
+                                input_stream=simulated_input_stream(),
+                                open_camera=simulated_camera_opener(fps=30, width=640, height=480))
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Dana")
+            finally:
+                recorder.close()
+
+            with wave.open(session["audio"], "rb") as wf:
+                assert wf.getframerate() == 8000 and wf.getsampwidth() == 2
+                assert wf.getnframes() == int(1.5 * 8000)
+            assert read_sidecar(session["audio"])["profile"] == "scoring-8k"
+
+            video = cv2.VideoCapture(session["video"])
+            size = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+            assert size == (320, 240), size
+            # 1 s from a 30 fps camera, kept at 15 fps
+            assert 11 <= frames <= 18, frames
+            assert session["job"]["status"] == "done"
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ 8 kHz WAV and {frames} frames at {size[0]}x{size[1]}")
+
+
+def test_low_rate_scoring_matches():
+    """An 8 kHz take scores like the same take at 44.1 kHz, in less time"""
+    print("\nTesting scoring at 8 kHz...")
+    from whoop_gamescore import compare_mimic_data
+    from synthetic_corpus import chirp_signal, mimic_signal, MimicParams
+
+    template = (chirp_signal() * 32767).astype(np.int16)
+    take = (mimic_signal(np.random.default_rng(3), mimic_params=MimicParams(snr=0.05))[:, 0] * 32767).astype(np.int16)
+    take_8k = resample_poly(take.astype(np.float64), 80, 441).astype(np.int16)
+
+    started = time.perf_counter()
+    full = compare_mimic_data(take, 44100, template, 44100)
+    full_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    low = compare_mimic_data(take_8k, 8000, template, 44100)
+    low_seconds = time.perf_counter() - started
+
+    print(f"   44.1 kHz: {full} in {full_seconds:.3f} s, 8 kHz: {low} in {low_seconds:.3f} s")
+    assert full > 20 and abs(full - low) <= 3.0
+
+    print("✅ Scores agree")
+
+
+if __name__ == "__main__":
+    print("Running capture profile tests...\n")
+
+    tests = [test_profiles_resolve, test_int32_capture, test_recorder_honours_profile,
+             test_low_rate_scoring_matches]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All capture profile tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
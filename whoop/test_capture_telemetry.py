@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for capture-quality telemetry (capture_telemetry.py).
+
+The recorder test runs on a simulated camera that claims 30 fps but drops
+most frames and a simulated microphone with overflows, like an underpowered
+station.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from capture_telemetry import VideoTelemetry, problems, load_telemetry, summarize
+from recorder_core import Recorder
+from recording_metadata import read_sidecar
+from sim_devices import simulated_input_stream, simulated_camera_opener
+
+
+def test_video_summary():
+    """Frame timestamps are turned into fps, interval statistics and a histogram"""
+    print("Testing video telemetry summary...")
+
+    telemetry = VideoTelemetry(nominal_fps=30, started=10.0)
+    times = 10.1 + np.arange(31) / 30.0
+    times[20:] += 0.5  # one 533 ms stall
+    for i, t in enumerate(times):
+        telemetry.read(t, kept=i % 2 == 0)
+    telemetry.read_failed()
+    summary = telemetry.summary(frames_dropped=1, frames_written=15, encoder_fps=15.0)
+
+    assert summary["frames_read"] == 31 and summary["frames_skipped"] == 15
+    assert summary["first_frame_ms"] == 100.0
+    assert abs(summary["effective_fps"] - 30 / 1.5) < 0.01
+    assert summary["interval_histogram_ms"]["20-40"] == 29
+    assert summary["interval_histogram_ms"][">=250"] == 1
+    assert summary["interval_ms"]["max"] > 530
+    found = problems({"video": summary, "audio": {"xruns": 2}})
+    assert any("xrun" in p for p in found) and any("fps instead of 30" in p for p in found)
+
+    print(f"✅ {summary['effective_fps']} fps, jitter {summary['interval_ms']['jitter']} ms")
+
+
+def test_recorder_reports_slow_station():
+    """A session on a struggling camera and microphone is flagged in its sidecar and the report"""
+    print("\nTesting telemetry from the recorder...")
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(sample_rate=8000, duration=1, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp,
+                                input_stream=simulated_input_stream(drop_rate=0.2, blocksize=256),
+                                open_camera=simulated_camera_opener(fps=30, width=160, height=120,
+                                                                    drop_rate=0.6))
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Erin")
+            finally:
+                recorder.close()
+
+            telemetry = read_sidecar(session["audio"])["telemetry"]
+            assert telemetry == session["telemetry"] and telemetry["profile"] == "standard"
+            video, audio = telemetry["video"], telemetry["audio"]
+            assert video["target_fps"] == 30 and video["effective_fps"] < 20
+            assert video["frames_written"] == video["frames_read"] - video["frames_skipped"] - video["frames_dropped"]
+            assert video["first_frame_ms"] is not None and audio["first_sample_ms"] is not None
+            assert audio["xruns"] > 0 and audio["samples_captured"] == 8000
+
+            stations = summarize(load_telemetry(tmp))
+            station = stations[telemetry["station"]]
+            assert station["sessions"] == 1 and station["flagged_sessions"] == 1
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ Flagged: {', '.join(problems(telemetry))}")
+
+
+if __name__ == "__main__":
+    print("Running capture telemetry tests...\n")
+
+    tests = [test_video_summary, test_recorder_reports_slow_station]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All capture telemetry tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
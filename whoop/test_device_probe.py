@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for fast start-up: cached probes (device_probe.py), devices opened
+concurrently in the background, and lazy imports of the heavy modules.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from device_probe import ProbeCache, probe_all
+from device_manager import DeviceManager
+from recorder_core import Recorder
+from sim_devices import SimulatedInputStream, simulated_camera_opener
+
+
+def test_probe_cache():
+    """Probes run once per TTL, concurrently, and failures become None"""
+    print("Testing probe cache...")
+
+    calls = []
+
+    def slow_probe(name):
+        def probe():
+            calls.append(name)
+            time.sleep(0.3)
+            return name.upper()
+        return probe
+
+    def broken_probe():
+        raise OSError("no such device")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ProbeCache(os.path.join(tmp, "probe.json"))
+        probes = {"a": slow_probe("a"), "b": slow_probe("b"), "broken": broken_probe}
+        started = time.monotonic()
+        results = probe_all(cache, probes)
+        elapsed = time.monotonic() - started
+        assert results == {"a": "A", "b": "B", "broken": None}
+        assert elapsed < 0.55, elapsed  # in parallel, not 0.6 s in a row
+
+        # A new cache on the same file answers without probing
+        assert probe_all(ProbeCache(cache.path), probes)["a"] == "A" and len(calls) == 2
+        assert ProbeCache(cache.path, ttl=0).get("a") is None
+        cache.invalidate("a")
+        assert not cache.fresh("a") and cache.fresh("b")
+        probe_all(cache, {"a": slow_probe("a")}, refresh=True)
+        assert calls.count("a") == 2
+
+    print(f"✅ Two 0.3 s probes in {elapsed:.2f} s, then served from the cache")
+
+
+def test_devices_open_in_background():
+    """start(wait=False) returns at once and the microphone and camera open side by side"""
+    print("\nTesting background device start-up...")
+
+    def slow_input_stream(**kwargs):
+        time.sleep(0.4)  # opening an audio device
+        return SimulatedInputStream(**kwargs)
+
+    devices = DeviceManager(8000, preroll_seconds=0.5, input_stream=slow_input_stream,
+                            open_camera=simulated_camera_opener(width=160, height=120, latency=0.4))
+    started = time.monotonic()
+    devices.start(wait=False)
+    returned = time.monotonic() - started
+    try:
+        assert returned < 0.1 and not devices.ready.is_set()
+        assert devices.wait_ready(timeout=2)
+        opened = time.monotonic() - started
+        assert opened < 0.7, opened  # together, not 0.8 s in a row
+        assert devices.audio_input is not None and devices.camera.available
+    finally:
+        devices.close()
+
+    print(f"✅ start() returned in {returned * 1000:.0f} ms, devices ready after {opened:.2f} s")
+
+
+def test_recorder_caches_codec_and_imports_lazily():
+    """The video codec is probed once per TTL and recorder_core loads without cv2 or requests"""
+    print("\nTesting codec cache and lazy imports...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = Recorder(recordings_dir=tmp, open_camera=False)
+        assert recorder.video_codec() == "mp4v"
+        assert Recorder(recordings_dir=tmp, open_camera=False).probe_cache.get("video_codec") == "mp4v"
+
+    code = ("import sys; import recorder_core, kiosk; "
+            "print(sorted(m for m in ('cv2', 'requests', 'sounddevice', 'flask') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip() == "[]", result.stdout + result.stderr
+
+    print("✅ Codec cached; no heavy modules imported at start-up")
+
+
+if __name__ == "__main__":
+    print("Running start-up tests...\n")
+
+    tests = [test_probe_cache, test_devices_open_in_background, test_recorder_caches_codec_and_imports_lazily]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All start-up tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for the ingest service (ingest_service.py).
+
+Takes from the synthetic corpus are dropped into a watched directory; the
+scores stay in an outbox that is never started, so no leaderboard is needed.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from ingest_service import IngestService, audio_complete
+from recording_metadata import update_sidecar
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
+from score_outbox import ScoreOutbox, OUTBOX_FILE
+from synthetic_corpus import generate_corpus, read_manifest
+
+UNREACHABLE = "http://127.0.0.1:9/submit-score"
+
+
+def wait_for(condition, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.1)
+
+
+def test_watched_takes_are_scored():
+    """A batch and a slowly written take are each screened and scored once, with inotify and by polling"""
+    print("Testing ingest of new takes...")
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        items = read_manifest(generate_corpus(source, 6, seed=9))
+        template = os.path.join(source, "template.wav")
+        expected = {item["file"]: compare_mimic(os.path.join(source, item["file"]), template) for item in items}
+
+        for poll_interval in (None, 0.2):  # inotify, then polling
+            recordings = os.path.join(tmp, f"recordings_{poll_interval}")
+            os.makedirs(recordings)
+            outbox = ScoreOutbox(os.path.join(recordings, OUTBOX_FILE), UNREACHABLE)
+            service = IngestService(recordings, template, workers=2, max_pending=2, settle=0.3,
+                                    poll_interval=poll_interval, outbox=outbox).start()
+            try:
+                # A batch at once, one of them with its name as typed in a sidecar
+                update_sidecar(os.path.join(recordings, items[2]["file"]), player="Thomas_Lars (Maastricht)")
+                for item in items[:5]:
+                    shutil.copyfile(os.path.join(source, item["file"]), os.path.join(recordings, item["file"]))
+
+                # And one written with a pause longer than the settle time
+                with open(os.path.join(source, items[5]["file"]), "rb") as f:
+                    data = f.read()
+                slow = os.path.join(recordings, items[5]["file"])
+                with open(slow, "wb") as f:
+                    f.write(data[:len(data) // 2])
+                    f.flush()
+                    assert not audio_complete(slow)
+                    time.sleep(1.0)
+                    f.write(data[len(data) // 2:])
+                assert audio_complete(slow)
+
+                manifest = RecordingsManifest(os.path.join(recordings, MANIFEST_FILE))
+                # Some synthetic mimics are close enough to the template to be flagged
+                wait_for(lambda: len(manifest.sessions("submitted") + manifest.sessions("flagged")) == 6
+                         and service.idle())
+                submitted = manifest.sessions("submitted")
+                manifest.close()
+            finally:
+                service.close(timeout=60)
+
+            scores = [entry["score"] for entry in outbox.pending_scores()]
+            outbox.close()
+            assert sorted(score["name"] for score in scores) == sorted(row["player"] for row in submitted)
+            for row in submitted:
+                assert row["score"] == expected[os.path.basename(row["audio_path"])], row
+            assert "Thomas_Lars (Maastricht)" in [score["name"] for score in scores]
+            stats = service.stats
+            assert stats["submitted"] == len(scores) and stats["submitted"] + stats["flagged"] == 6, stats
+            assert stats["max_in_flight"] <= 2 and stats["max_waiting"] >= 1 and stats["failed"] == 0, stats
+
+    print(f"✅ 6 takes handled once each ({stats['submitted']} scored), at most {stats['max_in_flight']} in flight")
+
+
+def test_recorder_takes_and_catch_up():
+    """Takes the recorder handles are left alone; takes that arrived while stopped are caught up once"""
+    print("\nTesting catch-up and takes saved by the recorder...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = read_manifest(generate_corpus(tmp, 3, seed=10))
+        recordings = os.path.join(tmp, "recordings")
+        os.makedirs(recordings)
+        template = os.path.join(tmp, "template.wav")
+        files = [os.path.join(recordings, item["file"]) for item in items]
+        for item, path in zip(items, files):
+            shutil.copyfile(os.path.join(tmp, item["file"]), path)
+
+        # The recorder saved and submitted the first take itself
+        manifest = RecordingsManifest(os.path.join(recordings, MANIFEST_FILE))
+        manifest.record(files[0], player="Ann", status="submitted", score=1.0)
+        os.remove(files[2])
+
+        outbox = ScoreOutbox(os.path.join(recordings, OUTBOX_FILE), UNREACHABLE)
+        service = IngestService(recordings, template, workers=1, settle=0.2, outbox=outbox).start()
+        try:
+            wait_for(lambda: manifest.get(files[1]) is not None and manifest.get(files[1])["status"] == "submitted")
+            # A take the recorder is saving right now
+            shutil.copyfile(os.path.join(tmp, items[2]["file"]), files[2])
+            manifest.record(files[2], player="Cy", status="pending")
+            wait_for(lambda: service.stats["skipped"] == 1 and service.idle(), timeout=30)
+        finally:
+            service.close(timeout=60)
+        assert manifest.get(files[0])["score"] == 1.0 and manifest.get(files[2])["status"] == "pending"
+        assert [entry["score"]["name"] for entry in outbox.pending_scores()] == [manifest.get(files[1])["player"]]
+
+        # Started again, there is nothing left to catch up on
+        service = IngestService(recordings, template, workers=1, settle=0.2, outbox=outbox).start()
+        try:
+            time.sleep(1.0)
+            assert service.stats["seen"] == 0, service.stats
+        finally:
+            service.close(timeout=60)
+        outbox.close()
+        manifest.close()
+
+    print("✅ Only the take that arrived while nothing was running was scored")
+
+
+def test_stopped_during_catch_up():
+    """Takes of a backlog not finished when the service stops are caught up on next time, once"""
+    print("\nTesting a stop in the middle of the catch-up...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = read_manifest(generate_corpus(tmp, 8, seed=13))
+        recordings = os.path.join(tmp, "recordings")
+        os.makedirs(recordings)
+        template = os.path.join(tmp, "template.wav")
+        files = [os.path.join(recordings, item["file"]) for item in items]
+        for item, path in zip(items, files):
+            shutil.copyfile(os.path.join(tmp, item["file"]), path)
+
+        manifest = RecordingsManifest(os.path.join(recordings, MANIFEST_FILE))
+        outbox = ScoreOutbox(os.path.join(recordings, OUTBOX_FILE), UNREACHABLE)
+
+        def handled():
+            return [row for row in manifest.sessions() if row["status"] in ("submitted", "flagged")]
+
+        service = IngestService(recordings, template, workers=1, max_pending=1, settle=0.2, outbox=outbox).start()
+        try:
+            wait_for(lambda: len(handled()) >= 1)
+        finally:
+            service.close(timeout=60)
+        first_run = len(handled())
+        assert 1 <= first_run < 8, first_run
+
+        service = IngestService(recordings, template, workers=1, max_pending=1, settle=0.2, outbox=outbox).start()
+        try:
+            wait_for(lambda: len(handled()) == 8 and service.idle())
+        finally:
+            service.close(timeout=60)
+        assert service.stats["seen"] == 8 - first_run, service.stats
+
+        submitted = manifest.sessions("submitted")
+        names = sorted(entry["score"]["name"] for entry in outbox.pending_scores())
+        assert names == sorted(row["player"] for row in submitted)  # each take once
+        # And nothing is left for a third run
+        assert all(row["status"] in ("submitted", "flagged") for row in manifest.new_since_last_run("ingest_service")[0])
+        outbox.close()
+        manifest.close()
+
+    print(f"✅ {first_run} take(s) before the stop, the other {8 - first_run} after the restart")
+
+
+if __name__ == "__main__":
+    print("Running ingest service tests...\n")
+
+    tests = [test_watched_takes_are_scored, test_recorder_takes_and_catch_up, test_stopped_during_catch_up]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All ingest service tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job pipeline in job_pipeline.py.
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from job_pipeline import JobPipeline, Stage
+
+
+def test_jobs_flow_through_stages():
+    """Jobs pass every stage in order, stop early on False and report errors"""
+    print("Testing job pipeline stages...")
+
+    statuses = []
+    lock = threading.Lock()
+
+    def on_status(job, message):
+        with lock:
+            statuses.append((job["id"], job["status"], message))
+
+    def screen(job):
+        if job["id"] == "flagged":
+            job["outcome"] = "not submitted"
+            return False
+        return True
+
+    def score(job):
+        if job["id"] == "broken":
+            raise ValueError("bad audio")
+        job["score"] = 42
+        return True
+
+    pipeline = JobPipeline([Stage("screen", screen), Stage("score", score)], on_status)
+    jobs = [pipeline.submit({"id": name}) for name in ("ok", "flagged", "broken")]
+    assert pipeline.join(timeout=5) and pipeline.pending == 0
+    pipeline.shutdown()
+
+    ok, flagged, broken = jobs
+    assert ok["status"] == "done" and ok["score"] == 42
+    assert flagged["status"] == "done" and "score" not in flagged
+    assert broken["status"] == "failed" and isinstance(broken["error"], ValueError)
+    assert [s for s in statuses if s[0] == "ok"] == [("ok", "screen", "screen..."), ("ok", "score", "score..."),
+                                                     ("ok", "done", "done")]
+    assert ("flagged", "done", "not submitted") in statuses
+
+    print("✅ Jobs flow through the stages")
+
+
+def test_submit_does_not_wait_for_slow_stages():
+    """Submitting never blocks and a stage with two workers runs two jobs at once"""
+    print("\nTesting job pipeline concurrency...")
+
+    running = []
+    peak = []
+
+    def slow(job):
+        running.append(job)
+        peak.append(len(running))
+        time.sleep(0.2)
+        running.remove(job)
+        return True
+
+    pipeline = JobPipeline([Stage("score", slow, workers=2)])
+    start = time.monotonic()
+    for i in range(4):
+        pipeline.submit({"id": i})
+    assert time.monotonic() - start < 0.1
+    assert pipeline.join(timeout=5)
+    elapsed = time.monotonic() - start
+    pipeline.shutdown()
+
+    assert max(peak) == 2 and elapsed < 0.7
+
+    print(f"✅ 4 jobs of 0.2 s finished in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    print("Running job pipeline tests...\n")
+
+    tests = [test_jobs_flow_through_stages, test_submit_does_not_wait_for_slow_stages]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All job pipeline tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
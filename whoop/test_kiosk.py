@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+End-to-end tests of the headless kiosk on simulated devices.
+
+Records players from a simulated microphone (and camera), saves them into
+a temporary directory and runs them through the scoring pipeline. The leaderboard
+server is not running, so submissions are expected to fail politely.
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from kiosk import Kiosk, KioskEvents
+from recorder_core import Recorder
+from sim_devices import simulated_input_stream, simulated_camera_opener
+
+
+def test_kiosk_records_queued_players():
+    """Queued players are recorded back to back and reported with timings"""
+    print("Testing headless kiosk...")
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(KioskEvents(), sample_rate=8000, duration=1, countdown_time=0,
+                                preroll_seconds=0.5, recordings_dir=tmp,
+                                input_stream=simulated_input_stream(), open_camera=False)
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(1.0)  # let the pre-roll fill, as it does while a kiosk waits
+            kiosk = Kiosk(recorder)
+            for name in ("Alice", "Bob", "# a comment", ""):
+                kiosk.enqueue(name)
+            try:
+                report = kiosk.run()
+            finally:
+                recorder.close()
+
+            assert [row["name"] for row in report["sessions"]] == ["Alice", "Bob"]
+            for session, row in zip(kiosk.sessions, report["sessions"]):
+                assert row["status"] == "done" and row["score"] is not None
+                # The audio clock ends the capture, to within one 1024-sample block
+                assert row["capture_seconds"] >= 1.0 - 1024 / 8000 and "scoring_seconds" in row
+                with wave.open(session["audio"], "rb") as wf:
+                    assert wf.getnframes() == int(1.5 * 8000)  # pre-roll + duration
+            assert report["players_per_hour"] > 0
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ Kiosk recorded 2 players at {report['players_per_hour']} players/hour")
+
+
+def test_kiosk_with_simulated_camera():
+    """Accelerated devices with dropped frames still give complete takes"""
+    print("\nTesting kiosk on accelerated simulated devices...")
+    import cv2
+
+    cwd = os.getcwd()
+    os.chdir(HERE)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            speed = 4.0
+            input_stream = simulated_input_stream(speed=speed, jitter=0.005)
+            open_camera = simulated_camera_opener(fps=20, width=160, height=120, speed=speed,
+                                                  drop_rate=0.1)
+            recorder = Recorder(KioskEvents(), sample_rate=8000, duration=2, countdown_time=0,
+                                preroll_seconds=0.5, recordings_dir=tmp,
+                                input_stream=input_stream, open_camera=open_camera)
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.5)
+            kiosk = Kiosk(recorder)
+            kiosk.enqueue("Carol")
+            try:
+                report = kiosk.run()
+            finally:
+                recorder.close()
+
+            session = kiosk.sessions[0]
+            row = report["sessions"][0]
+            # 2 s of audio at 4x speed
+            assert row["capture_seconds"] < 1.5 and row["status"] == "done"
+            with wave.open(session["audio"], "rb") as wf:
+                assert wf.getnframes() == int(2.5 * 8000)
+            video = cv2.VideoCapture(session["video"])
+            frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+            # 40 frames at 20 fps, minus ~10% dropped
+            assert 25 <= frames <= 42, frames
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ {frames} frames and {row['capture_seconds']} s capture at {speed}x")
+
+
+if __name__ == "__main__":
+    print("Running kiosk tests...\n")
+
+    tests = [test_kiosk_records_queued_players, test_kiosk_with_simulated_camera]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All kiosk tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the retention rules and disk quota (recording_retention.py).
+
+Builds a recordings directory from the synthetic corpus and synthetic video
+frames, with file times set back to make the takes old.
+"""
+
+import os
+import sys
+import time
+import zipfile
+import tempfile
+import numpy as np
+from dataclasses import replace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from audio_storage import read_audio
+from recording_metadata import read_sidecar, update_sidecar
+from recording_retention import (RetentionPolicy, ArchiveIndex, BackgroundRetention, enforce,
+                                 directory_size, rescore_archived, video_width, HOUR)
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE
+from sim_devices import synthetic_frame
+from synthetic_corpus import generate_item, write_wav, chirp_signal
+from video_transcode import frame_count
+
+NOW = time.time()
+
+AGE_RULES = RetentionPolicy(downscale_video_after=6 * HOUR, drop_video_after=48 * HOUR, archive_after=24 * HOUR)
+
+
+def make_session(directory, name, age_hours, index, frames=30, size=(640, 480)):
+    """A take with audio, sidecar and MP4, last modified age_hours ago"""
+    import cv2
+    stem = os.path.join(directory, f"{name}_20250101_{index:06d}")
+    params, signal = generate_item(11, index)
+    write_wav(stem + ".wav", signal, params.sample_rate)
+    update_sidecar(stem + ".wav", trigger_sample=0, video=os.path.basename(stem) + ".mp4")
+    writer = cv2.VideoWriter(stem + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), 15, size)
+    for i in range(frames):
+        writer.write(synthetic_frame(i, *size))
+    writer.release()
+    modified = NOW - age_hours * HOUR
+    for extension in (".wav", ".json", ".mp4"):
+        os.utime(stem + extension, (modified, modified))
+    return stem
+
+
+def test_age_rules():
+    """Old videos are downscaled then dropped, and old takes archived but still scorable"""
+    print("Testing retention by age...")
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "real_chirp", "template.wav")  # not a take
+        write_wav(template, chirp_signal(), 44100)
+
+        old = make_session(tmp, "Ann", 72, 1)
+        middle = make_session(tmp, "Ben", 12, 2)
+        fresh = make_session(tmp, "Cy", 0, 3)
+        old_score = compare_mimic(old + ".wav", template, trigger_sample=0)
+        _, old_data = read_audio(old + ".wav")
+
+        # Nothing happens unless asked for
+        report = enforce(tmp, RetentionPolicy(), now=NOW)
+        assert report["downscaled"] == report["videos_dropped"] == report["archived"] == []
+
+        report = enforce(tmp, AGE_RULES, now=NOW)
+        assert report["videos_dropped"] == [os.path.basename(old)], report
+        assert report["downscaled"] == [os.path.basename(middle)], report
+        assert report["archived"] == [os.path.basename(old)], report
+        assert report["bytes_after"] < report["bytes_before"]
+
+        # The old take lives on in its day bundle, with its sidecar
+        assert not any(os.path.exists(old + extension) for extension in (".wav", ".json", ".mp4"))
+        index = ArchiveIndex(tmp)
+        member, entry = index.find(os.path.basename(old) + ".wav")
+        assert member.endswith(".flac") and entry["sidecar"]["video"] is None and entry["sidecar"]["video_dropped"]
+        with zipfile.ZipFile(index.bundle_path(entry)) as bundle:
+            assert sorted(bundle.namelist()) == sorted([member, os.path.splitext(member)[0] + ".json"])
+        assert np.array_equal(index.read(member)[1], old_data)
+        rescored = rescore_archived(tmp, template)
+        assert rescored == [{"name": "Ann", "file": member, "score": old_score}], rescored
+
+        # The middle one keeps a small video and its audio; the fresh one is untouched
+        assert video_width(middle + ".mp4") == 320 and frame_count(middle + ".mp4") == 30
+        assert read_sidecar(middle + ".wav")["video_width"] == 320 and os.path.exists(middle + ".wav")
+        assert video_width(fresh + ".mp4") == 640 and os.path.exists(fresh + ".wav")
+
+        # Nothing left to do on a second run
+        again = enforce(tmp, AGE_RULES, now=NOW)
+        assert again["downscaled"] == again["videos_dropped"] == again["archived"] == []
+
+    print(f"✅ {report['bytes_before'] / 1e6:.2f} MB -> {report['bytes_after'] / 1e6:.2f} MB, "
+          f"archived take scored {old_score} from its bundle")
+
+
+def test_quota():
+    """Over the quota, the oldest videos go first, then the oldest takes are archived unless not scored yet"""
+    print("\nTesting the disk quota...")
+
+    no_rules = RetentionPolicy()
+    with tempfile.TemporaryDirectory() as tmp:
+        stems = [make_session(tmp, f"P{i}", 5 - i, 10 + i) for i in range(4)]
+        stems.append(make_session(tmp, "Now", 0, 20))
+        # The oldest take is still being scored
+        manifest = RecordingsManifest(os.path.join(tmp, MANIFEST_FILE))
+        manifest.record(stems[0] + ".wav", player="P0", status="pending")
+        manifest.close()
+        full = directory_size(tmp)
+        video = os.path.getsize(stems[0] + ".mp4")
+        audio = os.path.getsize(stems[0] + ".wav")
+
+        # Room for all but two videos
+        report = enforce(tmp, replace(no_rules, quota_bytes=full - video - video // 2), now=NOW)
+        assert report["videos_dropped"] == [os.path.basename(s) for s in stems[:2]], report
+        assert report["archived"] == [] and not report["over_quota"]
+
+        # Less room than the remaining videos free: takes are archived, oldest first
+        quota = directory_size(tmp) - 2 * video - audio // 10
+        retention = BackgroundRetention(tmp, replace(no_rules, quota_bytes=quota))
+        assert retention.kick()
+        assert retention.wait(timeout=120) == 0
+        assert directory_size(tmp) <= quota
+        assert not os.path.exists(stems[1] + ".wav") and len(ArchiveIndex(tmp)) >= 1
+        assert os.path.exists(stems[-1] + ".wav") and os.path.exists(stems[-1] + ".mp4")  # too recent
+        assert os.path.exists(stems[0] + ".wav")  # waiting for its score
+
+        # Not even when nothing is protected by age, nor once its scoring failed
+        manifest = RecordingsManifest(os.path.join(tmp, MANIFEST_FILE))
+        manifest.set_status(stems[0] + ".wav", "failed")
+        manifest.close()
+        report = enforce(tmp, replace(no_rules, quota_bytes=1, protect_newer_than=0.0), now=NOW)
+        assert report["over_quota"] and os.path.exists(stems[0] + ".wav")
+        assert not any(os.path.exists(stem + ".wav") for stem in stems[1:]), report
+
+    print("✅ Quota kept by dropping the oldest videos, then archiving the oldest takes")
+
+
+if __name__ == "__main__":
+    print("Running retention tests...\n")
+
+    tests = [test_age_rules, test_quota]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All retention tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite recordings manifest (recordings_manifest.py).
+
+Uses the synthetic corpus and the simulated devices from sim_devices.py,
+so no microphone, camera or real chirp template is needed.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from audio_storage import compress
+from recorder_core import Recorder
+from recording_metadata import update_sidecar
+from recordings_manifest import RecordingsManifest, MANIFEST_FILE, audio_hash
+from sim_devices import simulated_input_stream
+from synthetic_corpus import generate_corpus, read_manifest
+
+
+def test_incremental_queries():
+    """Scans only read new files, and "new since last run" only returns what changed"""
+    print("Testing incremental manifest queries...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = read_manifest(generate_corpus(tmp, 4, seed=7))
+        os.remove(os.path.join(tmp, "template.wav"))
+        files = [os.path.join(tmp, item["file"]) for item in items]
+        update_sidecar(files[0], player="Thomas_Lars (Maastricht)")
+
+        manifest = RecordingsManifest(os.path.join(tmp, MANIFEST_FILE))
+        assert manifest.scan() == 4
+        first = manifest.get(files[0])
+        assert first["player"] == "Thomas_Lars (Maastricht)" and first["status"] == "unscored"
+        assert first["content_hash"] == audio_hash(files[0]) and first["audio_path"] == files[0]
+        assert first["sample_rate"] == items[0]["sample_rate"] and first["duration"] > 0
+        assert manifest.get(files[1])["player"].startswith("synthetic ")  # from the file name
+
+        # Nothing changed: the directory is not even listed
+        assert manifest.scan() == 0
+
+        changes, seq = manifest.new_since_last_run("test")
+        assert len(changes) == 4
+        manifest.set_cursor("test", seq)
+        assert manifest.new_since_last_run("test") == ([], seq)
+
+        # A copied-in take and a status change are all the next run sees
+        shutil.copyfile(files[1], os.path.join(tmp, "Dr. No_20250101_120000.wav"))
+        assert manifest.scan() == 1
+        manifest.set_status(files[2], "submitted", 42.0)
+        changes, seq = manifest.new_since_last_run("test")
+        assert [row["session"] for row in changes] == ["Dr. No_20250101_120000", os.path.splitext(items[2]["file"])[0]]
+        assert changes[1]["score"] == 42.0 and changes[1]["status"] == "submitted"
+        manifest.set_cursor("test", seq)
+
+        # Compressed to FLAC it is the same session, score and all; deleted, its audio is gone
+        manifest.set_status(files[3], "submitted", 42.0)
+        wav_hash = manifest.get(files[3])["content_hash"]
+        flac = compress(files[3])
+        os.remove(files[1])
+        assert manifest.scan() == 2
+        row = manifest.get(files[3])
+        assert row["audio_path"] == flac and manifest.get(files[1])["audio_path"] is None
+        assert (row["status"], row["score"], row["content_hash"]) == ("submitted", 42.0, wav_hash)
+        assert row["size"] == os.path.getsize(flac)
+        assert len(manifest.sessions()) == 5
+
+        # A take a crashed recorder left pending is handed back once it is old enough
+        manifest.record(files[2], status="pending")
+        assert manifest.release_stale() == []
+        time.sleep(0.05)
+        assert manifest.release_stale(older_than=0.01) == [os.path.splitext(items[2]["file"])[0]]
+        changes, seq = manifest.new_since_last_run("test")
+        assert [(row["session"], row["status"]) for row in changes][-1] == (os.path.splitext(items[2]["file"])[0], "unscored")
+
+        # The change query is a range scan of the seq index
+        plan = manifest._connect().execute("EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE seq > ? ORDER BY seq",
+                                           (seq,)).fetchall()
+        assert any("sessions_seq" in row[-1] for row in plan), plan
+        manifest.close()
+
+    print("✅ Scans and queries only touch what changed")
+
+
+def test_recorder_updates_manifest():
+    """A take gets its row when saved, and its status follows it through the pipeline"""
+    print("\nTesting the manifest in the recorder...")
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # A take the last run saved but never scored
+            manifest = RecordingsManifest(os.path.join(tmp, MANIFEST_FILE))
+            manifest.update("Ann_20250101_120000", player="Ann", status="pending")
+            manifest._connect().execute("UPDATE sessions SET updated_at = 0")
+            manifest.close()
+
+            recorder = Recorder(profile="scoring-8k", duration=1, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp, input_stream=simulated_input_stream(), open_camera=False)
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Thomas_Lars (Maastricht)")
+                assert recorder.scoring_pipeline.join(timeout=60)
+            finally:
+                recorder.close()
+
+            assert session["job"]["status"] == "done", session["job"]
+            assert session["job"]["score"]["name"] == "Thomas_Lars (Maastricht)"  # not "Thomas Lars (Maastricht)"
+            manifest = RecordingsManifest(os.path.join(tmp, MANIFEST_FILE))
+            row = manifest.get(session["audio"])
+            telemetry = session["telemetry"]["audio"]
+            assert row["player"] == "Thomas_Lars (Maastricht)" and row["station"] == recorder.station
+            assert row["status"] == "submitted" and row["score"] == session["job"]["score"]["score"]
+            assert row["sample_rate"] == 8000
+            assert row["duration"] * 8000 == telemetry["preroll_samples"] + telemetry["samples_captured"]
+            assert row["content_hash"] == audio_hash(session["audio"])
+            assert row["metrics"]["audio"] == telemetry
+            assert manifest.scan() == 0  # already known
+            assert manifest.get("Ann_20250101_120000")["status"] == "unscored"
+            manifest.close()
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ {row['session']}: {row['status']}, {row['duration']:.2f} s")
+
+
+if __name__ == "__main__":
+    print("Running recordings manifest tests...\n")
+
+    tests = [test_incremental_queries, test_recorder_updates_manifest]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All recordings manifest tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable leaderboard outbox (score_outbox.py).
+
+Runs server.py's Flask app in a thread on a free local port, so no
+leaderboard has to be running.
+"""
+
+import os
+import sys
+import time
+import socket
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import server
+from score_outbox import ScoreOutbox
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Leaderboard:
+    """server.py on a local port that can be stopped and started again"""
+
+    def __init__(self, port):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}/submit-score"
+        self.requests = 0
+        self._server = None
+
+    def start(self):
+        from werkzeug.serving import make_server
+
+        def counting_app(environ, start_response):
+            self.requests += 1
+            return server.app(environ, start_response)
+
+        self._server = make_server("127.0.0.1", self.port, counting_app, threaded=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def reset_leaderboard():
+    server.scores.clear()
+    server.submission_ids.clear()
+
+
+def test_scores_survive_a_leaderboard_outage():
+    """Scores added while the server is down (and across a restart) all arrive, once each"""
+    print("Testing submission during a leaderboard outage...")
+    reset_leaderboard()
+    leaderboard = Leaderboard(free_port())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "score_outbox.sqlite3")
+        outbox = ScoreOutbox(path, leaderboard.url, timeout=2, retry_delay=0.2, max_retry_delay=0.5).start()
+        started = time.monotonic()
+        for i in range(5):
+            outbox.add({"name": f"Player {i}", "score": 10.0 * i})
+        add_seconds = time.monotonic() - started
+        time.sleep(0.5)
+        assert outbox.pending() == 5 and outbox.stats["failures"] >= 1
+        outbox.close()  # the kiosk is restarted before the server is back
+
+        outbox = ScoreOutbox(path, leaderboard.url, timeout=2, retry_delay=0.2, max_retry_delay=0.5)
+        assert outbox.pending() == 5
+        leaderboard.start()
+        try:
+            outbox.start()
+            outbox.add({"name": "Player 5", "score": 55.0})
+            deadline = time.monotonic() + 10
+            while outbox.pending() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert outbox.pending() == 0 and outbox.pending_scores() == []
+        finally:
+            outbox.close()
+            leaderboard.stop()
+
+    names = sorted(score["name"] for score in server.scores)
+    assert names == [f"Player {i}" for i in range(6)], names
+    assert leaderboard.requests <= 3, leaderboard.requests  # batches, not one request per score
+
+    print(f"✅ 6 scores delivered in {leaderboard.requests} request(s); adding 5 took {add_seconds * 1000:.1f} ms")
+
+
+def test_resent_batch_counts_once():
+    """The server ignores scores it already has, and old servers get single posts"""
+    print("\nTesting resent and single submissions...")
+    reset_leaderboard()
+    leaderboard = Leaderboard(free_port())
+    leaderboard.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = ScoreOutbox(os.path.join(tmp, "outbox.sqlite3"), leaderboard.url)
+        try:
+            submission_id = outbox.add({"name": "Ada", "score": 42.0})
+            assert outbox.flush(timeout=10)
+            outbox.add({"name": "Ada", "score": 42.0, "submission_id": submission_id})  # already stored
+            assert outbox.pending() == 0
+            # A second outbox (another recorder) delivering the same score again
+            other = ScoreOutbox(os.path.join(tmp, "other.sqlite3"), leaderboard.url)
+            other.add({"name": "Ada", "score": 42.0, "submission_id": submission_id})
+            other._use_batches = False  # as against a server without /submit-scores
+            assert other.flush(timeout=10)
+            other.close()
+        finally:
+            outbox.close()
+            leaderboard.stop()
+
+    assert [score["name"] for score in server.scores] == ["Ada"], server.scores
+
+    print("✅ A score sent twice is on the leaderboard once")
+
+
+if __name__ == "__main__":
+    print("Running score outbox tests...\n")
+
+    tests = [test_scores_survive_a_leaderboard_outage, test_resent_batch_counts_once]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All score outbox tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
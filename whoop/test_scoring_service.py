@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the HTTP scoring service (scoring_service.py).
+
+Requests go through Flask's test client to a pool warmed with the synthetic
+corpus template, and ?submit=1 goes to server.py on a free local port, so
+no real chirp or running leaderboard is needed.
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import server
+import scoring_service
+from scipy.io import wavfile
+from scoring_pool import _warm_up
+from audio_storage import compress
+from synthetic_corpus import generate_corpus, read_manifest
+from test_score_outbox import Leaderboard, free_port, reset_leaderboard
+
+
+def test_score_uploads():
+    """WAV and raw PCM uploads get the score of the file, bad requests get their error code"""
+    print("Testing /score...")
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = read_manifest(generate_corpus(tmp, 2, seed=11))
+        template = os.path.join(tmp, "template.wav")
+        wav_path = os.path.join(tmp, items[0]["file"])
+        expected = compare_mimic(wav_path, template)
+        with open(wav_path, "rb") as f:
+            wav_bytes = f.read()
+        rate, data = wavfile.read(wav_path)
+        assert data.dtype.name == "int16" and data.ndim == 1
+
+        scoring_service.start_pool(2, template)
+        client = scoring_service.app.test_client()
+        try:
+            assert client.get("/health").get_json() == {"status": "ok", "workers": 2}
+
+            response = client.post("/score?name=Alice", data=wav_bytes)
+            assert response.status_code == 200, response.get_json()
+            assert response.get_json() == {"name": "Alice", "score": expected}
+
+            # The same samples sent raw, as mono and as two identical channels
+            response = client.post(f"/score?name=Bo&rate={rate}&dtype=int16", data=data.tobytes(),
+                                   content_type="application/octet-stream")
+            assert response.get_json() == {"name": "Bo", "score": expected}
+            stereo = data.repeat(2).tobytes()
+            response = client.post(f"/score?rate={rate}&channels=2", data=stereo,
+                                   content_type="application/octet-stream")
+            assert response.get_json() == {"name": "Unknown", "score": expected}
+
+            # Requests that cannot be scored
+            assert client.post("/score", data=b"").status_code == 400
+            assert client.post("/score", data=data.tobytes()).status_code == 400  # no rate
+            assert client.post(f"/score?rate={rate}&dtype=int8", data=data.tobytes()).status_code == 400
+            assert client.post(f"/score?rate={rate}", data=data.tobytes() + b"\0").status_code == 400
+            assert client.post(f"/score?rate={rate}&channels=0", data=data.tobytes()).status_code == 400
+            response = client.post("/score", data=b"RIFF" + b"\0" * 100)
+            assert response.status_code == 500 and "scoring failed" in response.get_json()["error"]
+
+            # Uploads over the limit are refused before anything is read
+            scoring_service.app.config["MAX_CONTENT_LENGTH"] = len(wav_bytes) - 1
+            try:
+                assert client.post("/score", data=wav_bytes).status_code == 413
+            finally:
+                scoring_service.app.config["MAX_CONTENT_LENGTH"] = scoring_service.MAX_UPLOAD_BYTES
+
+            # A job the workers do not finish in time: both are busy
+            busy = [scoring_service.pool.submit(_warm_up, 1.0) for _ in range(2)]
+            job_timeout = scoring_service.JOB_TIMEOUT
+            scoring_service.JOB_TIMEOUT = 0.2
+            try:
+                response = client.post("/score", data=wav_bytes)
+                assert response.status_code == 503 and response.get_json() == {"error": "scoring timed out"}
+            finally:
+                scoring_service.JOB_TIMEOUT = job_timeout
+            for job in busy:
+                job.result()
+        finally:
+            scoring_service.pool.shutdown(cancel_futures=True)
+
+    print(f"✅ WAV and raw PCM both scored {expected}, errors answered 400/413/500/503")
+
+
+def test_submit_forwards_to_leaderboard():
+    """?submit=1 puts the score on the leaderboard and says whether that worked"""
+    print("\nTesting /score?submit=1...")
+    reset_leaderboard()
+    leaderboard = Leaderboard(free_port())
+    server_url = scoring_service.SERVER_URL
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = read_manifest(generate_corpus(tmp, 1, seed=12))
+        with open(os.path.join(tmp, items[0]["file"]), "rb") as f:
+            wav_bytes = f.read()
+
+        # The template may be archived as FLAC like any take
+        scoring_service.start_pool(1, compress(os.path.join(tmp, "template.wav")))
+        client = scoring_service.app.test_client()
+        scoring_service.SERVER_URL = leaderboard.url
+        try:
+            # Nothing listening yet
+            response = client.post("/score?name=Cy&submit=1", data=wav_bytes)
+            assert response.get_json()["submitted"] is False and server.scores == []
+
+            leaderboard.start()
+            try:
+                response = client.post("/score?name=Cy&submit=yes", data=wav_bytes)
+                result = response.get_json()
+                assert result["submitted"] is True
+                deadline = time.monotonic() + 5
+                while not server.scores and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                assert [(s["name"], s["score"]) for s in server.scores] == [("Cy", result["score"])]
+
+                # Without ?submit the leaderboard is left alone
+                assert "submitted" not in client.post("/score?name=Di", data=wav_bytes).get_json()
+                assert len(server.scores) == 1
+            finally:
+                leaderboard.stop()
+        finally:
+            scoring_service.SERVER_URL = server_url
+            scoring_service.pool.shutdown(cancel_futures=True)
+            reset_leaderboard()
+
+    print(f"✅ Forwarded {result}")
+
+
+if __name__ == "__main__":
+    print("Running scoring service tests...\n")
+
+    tests = [test_score_uploads, test_submit_forwards_to_leaderboard]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All scoring service tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
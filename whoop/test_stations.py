@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for several recording stations on one host (stations.py).
+
+Uses the simulated devices from sim_devices.py, so no microphone or camera
+is needed.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from recorder_core import Recorder, RecorderEvents
+from recording_metadata import read_sidecar
+from sim_devices import SimulatedInputStream, simulated_camera_opener
+from stations import Station, StationGroup, parse_stations
+
+
+class CollectingEvents(RecorderEvents):
+    """Keeps the job statuses a station receives"""
+
+    def __init__(self):
+        self.job_messages = []
+
+    def status(self, text):
+        pass
+
+    def job_status(self, job, message):
+        self.job_messages.append((job["station"], job["status"]))
+
+
+def test_parse_stations():
+    """Station specs give devices per booth and reject clashes"""
+    print("Testing station specs...")
+
+    left, right, quiet = parse_stations("left:1:0, right:USB Mic ,quiet::none")
+    assert left == Station("left", 1, 0)
+    assert right == Station("right", "USB Mic", 1)  # camera defaults to the position
+    assert quiet == Station("quiet", None, None)
+    assert parse_stations("") == []
+    for bad in ("a:1:0,a:2:1", "a:1:0,b:2:0", ":1:0", "a:1:front"):
+        try:
+            parse_stations(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} was accepted")
+
+    print("✅ Station specs parsed")
+
+
+def test_stations_record_concurrently():
+    """Two booths record the same name at once into one directory and share the scoring"""
+    print("\nTesting two stations on one host...")
+
+    opened_devices = []
+
+    def input_stream(**kwargs):
+        opened_devices.append(kwargs.get("device"))
+        return SimulatedInputStream(seed=kwargs["device"], **kwargs)  # a different player per booth
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorders run whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            group = StationGroup(scoring_workers=2)
+            events = {}
+            for station in parse_stations("left:3:0,right:4:1"):
+                events[station.name] = CollectingEvents()
+                recorder = group.add(station, events[station.name], sample_rate=8000, duration=1,
+                                     countdown_time=0, preroll_seconds=0.5, recordings_dir=tmp,
+                                     input_stream=input_stream,
+                                     open_camera=simulated_camera_opener(fps=15, width=160, height=120))
+                recorder.submit_timeout = 1
+            assert group.outbox._thread is not None  # sending without waiting for start()
+            group.start()
+            time.sleep(0.6)
+
+            sessions = {}
+
+            def record(name):
+                sessions[name] = group.recorders[name].record_session("Sam")
+
+            threads = [threading.Thread(target=record, args=(name,)) for name in group.recorders]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+            try:
+                assert group.scoring_pipeline.join(timeout=60)
+            finally:
+                group.close()
+
+            assert sorted(opened_devices) == [3, 4]
+            assert group.recorders["left"].scoring_pipeline is group.recorders["right"].scoring_pipeline
+            assert group.recorders["left"].outbox is group.recorders["right"].outbox
+            assert os.path.exists(os.path.join(tmp, "score_outbox.sqlite3"))  # both scores went through it
+            left, right = sessions["left"], sessions["right"]
+            assert left["audio"] != right["audio"] and os.path.exists(left["audio"]) and os.path.exists(right["audio"])
+            for name, session in sessions.items():
+                assert session["job"]["status"] == "done" and session["job"]["station"] == name
+                assert read_sidecar(session["audio"])["telemetry"]["station"] == name
+                assert session["video"] and os.path.exists(session["video"])
+                # Each station hears only about its own takes
+                assert {station for station, _ in events[name].job_messages} == {name}
+            # Side by side, not one after the other
+            assert elapsed < sum(s["timings"]["capture"] for s in sessions.values()), elapsed
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ Two takes of 1 s recorded side by side in {elapsed:.2f} s and scored by one pipeline")
+
+
+def test_failed_take_leaves_no_file():
+    """The file name claimed for a take is given back when its capture fails"""
+    print("\nTesting a failed capture...")
+
+    def unplugged_stream(**kwargs):
+        raise OSError("device unplugged")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = Recorder(sample_rate=8000, duration=1, countdown_time=0, preroll_seconds=0,
+                            recordings_dir=tmp, input_stream=unplugged_stream, open_camera=False)
+        recorder.start()
+        try:
+            for _ in range(2):
+                try:
+                    recorder.record_session("Sam")
+                except OSError:
+                    pass
+                else:
+                    raise AssertionError("the capture did not fail")
+        finally:
+            recorder.close()
+        left = [name for name in os.listdir(tmp) if name.endswith(".wav")]
+        assert left == [], left
+
+    print("✅ No empty WAV left behind")
+
+
+if __name__ == "__main__":
+    print("Running station tests...\n")
+
+    tests = [test_parse_stations, test_stations_record_concurrently, test_failed_take_leaves_no_file]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All station tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Scoring tests on the deterministic synthetic corpus.
+
+Runs offline without a microphone, camera or the real chirp template:
+the template and mimics come from synthetic_corpus.py.
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_corpus import (ChirpParams, MimicParams, chirp_signal, mimic_signal,
+                              generate_corpus, generate_item, read_manifest, write_wav)
+
+
+def test_corpus_is_deterministic():
+    """Items depend only on (seed, index), whatever the corpus size"""
+    print("Testing synthetic corpus determinism...")
+
+    params_a, signal_a = generate_item(7, 3)
+    params_b, signal_b = generate_item(7, 3)
+    _, signal_c = generate_item(8, 3)
+
+    assert params_a == params_b
+    assert np.array_equal(signal_a, signal_b)
+    assert not np.array_equal(signal_a, signal_c)
+
+    with tempfile.TemporaryDirectory() as small, tempfile.TemporaryDirectory() as large:
+        small_manifest = read_manifest(generate_corpus(small, 3, seed=1))
+        large_manifest = read_manifest(generate_corpus(large, 6, seed=1))
+        assert small_manifest == large_manifest[:3]
+        for item in small_manifest:
+            with open(os.path.join(small, item["file"]), "rb") as f1, \
+                    open(os.path.join(large, item["file"]), "rb") as f2:
+                assert f1.read() == f2.read()
+
+    print("✅ Synthetic corpus is deterministic")
+
+
+def test_mimic_params_are_honoured():
+    """Sample rate, channels and duration of mimics follow their parameters"""
+    print("\nTesting mimic parameters...")
+
+    rng = np.random.default_rng(0)
+    mimic = mimic_signal(rng, mimic_params=MimicParams(sample_rate=8000, channels=2, duration=2.0))
+    assert mimic.shape == (16000, 2)
+    assert np.abs(mimic).max() <= 1.0
+
+    chirp = chirp_signal(ChirpParams(start_frequency=50, end_frequency=200))
+    spectrum = np.abs(np.fft.rfft(chirp))
+    freqs = np.fft.rfftfreq(len(chirp), 1.0 / 44100)
+    assert 40 <= freqs[np.argmax(spectrum)] <= 220
+
+    print("✅ Mimic parameters are honoured")
+
+
+def test_score_follows_snr():
+    """compare_mimic scores clean mimics higher than noisy ones"""
+    print("\nTesting score against SNR...")
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.wav")
+        write_wav(template, chirp_signal(), 44100)
+        assert compare_mimic(template, template) == 100.0
+        stereo = os.path.join(tmp, "stereo_20250101_000000.wav")
+        write_wav(stereo, np.stack([chirp_signal()] * 2, axis=1), 44100)
+        assert compare_mimic(stereo, template) == 100.0
+
+        scores = []
+        for snr in (0.01, 0.03, 0.1):
+            path = os.path.join(tmp, f"snr_{snr}_20250101_000000.wav")
+            write_wav(path, mimic_signal(np.random.default_rng(1), mimic_params=MimicParams(snr=snr)), 44100)
+            scores.append(compare_mimic(path, template))
+        print(f"   Scores for SNR 0.01, 0.03, 0.1: {scores}")
+        assert scores[0] < scores[1] < scores[2]
+
+    print("✅ Score increases with SNR")
+
+
+def test_prescreen_tracks_exact_score():
+    """The approximate prescreen ranks a synthetic corpus like the matched filter"""
+    print("\nTesting prescreen against exact scores...")
+    from whoop_prescreen import correlation_report, rank_recordings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, 20, seed=2, snr_range=(0.01, 0.3))
+        wav_files = sorted(os.path.join(tmp, f) for f in os.listdir(tmp) if f.startswith("synthetic"))
+        template = os.path.join(tmp, "template.wav")
+
+        report = correlation_report(wav_files, template)
+        print(f"   Spearman rho = {report['spearman']:.3f}")
+        assert report["spearman"] > 0.7
+
+        ranked = rank_recordings(wav_files, template, top_k=3, margin=0.0)
+        exact_best = max(report["exact"])
+        assert ranked[0]["exact"] and ranked[0]["score"] == exact_best
+
+    print("✅ Prescreen agrees with the matched filter")
+
+
+def test_fingerprint_flags_replays():
+    """Copies and replays are flagged, unrelated audio is not"""
+    print("\nTesting fingerprint index...")
+    from whoop_fingerprint import load_index, screen_submission, ALREADY_SUBMITTED
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.wav")
+        write_wav(template, chirp_signal(), 44100)
+        index = load_index(tmp, template)
+
+        rng = np.random.default_rng(3)
+        noise = os.path.join(tmp, "noise_20250101_000000.wav")
+        write_wav(noise, rng.normal(0, 0.1, 44100 * 5), 44100)
+        replay = os.path.join(tmp, "replay_20250101_000000.wav")
+        write_wav(replay, mimic_signal(rng, mimic_params=MimicParams(snr=5.0, time_offset=0.3)), 44100)
+        copy = os.path.join(tmp, "copy_20250101_000001.wav")
+        with open(noise, "rb") as src, open(copy, "wb") as dst:
+            dst.write(src.read())
+
+        assert screen_submission(noise, index) is None
+        assert screen_submission(replay, index) == "replay of the real chirp"
+        assert screen_submission(copy, index) == "duplicate of noise_20250101_000000.wav"
+
+        # The same take sent again is not let through, also after a restart
+        assert screen_submission(noise, index) == ALREADY_SUBMITTED
+        assert screen_submission(noise, load_index(tmp, template)) == ALREADY_SUBMITTED
+        index.save()
+        assert screen_submission(noise, load_index(tmp, template)) == ALREADY_SUBMITTED
+
+    print("✅ Fingerprint index flags copies and replays")
+
+
+def test_fingerprint_index_is_shared():
+    """Two open indexes on one directory see each other's additions, also across a compaction"""
+    print("\nTesting fingerprint index journal...")
+    from whoop_fingerprint import FingerprintIndex, DEFAULT_INDEX_FILE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, DEFAULT_INDEX_FILE)
+        booth, ingest = FingerprintIndex(path), FingerprintIndex(path)
+        rng = np.random.default_rng(4)
+        takes = [(f"take{i}.wav", rng.integers(0, 1 << 24, 200), np.sort(rng.integers(0, 300, 200)))
+                 for i in range(4)]
+
+        booth.add(*takes[0])
+        assert not os.path.exists(path)  # only the journal was written
+        ingest.refresh()
+        assert "take0.wav" in ingest and ingest.query(*takes[0][1:])[0][:2] == ("take0.wav", 200)
+
+        ingest.add(*takes[1])
+        booth.save()
+        ingest.add(*takes[2])  # after the other process compacted
+        booth.add(*takes[3])
+        for index in (booth, ingest, FingerprintIndex(path)):
+            index.refresh()
+            assert len(index) == 4
+            for name, hashes, times in takes:
+                assert index.query(hashes, times)[0][:2] == (name, 200)
+
+    print("✅ Fingerprint indexes share additions through the journal")
+
+
+def test_similarity_index_finds_nearest():
+    """A recording's closest neighbour is a near copy of it"""
+    print("\nTesting similarity index...")
+    from whoop_similarity import SimilarityIndex, embedding_data
+
+    index = SimilarityIndex()
+    vectors = {}
+    for i, shift in enumerate((0.8, 1.0, 1.25)):
+        signal = mimic_signal(np.random.default_rng(i), mimic_params=MimicParams(snr=1.0, frequency_shift=shift))
+        vectors[shift] = embedding_data(signal[:, 0], 44100)
+        index.add(f"player{i}", f"player{i}_20250101_000000.wav", vectors[shift])
+
+    probe = mimic_signal(np.random.default_rng(9), mimic_params=MimicParams(snr=1.0, frequency_shift=1.25))
+    matches = index.query(embedding_data(probe[:, 0], 44100), k=2)
+    assert matches[0][0] == "player2"
+    assert index.query(vectors[1.0], k=3, exclude_name="player1")[0][0] != "player1"
+
+    print("✅ Similarity index finds the nearest recording")
+
+
+def test_similarity_saves_merge():
+    """Two processes saving the similarity index keep each other's recordings"""
+    print("\nTesting shared similarity index...")
+    from whoop_similarity import SimilarityIndex, DEFAULT_INDEX_FILE, EMBEDDING_SIZE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, DEFAULT_INDEX_FILE)
+        booth, ingest = SimilarityIndex(path), SimilarityIndex(path)
+        vectors = np.eye(3, EMBEDDING_SIZE, dtype=np.float32)
+        booth.add("Al", os.path.join(tmp, "Al_20250101_000000.wav"), vectors[0])
+        ingest.add("Bo", os.path.join(tmp, "Bo_20250101_000000.wav"), vectors[1])
+        booth.save()
+        ingest.save()
+        booth.add("Cy", os.path.join(tmp, "Cy_20250101_000000.wav"), vectors[2])
+        booth.save()
+
+        stored = SimilarityIndex(path)
+        assert sorted(stored.names) == ["Al", "Bo", "Cy"] and len(booth) == 3
+        assert stored.query(vectors[1], k=1)[0][0] == "Bo"
+
+    print("✅ Similarity index saves merge with each other")
+
+
+def test_similar_players_fill_k():
+    """k distinct players come back even if the nearest takes are one player's, archived or gone"""
+    print("\nTesting similar players shortlist...")
+    from whoop_similarity import SimilarityIndex, DEFAULT_INDEX_FILE, embedding, most_similar_players
+    from recording_retention import ArchiveIndex, archive_sessions, find_sessions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SimilarityIndex(os.path.join(tmp, DEFAULT_INDEX_FILE))
+        players = ["Al"] * 4 + ["Bo", "Cy", "Di"]
+        for i, player in enumerate(players):
+            wav = os.path.join(tmp, f"{player}_20250101_00000{i}.wav")
+            signal = mimic_signal(np.random.default_rng(i), mimic_params=MimicParams(snr=2.0))
+            write_wav(wav, signal[:, 0], 44100)
+            index.add(player, wav, embedding(wav))
+            assert wav in index
+        os.remove(os.path.join(tmp, "Bo_20250101_000004.wav"))
+        archive_sessions([s for s in find_sessions(tmp) if os.path.basename(s.stem).startswith("Cy")],
+                         ArchiveIndex(tmp))
+        assert not os.path.exists(os.path.join(tmp, "Cy_20250101_000005.wav"))
+
+        probe = os.path.join(tmp, "Ed_20250101_000009.wav")
+        write_wav(probe, mimic_signal(np.random.default_rng(9), mimic_params=MimicParams(snr=2.0))[:, 0], 44100)
+        similar = most_similar_players(probe, index, k=3, shortlist=1, register=False)
+        assert sorted(name for name, _ in similar) == ["Al", "Cy", "Di"], similar
+        assert probe not in index
+
+    print(f"✅ Similar players: {similar}")
+
+
+if __name__ == "__main__":
+    print("Running synthetic scoring tests...\n")
+
+    tests = [test_corpus_is_deterministic, test_mimic_params_are_honoured, test_score_follows_snr,
+             test_prescreen_tracks_exact_score, test_fingerprint_flags_replays,
+             test_fingerprint_index_is_shared, test_similarity_index_finds_nearest,
+             test_similarity_saves_merge, test_similar_players_fill_k]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All synthetic scoring tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the UI update queue in ui_pump.py.
+
+These run without a display: a stand-in root collects the after() callbacks.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ui_pump import UIPump
+
+
+class FakeRoot:
+    """Stand-in for tk.Tk that lets the test run scheduled callbacks."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+    def run_pending(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+class FakeVar:
+    """Stand-in for tk.StringVar that remembers every value it was set to."""
+
+    def __init__(self):
+        self.values = []
+
+    def set(self, value):
+        self.values.append(value)
+
+
+class FakeWidget:
+    def __init__(self):
+        self.options = {}
+        self.configure_calls = 0
+
+    def configure(self, **options):
+        self.options.update(options)
+        self.configure_calls += 1
+
+
+def test_updates_are_coalesced():
+    """Only the latest value of each variable or widget option is applied per tick"""
+    print("Testing UI update coalescing...")
+
+    root = FakeRoot()
+    pump = UIPump(root)
+    pump.start()
+    status, progress = FakeVar(), FakeWidget()
+
+    # A worker thread posting one progress update per video frame
+    def worker():
+        for i in range(300):
+            pump.configure(progress, value=i)
+        pump.set_var(status, "recording")
+        pump.set_var(status, "saving")
+        pump.configure(progress, maximum=50)
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert status.values == [] and progress.configure_calls == 0  # nothing applied off the main thread
+    root.run_pending()
+
+    assert status.values == ["saving"]
+    assert progress.options == {"value": 299, "maximum": 50} and progress.configure_calls == 2
+    assert pump.coalesced == 300 and pump.applied == 3
+    assert len(root.scheduled) == 1  # the pump keeps ticking
+
+    print("✅ 303 updates applied as 3")
+
+
+def test_calls_run_once_in_order():
+    """call() is never coalesced and a tick stops when its budget is spent"""
+    print("\nTesting UI calls and budget...")
+
+    root = FakeRoot()
+    pump = UIPump(root, budget_ms=0)
+    pump.start()
+    calls = []
+    for i in range(3):
+        pump.call(calls.append, i)
+
+    root.run_pending()
+    assert calls == [0] and pump.pending() == 2
+    root.run_pending()
+    root.run_pending()
+    assert calls == [0, 1, 2]
+
+    # A coalesced update keeps its place ahead of a call queued after it
+    status = FakeVar()
+    pump.set_var(status, "Recording...")
+    pump.call(lambda: calls.append(status.values[-1]))
+    pump.set_var(status, "Scoring...")
+    pump.drain(budget_ms=1000)
+    assert calls[-1] == "Scoring..." and status.values == ["Scoring..."]
+
+    pump.stop()
+    root.run_pending()
+    assert root.scheduled == []
+
+    print("✅ Calls run once each, spread over ticks")
+
+
+if __name__ == "__main__":
+    print("Running UI pump tests...\n")
+
+    tests = [test_updates_are_coalesced, test_calls_run_once_in_order]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All UI pump tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
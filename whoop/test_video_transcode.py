@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for capturing to a Motion-JPEG intermediate and transcoding it in the
+background (video_transcode.py).
+
+Uses the simulated devices from sim_devices.py, so no camera is needed.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from recorder_core import Recorder
+from recording_metadata import read_sidecar, update_sidecar
+from sim_devices import simulated_input_stream, simulated_camera_opener, synthetic_frame
+from video_transcode import Transcoder, frame_count
+
+
+def write_intermediate(path, frames=20, size=(160, 120), fps=15):
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(synthetic_frame(i, *size))
+    writer.release()
+
+
+def test_transcoder_waits_for_capture():
+    """Nothing is transcoded while a capture runs; afterwards the MP4 replaces the AVI"""
+    print("Testing background transcoding...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stem = os.path.join(tmp, "Eve_20250101_120000")
+        write_intermediate(stem + ".avi")
+        open(stem + ".wav", "wb").close()
+        update_sidecar(stem + ".wav", video="Eve_20250101_120000.avi")
+
+        transcoder = Transcoder()
+        transcoder.capture_started()
+        job = transcoder.submit(stem + ".avi", stem + ".mp4")
+        time.sleep(0.5)
+        assert job["status"] != "done" and os.path.exists(stem + ".avi")
+        transcoder.capture_finished()
+        try:
+            assert transcoder.join(timeout=60)
+        finally:
+            transcoder.shutdown()
+
+        assert job["status"] == "done", job.get("error")
+        assert frame_count(stem + ".mp4") == 20 and not os.path.exists(stem + ".avi")
+        assert read_sidecar(stem + ".wav")["video"] == "Eve_20250101_120000.mp4"
+
+    print(f"✅ Transcoded in {job['timings']['Transcoding']:.2f} s once the capture had finished")
+
+
+def test_leftover_intermediates():
+    """Intermediates left behind are converted by running the script on the directory"""
+    print("\nTesting left-over intermediates...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_intermediate(os.path.join(tmp, "a_20250101_120000.avi"), frames=5)
+        write_intermediate(os.path.join(tmp, "b_20250101_120000.avi"), frames=7)
+        result = subprocess.run([sys.executable, os.path.join(HERE, "video_transcode.py"), tmp],
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert sorted(os.listdir(tmp)) == ["a_20250101_120000.mp4", "b_20250101_120000.mp4"]
+        assert frame_count(os.path.join(tmp, "b_20250101_120000.mp4")) == 7
+
+    print("✅ Both left-overs converted")
+
+
+def test_recorder_captures_intermediate():
+    """A session writes MJPG while capturing and ends up with the archival MP4"""
+    print("\nTesting the recorder's capture intermediate...")
+    import cv2
+
+    cwd = os.getcwd()
+    os.chdir(HERE)  # the recorder runs whoop_gamescore.py from here
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(profile="scoring-8k", duration=1, countdown_time=0, preroll_seconds=0.5,
+                                recordings_dir=tmp, input_stream=simulated_input_stream(),
+                                open_camera=simulated_camera_opener(fps=15, width=320, height=240))
+            recorder.submit_timeout = 1
+            recorder.start()
+            time.sleep(0.6)
+            try:
+                session = recorder.record_session("Hal")
+                intermediate = os.path.splitext(session["video"])[0] + ".avi"
+                assert session["video"].endswith(".mp4") and session["transcode"] is not None
+                assert session["transcode"]["source"] == intermediate
+                video = cv2.VideoCapture(intermediate)
+                assert video.isOpened() and int(video.get(cv2.CAP_PROP_FOURCC)) == cv2.VideoWriter_fourcc(*"MJPG")
+                video.release()
+            finally:
+                recorder.close()  # waits for the transcode
+
+            assert session["transcode"]["status"] == "done", session["transcode"].get("error")
+            assert not os.path.exists(intermediate)
+            frames = frame_count(session["video"])
+            assert frames == session["telemetry"]["video"]["frames_written"], frames
+            assert read_sidecar(session["audio"])["video"] == os.path.basename(session["video"])
+    finally:
+        os.chdir(cwd)
+
+    print(f"✅ {frames} frames captured as MJPG and archived as MP4")
+
+
+if __name__ == "__main__":
+    print("Running video transcode tests...\n")
+
+    tests = [test_transcoder_waits_for_capture, test_leftover_intermediates, test_recorder_captures_intermediate]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All video transcode tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
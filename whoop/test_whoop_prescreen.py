@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the approximate prescreen and exact rescoring (whoop_prescreen.py).
+
+Uses the synthetic corpus, so no real chirp template is needed.
+"""
+
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from synthetic_corpus import generate_corpus
+from whoop_prescreen import rank_recordings, select_for_rescoring
+
+
+def test_select_for_rescoring():
+    """The top K and everything within the margin of the cutoff are rescored, best first"""
+    print("Testing the choice of recordings to rescore...")
+
+    assert select_for_rescoring([50.0, 10.0, 48.0, 30.0, 47.5], top_k=2, margin=1.0) == [0, 2, 4]
+    assert select_for_rescoring([50.0, 10.0, 48.0, 30.0, 47.5], top_k=2, margin=0.0) == [0, 2]
+    assert select_for_rescoring([5.0, 7.0], top_k=10) == [1, 0]
+    assert select_for_rescoring([]) == []
+
+    print("✅ Top K plus the near misses")
+
+
+def test_exact_scores_never_mix_with_prescreen_scores():
+    """Rescored takes are ranked by exact score, the rest in a tail ranked by prescreen score"""
+    print("\nTesting the ranking of rescored and prescreened takes...")
+    from whoop_gamescore import compare_mimic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, 12, seed=4, snr_range=(0.01, 0.3))
+        wav_files = sorted(os.path.join(tmp, f) for f in os.listdir(tmp) if f.startswith("synthetic"))
+        template = os.path.join(tmp, "template.wav")
+
+        ranked = rank_recordings(wav_files, template, top_k=3, margin=0.0)
+        assert sorted(r["file"] for r in ranked) == wav_files
+        rescored = [r for r in ranked if r["exact"]]
+        tail = [r for r in ranked if not r["exact"]]
+        assert len(rescored) >= 3 and ranked[:len(rescored)] == rescored
+
+        assert [r["score"] for r in rescored] == sorted((r["score"] for r in rescored), reverse=True)
+        for r in rescored:
+            assert r["score"] == compare_mimic(r["file"], template)
+        assert [r["approx_score"] for r in tail] == sorted((r["approx_score"] for r in tail), reverse=True)
+        assert all(r["score"] == r["approx_score"] for r in tail)
+        # Only the prescreen's best were rescored
+        assert max(r["approx_score"] for r in tail) <= min(r["approx_score"] for r in rescored)
+
+    print(f"✅ {len(rescored)} rescored, {len(tail)} in the prescreen tail")
+
+
+if __name__ == "__main__":
+    print("Running prescreen tests...\n")
+
+    tests = [test_select_for_rescoring, test_exact_scores_never_mix_with_prescreen_scores]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed {e}")
+
+    if failed == 0:
+        print("\n✅ All prescreen tests passed!")
+    else:
+        print(f"\n⚠️  {failed} test(s) failed. Check the messages above.")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Thread-safe way for worker threads to update the Tk user interface.
+
+Tk objects may only be touched from the thread running mainloop. Worker
+threads therefore post updates to a UIPump, and the main loop applies them
+from a root.after() callback every interval_ms milliseconds:
+
+- set_var(), configure() and update() are coalesced: if the same variable,
+  widget option or key is updated several times between two ticks, only the
+  latest value is applied, at the place of the first. A progress bar fed on
+  every video frame thus costs one redraw per tick.
+- call() runs a function (e.g. a messagebox) exactly once, in order.
+
+Each tick spends at most budget_ms applying updates and leaves the rest for
+the next tick, so a burst of updates never freezes the window.
+"""
+
+import time
+import itertools
+import threading
+import collections
+
+
+class UIPump:
+    """Queue of UI updates drained on the Tk main thread by root.after."""
+
+    def __init__(self, root, interval_ms=33, budget_ms=10):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.budget_ms = budget_ms
+        self.applied = 0  # updates applied so far
+        self.coalesced = 0  # updates replaced by a newer one before being applied
+        self._pending = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._running = False
+
+    def start(self):
+        """Start draining the queue; call from the main thread."""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        self._running = False
+
+    def update(self, key, function, *args, **kwargs):
+        """
+        Queue function(*args, **kwargs), replacing anything queued under the same key.
+
+        A replaced update keeps its place in the queue, so it still runs
+        before any call() queued after it.
+        """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (function, args, kwargs)
+
+    def set_var(self, variable, value):
+        """Queue variable.set(value) for a Tk variable."""
+        self.update(("var", id(variable)), variable.set, value)
+
+    def configure(self, widget, **options):
+        """Queue widget.configure(**options); later options of the same names win."""
+        self.update(("configure", id(widget), tuple(sorted(options))), widget.configure, **options)
+
+    def call(self, function, *args, **kwargs):
+        """Queue a call that is never coalesced."""
+        self.update(("call", next(self._counter)), function, *args, **kwargs)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self, budget_ms=None):
+        """Apply queued updates on the calling (main) thread for up to budget_ms."""
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                _, (function, args, kwargs) = self._pending.popitem(last=False)
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                print(f"Warning: UI update failed: {e}")
+            self.applied += 1
+            if time.perf_counter() >= deadline:
+                return
+
+    def _tick(self):
+        if not self._running:
+            return
+        self.drain()
+        self.root.after(self.interval_ms, self._tick)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Background transcoding of captured video to the archival codec.
+
+During a take the recorder writes the video as Motion-JPEG in an AVI file
+(the capture profile's video_intermediate): every frame is compressed on
+its own, which costs a fraction of an MPEG-4 encode and never has to wait
+for earlier frames. Once the take is saved, a Transcoder converts the AVI to
+the archival MP4 (the probed codec, mp4v by default):
+
+- in a child process at the lowest CPU priority and with one OpenCV
+  thread, so it never takes CPU from capture or scoring
+- only while no recorder is capturing (capture_started/capture_finished)
+- one file at a time by default, on a JobPipeline worker
+
+The intermediate is deleted once the MP4 has the same number of frames, and
+the recording's sidecar is pointed at the MP4. Left-over intermediates (a
+transcode that failed or was interrupted) can be converted later with this
+script.
+
+Usage:
+    python3 video_transcode.py recordings/Alice_20250101_120000.avi
+    python3 video_transcode.py recordings/          # every left-over .avi
+    python3 video_transcode.py in.avi --output out.mp4 --codec mp4v
+"""
+
+import os
+import sys
+import time
+import argparse
+import platform
+import threading
+import subprocess
+
+from job_pipeline import JobPipeline, Stage
+from recording_metadata import update_sidecar
+from audio_storage import existing_audio_path
+
+INTERMEDIATE_EXTENSION = ".avi"
+ARCHIVE_EXTENSION = ".mp4"
+DEFAULT_ARCHIVE_CODEC = "mp4v"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def lower_priority():
+    """Run the current process at the lowest CPU priority the platform allows."""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(19)
+        except OSError:
+            pass
+
+
+def transcode(source, target, codec=DEFAULT_ARCHIVE_CODEC, width=None):
+    """
+    Re-encode a video file with `codec`, keeping its frame rate, and its
+    size unless `width` scales it down (keeping the aspect ratio).
+
+    Returns the number of frames written; raises RuntimeError if the source
+    cannot be read or the target not written. target may be the source.
+    """
+    import cv2
+    cv2.setNumThreads(1)
+    video = cv2.VideoCapture(source)
+    if not video.isOpened():
+        raise RuntimeError(f"cannot read {source}")
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    size = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    scaled = width is not None and 0 < width < size[0]
+    if scaled:
+        size = (int(width), max(2, int(round(size[1] * width / size[0] / 2)) * 2))
+    stem, extension = os.path.splitext(target)
+    partial = stem + ".part" + extension  # renamed once complete
+    writer = cv2.VideoWriter(partial, cv2.VideoWriter_fourcc(*codec), fps, size)
+    if not writer.isOpened():
+        video.release()
+        raise RuntimeError(f"cannot write {target} with codec {codec}")
+    frames = 0
+    try:
+        while True:
+            ok, frame = video.read()
+            if not ok:
+                break
+            if scaled:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            writer.write(frame)
+            frames += 1
+    finally:
+        video.release()
+        writer.release()
+    if frames == 0:
+        os.remove(partial)
+        raise RuntimeError(f"{source} has no frames")
+    os.replace(partial, target)
+    return frames
+
+
+def frame_count(path):
+    """Number of frames in a video file, 0 if it cannot be opened."""
+    import cv2
+    video = cv2.VideoCapture(path)
+    try:
+        return int(video.get(cv2.CAP_PROP_FRAME_COUNT)) if video.isOpened() else 0
+    finally:
+        video.release()
+
+
+class Transcoder:
+    """
+    Pool that converts capture intermediates to the archival codec.
+
+    submit(source, target, codec) queues a conversion; each runs
+    `python3 video_transcode.py` at low priority once no capture is in
+    progress. Recorders call capture_started() and capture_finished()
+    around every take; several recorders (stations) can share one
+    Transcoder. job["status"] ends as "done" or "failed".
+    """
+
+    def __init__(self, workers=1, keep_intermediate=False, timeout=600, on_status=None):
+        self.keep_intermediate = keep_intermediate
+        self.timeout = timeout  # seconds per file
+        self.idle = threading.Event()  # set while nothing is being captured
+        self.idle.set()
+        self._capturing = 0
+        self._lock = threading.Lock()
+        self.pipeline = JobPipeline([Stage("Transcoding", self._transcode, workers=workers)],
+                                    on_status=on_status)
+
+    def capture_started(self):
+        with self._lock:
+            self._capturing += 1
+            self.idle.clear()
+
+    def capture_finished(self):
+        with self._lock:
+            self._capturing = max(0, self._capturing - 1)
+            if self._capturing == 0:
+                self.idle.set()
+
+    def submit(self, source, target, codec=DEFAULT_ARCHIVE_CODEC):
+        """Queue the conversion of source to target and return its job."""
+        return self.pipeline.submit({"name": os.path.basename(source), "source": source,
+                                     "target": target, "codec": codec})
+
+    def _transcode(self, job):
+        self.idle.wait()
+        command = [sys.executable, os.path.join(HERE, "video_transcode.py"), job["source"],
+                   "--output", job["target"], "--codec", job["codec"]]
+        if self.keep_intermediate:
+            command.append("--keep")
+        options = {}
+        if platform.system() == "Windows":
+            options["creationflags"] = subprocess.IDLE_PRIORITY_CLASS
+        result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout, **options)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                               f"transcoder exited with {result.returncode}")
+        job["outcome"] = f"✅ {os.path.basename(job['target'])}"
+        return True
+
+    @property
+    def pending(self):
+        return self.pipeline.pending
+
+    def join(self, timeout=None):
+        return self.pipeline.join(timeout)
+
+    def shutdown(self, wait=True, timeout=None):
+        self.pipeline.shutdown(wait=wait, timeout=timeout)
+
+
+def leftover_intermediates(recordings_dir):
+    """Intermediates in a directory that have no archival file next to them."""
+    found = []
+    for filename in sorted(os.listdir(recordings_dir)):
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() == INTERMEDIATE_EXTENSION \
+                and not os.path.exists(os.path.join(recordings_dir, stem + ARCHIVE_EXTENSION)):
+            found.append(os.path.join(recordings_dir, filename))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode captured video to the archival codec")
+    parser.add_argument("source", help="Intermediate video file, or a directory of left-over ones")
+    parser.add_argument("--output", help="Archival file (default: the source with .mp4; single files only)")
+    parser.add_argument("--codec", default=DEFAULT_ARCHIVE_CODEC, help="Archival fourcc")
+    parser.add_argument("--keep", action="store_true", help="Keep the intermediate file")
+    args = parser.parse_args()
+
+    lower_priority()
+    if os.path.isdir(args.source):
+        sources = leftover_intermediates(args.source)
+    else:
+        sources = [args.source]
+    if not sources:
+        print(f"✅ Nothing to transcode in {args.source}")
+        return
+
+    for source in sources:
+        target = args.output or os.path.splitext(source)[0] + ARCHIVE_EXTENSION
+        started = time.monotonic()
+        frames = transcode(source, target, args.codec)
+        if frame_count(target) != frames:
+            raise RuntimeError(f"{target} does not have the {frames} frames of {source}")
+        # The recording's sidecar names its video file
+        wav = existing_audio_path(os.path.splitext(source)[0] + ".wav")
+        if os.path.exists(wav):
+            update_sidecar(wav, video=os.path.basename(target), video_codec=args.codec)
+        if not args.keep:
+            os.remove(source)
+        print(f"✅ {os.path.basename(target)}: {frames} frames in {time.monotonic() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
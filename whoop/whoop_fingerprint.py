@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Audio fingerprint index for spotting replayed or duplicate submissions.
+
+Each recording is reduced to a set of spectral peak-pair hashes: the
+strongest time-frequency peaks of its spectrogram, paired with a few peaks
+that follow shortly after. Identical audio, or the real chirp played through
+a speaker, produces many hashes that line up at one consistent time offset,
+while two different people whooping do not.
+
+The hashes of every recording seen so far are kept in an inverted index
+(hash -> recording, time) stored next to the recordings, so checking a new
+submission costs a lookup per hash instead of a comparison per recording.
+
+Usage:
+    python3 whoop_fingerprint.py recordings/new_take.wav
+    python3 whoop_fingerprint.py --rebuild recordings/
+"""
+
+import os
+import json
+import uuid
+import struct
+import argparse
+import threading
+import numpy as np
+from scipy.ndimage import maximum_filter
+from scipy.signal import resample_poly, stft
+
+from whoop_prescreen import read_mono, find_wav_files
+from audio_storage import audio_aliases
+from file_lock import FileLock
+
+# Spectrogram used for peak picking
+FINGERPRINT_RATE = 4000  # Hz
+SEGMENT_LENGTH = 256  # samples per frame (64 ms, ~16 Hz bins)
+SEGMENT_HOP = 64  # samples between frames (16 ms)
+MIN_FREQUENCY = 30  # Hz, below this is mostly handling noise
+
+# Peak picking and pairing
+PEAK_NEIGHBOURHOOD = 5  # frequency bins for per-frame local maxima
+PEAK_RANGE = 3.0  # natural-log magnitude below the loudest peak (~26 dB)
+PEAKS_PER_SECOND = 60
+FAN_OUT = 5  # pairs per anchor peak
+MAX_PAIR_FRAMES = 63  # fits the 6-bit time delta in the hash
+MAX_PAIR_BINS = 32  # frequency extent of the target zone
+
+# Matching thresholds
+MIN_ALIGNED_HASHES = 30
+MIN_ALIGNED_FRACTION = 0.1
+
+DEFAULT_INDEX_FILE = "fingerprints.npz"
+JOURNAL_EXTENSION = ".journal"  # recordings added since the .npz was written
+JOURNAL_MAGIC = b"WHOOPFP1 "
+JOURNAL_HEADER_SIZE = len(JOURNAL_MAGIC) + 33  # magic, generation of the .npz, newline
+COMPACT_JOURNAL_BYTES = 16 * 1024 * 1024  # about 600 recordings
+MIN_MERGE_HASHES = 1 << 16  # new hashes searched as their own segment until this many
+TEMPLATE_NAME = "<real chirp>"
+
+# Returned by screen_submission for a take that was screened before
+ALREADY_SUBMITTED = "already submitted"
+
+
+def fingerprint_data(data, rate):
+    """
+    Compute the peak-pair hashes of a mono signal.
+
+    Returns two int64 arrays of equal length: the hashes and the frame index
+    of each hash's anchor peak.
+    """
+    rate = int(round(rate))
+    if rate != FINGERPRINT_RATE:
+        g = np.gcd(rate, FINGERPRINT_RATE)
+        data = resample_poly(data, FINGERPRINT_RATE // g, rate // g)
+
+    freqs, _, spec = stft(data, fs=FINGERPRINT_RATE, nperseg=SEGMENT_LENGTH,
+                          noverlap=SEGMENT_LENGTH - SEGMENT_HOP,
+                          boundary=None, padded=True)
+    spec = np.log1p(np.abs(spec))
+    spec[freqs < MIN_FREQUENCY] = 0.0
+    # Remove each bin's steady background (mains hum, fans) so it never forms peaks
+    spec = np.maximum(spec - np.median(spec, axis=1, keepdims=True), 0.0)
+
+    # Spectral peaks of each frame within PEAK_RANGE of the loudest point.
+    # Quiet peaks are where noise and room acoustics differ between two
+    # copies of the same sound, so they are left out altogether.
+    floor = spec.max() - PEAK_RANGE
+    peaks = (spec == maximum_filter(spec, size=(PEAK_NEIGHBOURHOOD, 1))) & (spec > floor) & (spec > 0)
+    f_idx, t_idx = np.nonzero(peaks)
+    if len(f_idx) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Keep only the strongest peaks so the fingerprint size follows duration
+    duration = len(data) / FINGERPRINT_RATE
+    n_keep = max(1, int(PEAKS_PER_SECOND * duration))
+    if len(f_idx) > n_keep:
+        strongest = np.argsort(spec[f_idx, t_idx])[::-1][:n_keep]
+        f_idx, t_idx = f_idx[strongest], t_idx[strongest]
+    order = np.lexsort((f_idx, t_idx))
+    f_idx, t_idx = f_idx[order], t_idx[order]
+
+    # Pair each anchor with the next few peaks in its target zone
+    hashes = []
+    anchors = []
+    for i in range(len(t_idx)):
+        paired = 0
+        for j in range(i + 1, len(t_idx)):
+            dt = t_idx[j] - t_idx[i]
+            if dt > MAX_PAIR_FRAMES or paired >= FAN_OUT:
+                break
+            df = abs(int(f_idx[j]) - int(f_idx[i]))
+            # Same-bin pairs describe a steady tone, which any two people can share
+            if dt == 0 or df == 0 or df > MAX_PAIR_BINS:
+                continue
+            # 9 bits per frequency bin, 6 bits for the time delta
+            hashes.append((int(f_idx[i]) << 15) | (int(f_idx[j]) << 6) | int(dt))
+            anchors.append(t_idx[i])
+            paired += 1
+    return np.asarray(hashes, dtype=np.int64), np.asarray(anchors, dtype=np.int64)
+
+
+def fingerprint(wav_file):
+    """Peak-pair hashes of a WAV file. See fingerprint_data."""
+    rate, data = read_mono(wav_file)
+    return fingerprint_data(data, rate)
+
+
+class FingerprintIndex:
+    """
+    Inverted index from peak-pair hash to (recording, anchor frame).
+
+    Entries are kept as three parallel arrays sorted by hash, so a lookup is a
+    binary search per query hash regardless of how many recordings are
+    indexed. New recordings go into a small segment of their own, searched
+    alongside and folded into the main arrays once it has grown.
+
+    With a path, every add() is appended to a journal next to the .npz at
+    once, so a process keeps one index open and only writes what is new.
+    Other processes' additions are read from the journal by refresh().
+    Hold `lock` around refresh() and everything that follows from it; save()
+    compacts the journal into the .npz, which add() also does once the
+    journal is large.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = FileLock(path + ".lock") if path else threading.RLock()
+        self._load()
+
+    def _load(self):
+        self.names = []
+        self._known = set()
+        self.hashes = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.int64)
+        self._pending = []
+        self._recent = None  # the new segment, sorted
+        self.generation = ""
+        self._journal_offset = 0
+
+        if self.path and os.path.exists(self.path):
+            with np.load(self.path) as stored:
+                self.names = json.loads(str(stored["names"]))
+                self.hashes = stored["hashes"]
+                self.ids = stored["ids"]
+                self.times = stored["times"]
+                if "generation" in stored:
+                    self.generation = str(stored["generation"])
+            self._known = set(self.names)
+        self.refresh()
+
+    @property
+    def journal_path(self):
+        return os.path.splitext(self.path)[0] + JOURNAL_EXTENSION
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._known
+
+    def _insert(self, name, hashes, times):
+        rec_id = len(self.names)
+        self.names.append(name)
+        self._known.add(name)
+        self._pending.append((hashes, np.full(len(hashes), rec_id, dtype=np.int64), times))
+        self._recent = None
+        return rec_id
+
+    def add(self, name, hashes, times):
+        """Add a recording's fingerprint under the given name (and to the journal)."""
+        hashes = np.asarray(hashes, dtype=np.int64)
+        times = np.asarray(times, dtype=np.int64)
+        if not self.path:
+            return self._insert(name, hashes, times)
+        with self.lock:
+            self.refresh()
+            encoded = name.encode("utf-8")
+            record = struct.pack("<II", len(encoded), len(hashes)) + encoded \
+                + hashes.astype("<i8").tobytes() + times.astype("<i8").tobytes()
+            if not os.path.exists(self.journal_path):
+                self._write_journal_header()
+            with open(self.journal_path, "r+b") as journal:
+                # Overwrites whatever a crashed writer left half-written
+                journal.seek(self._journal_offset)
+                journal.write(record)
+                journal.truncate()
+            self._journal_offset += len(record)
+            rec_id = self._insert(name, hashes, times)
+            if self._journal_offset > COMPACT_JOURNAL_BYTES:
+                self.save()
+            return rec_id
+
+    def _write_journal_header(self):
+        """Start an empty journal for the current .npz generation."""
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "wb") as journal:
+            journal.write(JOURNAL_MAGIC + self.generation.encode("ascii").ljust(32) + b"\n")
+        os.replace(tmp_path, self.journal_path)
+        self._journal_offset = JOURNAL_HEADER_SIZE
+
+    def refresh(self):
+        """Read what other processes added since this index was loaded or refreshed."""
+        if not self.path:
+            return
+        with self.lock:
+            try:
+                with open(self.journal_path, "rb") as journal:
+                    header = journal.read(JOURNAL_HEADER_SIZE)
+                    journal.seek(max(self._journal_offset, JOURNAL_HEADER_SIZE))
+                    data = journal.read()
+            except FileNotFoundError:
+                if self._journal_offset:
+                    self._load()  # removed, e.g. by --rebuild
+                return
+            if len(header) < JOURNAL_HEADER_SIZE or not header.startswith(JOURNAL_MAGIC):
+                return
+            if header[len(JOURNAL_MAGIC):-1].decode("ascii").strip() != self.generation:
+                if self._journal_offset:
+                    self._load()  # another process compacted the index since
+                else:
+                    # Left by a save() interrupted before it emptied the
+                    # journal; everything in it is in the .npz already
+                    self._write_journal_header()
+                return
+            self._journal_offset = max(self._journal_offset, JOURNAL_HEADER_SIZE)
+
+            position = 0
+            while position + 8 <= len(data):
+                name_length, count = struct.unpack_from("<II", data, position)
+                end = position + 8 + name_length + 16 * count
+                if end > len(data):
+                    break  # left half-written by a crashed process; add() overwrites it
+                start = position + 8 + name_length
+                self._insert(data[position + 8:start].decode("utf-8"),
+                             np.frombuffer(data, "<i8", count, start).astype(np.int64),
+                             np.frombuffer(data, "<i8", count, start + 8 * count).astype(np.int64))
+                position = end
+            self._journal_offset += position
+
+    def _merge(self, force=False):
+        """Fold the new segment into the main arrays once it is large enough (or when forced)."""
+        if not self._pending:
+            return
+        recent_size = sum(len(p[0]) for p in self._pending)
+        if not force and recent_size < max(MIN_MERGE_HASHES, len(self.hashes) // 8):
+            return
+        hashes = np.concatenate([self.hashes] + [p[0] for p in self._pending])
+        ids = np.concatenate([self.ids] + [p[1] for p in self._pending])
+        times = np.concatenate([self.times] + [p[2] for p in self._pending])
+        order = np.argsort(hashes, kind="stable")
+        self.hashes, self.ids, self.times = hashes[order], ids[order], times[order]
+        self._pending = []
+        self._recent = None
+
+    def _segments(self):
+        self._merge()
+        segments = [(self.hashes, self.ids, self.times)]
+        if self._pending:
+            if self._recent is None:
+                hashes = np.concatenate([p[0] for p in self._pending])
+                order = np.argsort(hashes, kind="stable")
+                self._recent = (hashes[order], np.concatenate([p[1] for p in self._pending])[order],
+                                np.concatenate([p[2] for p in self._pending])[order])
+            segments.append(self._recent)
+        return segments
+
+    def query(self, hashes, times):
+        """
+        Find indexed recordings that share time-aligned hashes with a query.
+
+        Returns a list of (name, aligned_hashes, aligned_fraction) tuples,
+        best match first.
+        """
+        if len(hashes) == 0:
+            return []
+
+        hit_ids, hit_offsets = [], []
+        for indexed_hashes, indexed_ids, indexed_times in self._segments():
+            lo = np.searchsorted(indexed_hashes, hashes, side="left")
+            hi = np.searchsorted(indexed_hashes, hashes, side="right")
+            counts = hi - lo
+            if counts.sum() == 0:
+                continue
+
+            # Expand every (query hash, indexed entry) hit
+            query_pos = np.repeat(np.arange(len(hashes)), counts)
+            starts = np.repeat(lo, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            entry = starts + offsets
+            hit_ids.append(indexed_ids[entry])
+            hit_offsets.append(indexed_times[entry] - times[query_pos])
+        if not hit_ids:
+            return []
+        hit_ids, hit_offsets = np.concatenate(hit_ids), np.concatenate(hit_offsets)
+
+        # Count hits per (recording, time offset) and keep each recording's best offset
+        keys = hit_ids * (1 << 20) + (hit_offsets + (1 << 19))
+        unique_keys, key_counts = np.unique(keys, return_counts=True)
+        best = {}
+        for key, count in zip(unique_keys, key_counts):
+            rec_id = int(key >> 20)
+            if count > best.get(rec_id, 0):
+                best[rec_id] = int(count)
+
+        matches = [(self.names[rec_id], count, count / len(hashes))
+                   for rec_id, count in best.items()]
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def save(self, path=None):
+        """Write the whole index to disk (compressed .npz) and empty the journal."""
+        path = path or self.path
+        with self.lock:
+            if path == self.path:
+                self.refresh()
+            self._merge(force=True)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            generation = uuid.uuid4().hex
+            # Write to a temporary file first so a crash never leaves a broken index
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(tmp_path, names=json.dumps(self.names), generation=generation,
+                                hashes=self.hashes, ids=self.ids, times=self.times)
+            os.replace(tmp_path, path)
+            if path == self.path:
+                self.generation = generation
+                self._write_journal_header()
+
+
+def is_suspicious(match):
+    """Whether a (name, aligned_hashes, aligned_fraction) match is a copy."""
+    _, count, fraction = match
+    return count >= MIN_ALIGNED_HASHES and fraction >= MIN_ALIGNED_FRACTION
+
+
+def check_recording(index, hashes, times):
+    """
+    Check a fingerprint against the index.
+
+    Returns None if the recording looks original, otherwise a short reason
+    string such as "replay of the real chirp" or "duplicate of Bo_...wav".
+    """
+    for match in index.query(hashes, times):
+        if not is_suspicious(match):
+            break
+        name = match[0]
+        if name == TEMPLATE_NAME:
+            return "replay of the real chirp"
+        return f"duplicate of {name}"
+    return None
+
+
+def load_index(recordings_dir, real_wav=None):
+    """
+    Open the index stored in recordings_dir, creating it if needed.
+
+    The real chirp is fingerprinted into a fresh index so replays of it are
+    caught like any other duplicate.
+    """
+    index = FingerprintIndex(os.path.join(str(recordings_dir), DEFAULT_INDEX_FILE))
+    if real_wav and os.path.exists(real_wav):
+        with index.lock:
+            index.refresh()
+            if TEMPLATE_NAME not in index:
+                index.add(TEMPLATE_NAME, *fingerprint(real_wav))
+    return index
+
+
+_open_indexes = {}  # index path -> FingerprintIndex, see shared_index
+_open_indexes_lock = threading.Lock()
+
+
+def shared_index(recordings_dir, real_wav=None):
+    """
+    The index of recordings_dir that this process keeps open.
+
+    It is loaded on first use; after that screen_submission only reads
+    what other processes added and appends what it adds, so screening a
+    take costs the same however many are indexed.
+    """
+    path = os.path.abspath(os.path.join(str(recordings_dir), DEFAULT_INDEX_FILE))
+    with _open_indexes_lock:
+        if path not in _open_indexes:
+            _open_indexes[path] = load_index(recordings_dir, real_wav)
+        return _open_indexes[path]
+
+
+def screen_submission(wav_file, index, register=True):
+    """
+    Check a new recording before it is scored and submitted.
+
+    Returns None if the recording is fine, otherwise the reason it was
+    flagged. Recordings that pass are added to the index, and to its
+    journal on disk, so a later copy of them is caught too, by this process
+    or another. A recording already in the index under its name (or as its
+    WAV or FLAC twin) gives ALREADY_SUBMITTED, which is not a flag: callers
+    skip the take unless they mean to submit it again, e.g. after its
+    scoring failed. Errors never block a submission.
+    """
+    try:
+        name = os.path.basename(str(wav_file))
+        with index.lock:
+            index.refresh()
+            if any(alias in index for alias in audio_aliases(name)):
+                return ALREADY_SUBMITTED  # maybe as WAV before it was archived
+        hashes, times = fingerprint(wav_file)
+        # Checked and added in one go, so two processes never both let a copy through
+        with index.lock:
+            index.refresh()
+            if any(alias in index for alias in audio_aliases(name)):
+                return ALREADY_SUBMITTED
+            reason = check_recording(index, hashes, times)
+            if reason is None and register:
+                index.add(name, hashes, times)
+        return reason
+    except Exception as e:
+        print(f"Warning: fingerprint check failed for {wav_file}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect replayed or duplicate whoop recordings")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories of WAV files")
+    parser.add_argument("--recordings_dir", default="recordings",
+                        help="Directory holding the fingerprint index")
+    parser.add_argument("--real_wav", default="recordings/real_chirp/GW150914_L1_shiftedslower.wav",
+                        help="Path to the real chirp .wav file")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Start from an empty index instead of the stored one")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        index = FingerprintIndex(os.path.join(args.recordings_dir, DEFAULT_INDEX_FILE))
+        with index.lock:
+            for path in (index.path, index.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    index = load_index(args.recordings_dir, args.real_wav)
+    flagged = {}
+    for wav in find_wav_files(args.paths):
+        reason = screen_submission(wav, index)
+        if reason == ALREADY_SUBMITTED:
+            print(f"✅ {wav} ({reason})")
+        elif reason:
+            flagged[wav] = reason
+            print(f"⚠️  {wav}: {reason}")
+        else:
+            print(f"✅ {wav}")
+    return flagged
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,7 @@
 import os
 import argparse
 import numpy as np
-from scipy.io import wavfile
-from scipy.signal import resample
+from scipy.signal import resample, resample_poly
 
 try:
     from pycbc.types import TimeSeries
@@ -37,12 +36,80 @@ def pad_or_truncate(ts_mimic, ts_match):
     return ts_match, TimeSeries(data_mimic, delta_t=ts_mimic.delta_t)
 
 
-def compare_mimic(wav_file_mimic, wav_file_real, low_frequency_cutoff=10, high_frequency_cutoff=600):
+def scoring_window(data_mimic, rate_mimic, duration, trigger_sample):
+    """
+    Cut a recording with pre-roll down to `duration` seconds.
+
+    Recordings made with a pre-roll are longer than the real chirp, and
+    pad_or_truncate would otherwise stretch them to its length. The window
+    goes wherever it holds the most energy, so a whoop that starts in the
+    pre-roll or well after the trigger is kept whole; among equally good
+    windows the one starting nearest the trigger wins.
+
+    A take that stopped early (auto-stop) is shorter than the template and
+    is padded with silence instead, so it is not stretched either.
+    """
+    window = int(round(duration * rate_mimic))
+    if trigger_sample is None or len(data_mimic) == window:
+        return data_mimic
+    if len(data_mimic) < window:
+        padding = [(0, window - len(data_mimic))] + [(0, 0)] * (data_mimic.ndim - 1)
+        return np.pad(data_mimic, padding, mode="constant")
+    power = data_mimic.astype(np.float64) ** 2
+    if power.ndim > 1:
+        power = power.sum(axis=1)
+    energy = np.concatenate(([0.0], np.cumsum(power)))
+    starts = np.arange(len(data_mimic) - window + 1)
+    window_energy = energy[starts + window] - energy[starts]
+    candidates = starts[window_energy >= window_energy.max()]
+    best = int(candidates[np.argmin(np.abs(candidates - int(trigger_sample)))])
+    return data_mimic[best:best + window]
+
+
+def match_template_rate(data_real, rate_real, rate_mimic, high_frequency_cutoff=600):
+    """
+    Bring the template down to a lower-rate recording's sample rate.
+
+    The matched filter runs at the template's rate, so an 8 kHz take would
+    otherwise be stretched to 44.1 kHz first. Downsampling the template
+    instead keeps everything up to high_frequency_cutoff and makes the
+    filter several times cheaper.
+    """
+    rate_real, rate_mimic = int(round(rate_real)), int(round(rate_mimic))
+    if rate_mimic >= rate_real or rate_mimic < 2 * high_frequency_cutoff:
+        return data_real, rate_real
+    g = np.gcd(rate_real, rate_mimic)
+    return resample_poly(data_real.astype(np.float64), rate_mimic // g, rate_real // g, axis=0), rate_mimic
+
+
+def compare_mimic(wav_file_mimic, wav_file_real, low_frequency_cutoff=10, high_frequency_cutoff=600,
+                  trigger_sample=None):
     # If recording is too noisy, return score=0.0 to prevent match function error
     try:
-        rate_mimic, data_mimic = wavfile.read(wav_file_mimic)
-        rate_real, data_real = wavfile.read(wav_file_real)
+        from audio_storage import read_audio
+        rate_mimic, data_mimic = read_audio(wav_file_mimic)
+        rate_real, data_real = read_audio(wav_file_real)
+    except Exception as e:
+        # print(f"Error reading {wav_file_mimic} or {wav_file_real}: {e}")
+        return 0.0
+    return compare_mimic_data(data_mimic, rate_mimic, data_real, rate_real,
+                              low_frequency_cutoff, high_frequency_cutoff, trigger_sample)
+
+
+def compare_mimic_data(data_mimic, rate_mimic, data_real, rate_real,
+                       low_frequency_cutoff=10, high_frequency_cutoff=600, trigger_sample=None):
+    """
+    Score in-memory audio the same way compare_mimic scores WAV files.
 
+    trigger_sample is where recording was triggered in a recording that
+    starts with a pre-roll; see scoring_window. Multichannel audio is
+    scored as the average of its channels.
+    """
+    from audio_storage import mono
+    try:
+        data_mimic, data_real = mono(data_mimic), mono(data_real)
+        data_real, rate_real = match_template_rate(data_real, rate_real, rate_mimic, high_frequency_cutoff)
+        data_mimic = scoring_window(data_mimic, rate_mimic, len(data_real) / rate_real, trigger_sample)
         dataM1 = data_mimic.astype(np.float32)
         dataR1 = data_real.astype(np.float32)
 
@@ -69,7 +136,7 @@ def compare_mimic(wav_file_mimic, wav_file_real, low_frequency_cutoff=10, high_f
         # print("Warning: audio too weak or noisy — returning 0% match")
         return 0.0
     except Exception as e:
-        # print(f"Error comparing {wav_file_mimic} to {wav_file_real}: {e}")
+        # print(f"Error comparing mimic to real chirp: {e}")
         return 0.0
 
 
@@ -83,17 +150,25 @@ def get_player_name(wav_file_path):
     return player_name
 
 
+def recording_player(wav_file_path):
+    """Player name of a recording: as typed, from its sidecar, else from its file name."""
+    from recording_metadata import read_sidecar
+    return read_sidecar(wav_file_path).get("player") or get_player_name(wav_file_path)
+
+
 def run_comparison(wav_file, real_wav):
     """Run the comparison and return a dictionary with name and score."""
-    score = compare_mimic(wav_file, real_wav)
-    player_name = get_player_name(wav_file)
+    from recording_metadata import read_sidecar
+    trigger_sample = read_sidecar(wav_file).get("trigger_sample")
+    score = compare_mimic(wav_file, real_wav, trigger_sample=trigger_sample)
+    player_name = recording_player(wav_file)
     result = {"name": player_name, "score": score}
     return result
 
 
 def main():
     parser = argparse.ArgumentParser(description="Compare a mimic WAV file to the real chirp")
-    parser.add_argument("wav_file", help="Path to the mimic .wav file")
+    parser.add_argument("wav_file", help="Path to the mimic .wav or .flac file")
     parser.add_argument("--real_wav", default="recordings/real_chirp/GW150914_L1_shiftedslower.wav",
                         help="Path to the real chirp .wav file")
     args = parser.parse_args()
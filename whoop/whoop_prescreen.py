@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Fast approximate whoop scoring.
+
+The exact score from whoop_gamescore.compare_mimic runs a full pycbc matched
+filter at the recording's native sample rate. That is fine for one player at
+the booth, but slow for bulk rescoring. This module computes a coarse,
+band-limited STFT of each recording and compares its frequency track against
+the template's chirp track, which takes a few milliseconds per file.
+
+The exact matched filter is then only run where it matters: on the top-K
+candidates of the leaderboard and on recordings whose approximate score lies
+close to a rank boundary.
+
+Usage:
+    python3 whoop_prescreen.py recordings/ --real_wav path/to/chirp.wav --top_k 10
+"""
+
+import os
+import argparse
+import time
+import numpy as np
+from scipy.signal import resample, resample_poly, stft
+
+# Coarse analysis parameters - the scoring band is 10-600 Hz, so a 2 kHz
+# track rate keeps everything that compare_mimic looks at.
+TRACK_RATE = 2000  # Hz
+SEGMENT_LENGTH = 256  # samples per STFT frame at TRACK_RATE (128 ms, ~8 Hz bins)
+SEGMENT_HOP = 64  # samples between frames (32 ms)
+
+
+def read_mono(wav_file):
+    """Read a WAV or FLAC file as a float64 mono array. Returns (rate, data)."""
+    from audio_storage import read_audio, mono
+    rate, data = read_audio(wav_file)
+    return rate, mono(data.astype(np.float64))
+
+
+def chirp_track(data, rate, low_frequency_cutoff=10, high_frequency_cutoff=600):
+    """
+    Compute the coarse frequency track of a signal.
+
+    Returns a (frequency bins x frames) magnitude spectrogram restricted to the
+    scoring band. The signal is first resampled to TRACK_RATE so every track
+    has the same frequency resolution regardless of the input sample rate.
+    """
+    if abs(rate - round(rate)) > 1e-6:
+        # Non-integer (effective) rate: resample by length instead
+        data = resample(data, max(1, int(round(len(data) * TRACK_RATE / rate))))
+    elif int(round(rate)) != TRACK_RATE:
+        rate = int(round(rate))
+        g = np.gcd(rate, TRACK_RATE)
+        data = resample_poly(data, TRACK_RATE // g, rate // g)
+
+    freqs, _, spec = stft(data, fs=TRACK_RATE, nperseg=SEGMENT_LENGTH,
+                          noverlap=SEGMENT_LENGTH - SEGMENT_HOP,
+                          boundary=None, padded=True)
+    band = (freqs >= low_frequency_cutoff) & (freqs <= high_frequency_cutoff)
+    return np.abs(spec[band])
+
+
+def compare_tracks(track_mimic, track_real):
+    """
+    Best normalised correlation between two frequency tracks over all time lags.
+
+    This is the incoherent counterpart of the matched filter: instead of
+    maximising the phase-sensitive inner product over time and phase, it
+    maximises the cosine similarity of the band spectrograms over time.
+    Returns a value between 0 and 1.
+    """
+    n_mimic = track_mimic.shape[1]
+    n_real = track_real.shape[1]
+    if n_mimic == 0 or n_real == 0:
+        return 0.0
+
+    # Zero-pad the mimic so the template can slide fully in and out of it
+    padded = np.pad(track_mimic, ((0, 0), (n_real - 1, n_real - 1)))
+    n_lags = padded.shape[1] - n_real + 1
+
+    # Sum over frequency of the per-bin cross-correlation, via FFT
+    size = padded.shape[1] + n_real - 1
+    nfft = 1 << int(np.ceil(np.log2(size)))
+    xcorr = np.fft.irfft(np.fft.rfft(padded, nfft, axis=1) *
+                         np.conj(np.fft.rfft(track_real, nfft, axis=1)),
+                         nfft, axis=1).sum(axis=0)[:n_lags]
+
+    # Energy of each mimic window the template overlaps
+    frame_energy = np.concatenate(([0.0], np.cumsum((padded ** 2).sum(axis=0))))
+    window_energy = frame_energy[n_real:n_real + n_lags] - frame_energy[:n_lags]
+    real_energy = (track_real ** 2).sum()
+
+    norm = np.sqrt(np.maximum(window_energy, 0.0) * real_energy)
+    valid = norm > 0
+    if not np.any(valid):
+        return 0.0
+    return float(np.clip(np.max(xcorr[valid] / norm[valid]), 0.0, 1.0))
+
+
+def approx_score_data(data_mimic, track_real, len_real, rate_real,
+                      low_frequency_cutoff=10, high_frequency_cutoff=600):
+    """
+    Approximate score of an in-memory mimic against a precomputed template track.
+
+    compare_mimic resamples the mimic to the template's length and sample rate,
+    which stretches or squeezes it in time when the durations differ. The same
+    geometry is reproduced here by analysing the mimic at its effective rate,
+    which depends only on its length, not on the rate it was recorded at.
+    Returns a score on the same 0-100 scale as compare_mimic.
+    """
+    if len(data_mimic) == 0:
+        return 0.0
+    effective_rate = len(data_mimic) * rate_real / len_real
+    track_mimic = chirp_track(data_mimic, effective_rate,
+                              low_frequency_cutoff, high_frequency_cutoff)
+    return float(np.round(compare_tracks(track_mimic, track_real), 3) * 100)
+
+
+class Prescreener:
+    """Approximate scorer with the template's chirp track computed once."""
+
+    def __init__(self, wav_file_real, low_frequency_cutoff=10, high_frequency_cutoff=600):
+        self.wav_file_real = wav_file_real
+        self.low_frequency_cutoff = low_frequency_cutoff
+        self.high_frequency_cutoff = high_frequency_cutoff
+        self.rate_real, data_real = read_mono(wav_file_real)
+        self.len_real = len(data_real)
+        self.track_real = chirp_track(data_real, self.rate_real,
+                                      low_frequency_cutoff, high_frequency_cutoff)
+
+    def score_data(self, data_mimic):
+        """Approximate 0-100 score of an in-memory mono mimic recording."""
+        try:
+            return approx_score_data(data_mimic, self.track_real,
+                                     self.len_real, self.rate_real,
+                                     self.low_frequency_cutoff, self.high_frequency_cutoff)
+        except Exception:
+            return 0.0
+
+    def score(self, wav_file_mimic):
+        """Approximate 0-100 score of a mimic WAV file."""
+        try:
+            _, data_mimic = read_mono(wav_file_mimic)
+        except Exception:
+            return 0.0
+        return self.score_data(data_mimic)
+
+
+def approx_score(wav_file_mimic, wav_file_real, low_frequency_cutoff=10, high_frequency_cutoff=600):
+    """Approximate counterpart of whoop_gamescore.compare_mimic."""
+    return Prescreener(wav_file_real, low_frequency_cutoff, high_frequency_cutoff).score(wav_file_mimic)
+
+
+def select_for_rescoring(approx_scores, top_k=10, margin=5.0):
+    """
+    Pick the indices whose exact score can change the leaderboard.
+
+    These are the top_k approximate scores plus every recording whose
+    approximate score lies within `margin` points of the top-K cutoff, so a
+    recording just outside the top K still gets a chance to move in.
+    """
+    approx_scores = np.asarray(approx_scores, dtype=float)
+    if len(approx_scores) == 0:
+        return []
+    order = np.argsort(-approx_scores, kind="stable")
+    selected = set(order[:top_k].tolist())
+    cutoff = approx_scores[order[min(top_k, len(order)) - 1]]
+    near = np.nonzero(np.abs(approx_scores - cutoff) <= margin)[0]
+    selected.update(near.tolist())
+    return sorted(selected, key=lambda i: -approx_scores[i])
+
+
+def rank_recordings(wav_files, wav_file_real, top_k=10, margin=5.0):
+    """
+    Score many recordings with the prescreen and refine the candidates exactly.
+
+    Returns a list of dictionaries, each with the keys "name", "file",
+    "approx_score", "score" and "exact" (whether "score" came from the
+    matched filter or from the prescreen). The rescored recordings come
+    first, ranked by their exact score; the rest follow as a separate tail
+    ranked by prescreen score, which is on a different scale and is never
+    compared with an exact one.
+    """
+    from whoop_gamescore import compare_mimic, recording_player
+
+    prescreener = Prescreener(wav_file_real)
+    approx_scores = [prescreener.score(str(f)) for f in wav_files]
+
+    results = []
+    for f, approx in zip(wav_files, approx_scores):
+        results.append({"name": recording_player(str(f)), "file": str(f),
+                        "approx_score": approx, "score": approx, "exact": False})
+
+    for i in select_for_rescoring(approx_scores, top_k, margin):
+        results[i]["score"] = compare_mimic(str(wav_files[i]), wav_file_real)
+        results[i]["exact"] = True
+
+    rescored = sorted((r for r in results if r["exact"]), key=lambda r: r["score"], reverse=True)
+    tail = sorted((r for r in results if not r["exact"]), key=lambda r: r["approx_score"], reverse=True)
+    return rescored + tail
+
+
+def correlation_report(wav_files, wav_file_real):
+    """Compare approximate and exact scores for every recording in wav_files."""
+    from scipy.stats import pearsonr, spearmanr
+    from whoop_gamescore import compare_mimic
+
+    prescreener = Prescreener(wav_file_real)
+
+    start = time.perf_counter()
+    approx = [prescreener.score(str(f)) for f in wav_files]
+    approx_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact = [compare_mimic(str(f), wav_file_real) for f in wav_files]
+    exact_time = time.perf_counter() - start
+
+    report = {
+        "files": len(wav_files),
+        "approx_ms_per_file": 1000 * approx_time / max(1, len(wav_files)),
+        "exact_ms_per_file": 1000 * exact_time / max(1, len(wav_files)),
+        "pearson": float("nan"),
+        "spearman": float("nan"),
+        "approx": approx,
+        "exact": exact,
+    }
+    if len(wav_files) > 2 and np.std(approx) > 0 and np.std(exact) > 0:
+        report["pearson"] = float(pearsonr(approx, exact)[0])
+        report["spearman"] = float(spearmanr(approx, exact)[0])
+    return report
+
+
+def find_wav_files(paths):
+    """Expand files and directories into a sorted list of WAV and FLAC files."""
+    from audio_storage import find_audio_files
+    wav_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            wav_files.extend(find_audio_files(path))
+        else:
+            wav_files.append(path)
+    return wav_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast approximate whoop scoring with exact re-scoring of the top candidates")
+    parser.add_argument("paths", nargs="+", help="WAV/FLAC files or directories of them")
+    parser.add_argument("--real_wav", default="recordings/real_chirp/GW150914_L1_shiftedslower.wav",
+                        help="Path to the real chirp .wav file")
+    parser.add_argument("--top_k", type=int, default=10, help="Number of leaderboard places to score exactly")
+    parser.add_argument("--margin", type=float, default=5.0,
+                        help="Also score exactly anything within this many points of the top-K cutoff")
+    parser.add_argument("--report", action="store_true",
+                        help="Score everything both ways and report how well the scores correlate")
+    args = parser.parse_args()
+
+    wav_files = find_wav_files(args.paths)
+    if not wav_files:
+        print("❌ No .wav or .flac files found")
+        return
+
+    if args.report:
+        report = correlation_report(wav_files, args.real_wav)
+        for f, a, e in zip(wav_files, report["approx"], report["exact"]):
+            print(f"{a:6.1f} {e:6.1f}  {os.path.basename(f)}")
+        print(f"Files: {report['files']}")
+        print(f"Approximate: {report['approx_ms_per_file']:.1f} ms/file, "
+              f"exact: {report['exact_ms_per_file']:.1f} ms/file")
+        print(f"Pearson r = {report['pearson']:.3f}, Spearman rho = {report['spearman']:.3f}")
+        return report
+
+    results = rank_recordings(wav_files, args.real_wav, args.top_k, args.margin)
+    for i, r in enumerate(results):
+        if not r["exact"] and (i == 0 or results[i - 1]["exact"]):
+            print("-- not rescored, prescreen scores --")
+        marker = "exact " if r["exact"] else "approx"
+        print(f"{r['score']:6.1f} ({marker})  {r['name']}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
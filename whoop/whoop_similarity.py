@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+"Who sounds most like you" - similarity search over all players' whoops.
+
+Every recording is summarised by a small embedding: its band-limited
+(10-600 Hz) log spectrum and the shape of its pitch contour. The embeddings
+of all past recordings are kept in one array next to the recordings, so a
+query is a single matrix-vector product instead of one compare_mimic per
+recording. Only the shortlist returned by that search is re-ranked with the
+exact matched filter; takes archived by recording_retention.py since they
+were indexed are read from their day bundle.
+
+Usage:
+    python3 whoop_similarity.py recordings/Alice_20250919_120000.wav
+    python3 whoop_similarity.py --rebuild recordings/
+"""
+
+import os
+import json
+import argparse
+import threading
+import numpy as np
+
+from whoop_prescreen import read_mono, chirp_track, find_wav_files
+from audio_storage import audio_aliases, existing_audio_path, read_audio
+from file_lock import FileLock
+
+N_BANDS = 24  # log-spaced spectrum bands between the cutoffs
+N_CONTOUR = 8  # points of the pitch contour
+ACTIVE_FRAME_LEVEL = 0.1  # frames below this fraction of peak energy are silence
+EMBEDDING_SIZE = N_BANDS + N_CONTOUR
+
+DEFAULT_INDEX_FILE = "similarity.npz"
+
+
+def embedding_data(data, rate, low_frequency_cutoff=10, high_frequency_cutoff=600):
+    """
+    Compute the unit-length embedding of a mono signal.
+
+    The first N_BANDS values describe the average log spectrum of the voiced
+    part of the recording, the last N_CONTOUR values how its dominant
+    frequency moves over time. Both halves are centred and normalised
+    separately so neither dominates the cosine similarity.
+    """
+    track = chirp_track(data, rate, low_frequency_cutoff, high_frequency_cutoff)
+    embedding = np.zeros(EMBEDDING_SIZE, dtype=np.float32)
+    if track.size == 0:
+        return embedding
+
+    freqs = np.linspace(low_frequency_cutoff, high_frequency_cutoff, track.shape[0])
+    power = track ** 2
+    frame_energy = power.sum(axis=0)
+    if frame_energy.max() <= 0:
+        return embedding
+    active = frame_energy >= ACTIVE_FRAME_LEVEL * frame_energy.max()
+
+    # Average log spectrum of the active frames, pooled into log-spaced bands
+    edges = np.geomspace(max(low_frequency_cutoff, 1), high_frequency_cutoff, N_BANDS + 1)
+    band_of_bin = np.clip(np.searchsorted(edges, freqs, side="right") - 1, 0, N_BANDS - 1)
+    mean_power = power[:, active].mean(axis=1)
+    band_power = np.bincount(band_of_bin, weights=mean_power, minlength=N_BANDS)
+    band_count = np.maximum(np.bincount(band_of_bin, minlength=N_BANDS), 1)
+    spectrum = np.log10(band_power / band_count + 1e-12)
+
+    # Dominant frequency of the active frames, resampled to N_CONTOUR points
+    ridge = np.log2(freqs[np.argmax(track[:, active], axis=0)])
+    contour = np.interp(np.linspace(0, len(ridge) - 1, N_CONTOUR), np.arange(len(ridge)), ridge)
+
+    for part, start, stop in ((spectrum, 0, N_BANDS), (contour, N_BANDS, EMBEDDING_SIZE)):
+        part = part - part.mean()
+        norm = np.linalg.norm(part)
+        if norm > 0:
+            embedding[start:stop] = part / norm
+    return embedding / np.sqrt(2.0)
+
+
+def embedding(wav_file):
+    """Embedding of a WAV file. See embedding_data."""
+    rate, data = read_mono(wav_file)
+    return embedding_data(data, rate)
+
+
+class SimilarityIndex:
+    """
+    Array-backed index of recording embeddings.
+
+    Embeddings are stored as rows of one float32 matrix, so the cosine
+    similarity against every indexed recording is one matrix-vector product.
+    Several processes may share the file: save() holds `lock` while it
+    re-reads the file and writes it back with this index's additions.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = FileLock(path + ".lock") if path else threading.RLock()
+        self._unsaved = []  # (name, stored file, vector) added since loading or saving
+        self._load()
+
+    def _load(self):
+        self.names = []
+        self.files = []
+        self.vectors = np.zeros((0, EMBEDDING_SIZE), dtype=np.float32)
+        self._pending = []
+        if self.path and os.path.exists(self.path):
+            with np.load(self.path) as stored:
+                meta = json.loads(str(stored["meta"]))
+                self.names = meta["names"]
+                self.files = meta["files"]
+                self.vectors = stored["vectors"]
+        self._known = set(self.files)  # self.files, for lookups
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, wav_file):
+        # A take archived as FLAC is still the recording that was indexed
+        return any(self._relative(alias) in self._known for alias in audio_aliases(wav_file))
+
+    def _relative(self, wav_file):
+        # Files are stored relative to the index so the folder can be moved
+        if not self.path:
+            return os.path.abspath(str(wav_file))
+        return os.path.relpath(str(wav_file), os.path.dirname(os.path.abspath(self.path)))
+
+    def resolve(self, stored_file):
+        """Path of an indexed recording as seen from the current directory (as FLAC if archived since)."""
+        if not self.path:
+            return existing_audio_path(stored_file)
+        return existing_audio_path(os.path.normpath(os.path.join(os.path.dirname(self.path), stored_file)))
+
+    def read(self, stored_file):
+        """
+        Decode an indexed recording, from its day bundle if it was archived.
+
+        Returns (rate, data) like read_audio, or None if the recording is gone.
+        """
+        path = self.resolve(stored_file)
+        if os.path.exists(path):
+            return read_audio(path)
+        if self.path:
+            from recording_retention import ArchiveIndex
+            try:
+                return ArchiveIndex(os.path.dirname(os.path.abspath(self.path))).read(stored_file)
+            except KeyError:
+                pass
+        return None
+
+    def add(self, name, wav_file, vector):
+        """Add a recording's embedding for the given player name."""
+        self._append(name, self._relative(wav_file), np.asarray(vector, dtype=np.float32))
+        self._unsaved.append((self.names[-1], self.files[-1], self._pending[-1]))
+
+    def _append(self, name, stored_file, vector):
+        self.names.append(name)
+        self.files.append(stored_file)
+        self._known.add(stored_file)
+        self._pending.append(vector)
+
+    def _merge(self):
+        if self._pending:
+            self.vectors = np.vstack([self.vectors] + self._pending)
+            self._pending = []
+
+    def query(self, vector, k=10, exclude_name=None):
+        """
+        Return up to k (name, file, cosine similarity) tuples, most similar first.
+
+        Recordings of exclude_name are skipped, so a player is never told that
+        they sound most like themselves.
+        """
+        self._merge()
+        if len(self.files) == 0:
+            return []
+        similarity = self.vectors @ np.asarray(vector, dtype=np.float32)
+        if exclude_name is not None:
+            similarity[np.array(self.names) == exclude_name] = -np.inf
+
+        k = min(k, len(similarity))
+        top = np.argpartition(-similarity, k - 1)[:k]
+        top = top[np.argsort(-similarity[top])]
+        return [(self.names[i], self.files[i], float(similarity[i]))
+                for i in top if np.isfinite(similarity[i])]
+
+    def save(self, path=None):
+        """Write the index to disk (.npz), keeping what other processes saved meanwhile."""
+        path = path or self.path
+        with self.lock:
+            if path == self.path:
+                unsaved, self._unsaved = self._unsaved, []
+                self._load()
+                for name, stored_file, vector in unsaved:
+                    if stored_file not in self._known:
+                        self._append(name, stored_file, vector)
+            self._merge()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, meta=json.dumps({"names": self.names, "files": self.files}),
+                     vectors=self.vectors)
+            os.replace(tmp_path, path)
+
+
+def load_index(recordings_dir):
+    """Open the similarity index stored in recordings_dir (empty if missing)."""
+    return SimilarityIndex(os.path.join(str(recordings_dir), DEFAULT_INDEX_FILE))
+
+
+def most_similar_players(wav_file, index, k=3, shortlist=10, register=True):
+    """
+    Find the k past players whose whoop sounds most like wav_file.
+
+    The embedding search picks `shortlist` candidates, which are then
+    re-ranked with the exact matched filter. Each player appears at most
+    once; if the shortlist holds fewer than k players whose recordings are
+    still there (as files or archived), it is doubled until it does or the index runs out. Returns a list of (name, score) tuples, best first. The recording
+    is added to the index afterwards when register is True (call
+    index.save() to keep it).
+    """
+    from whoop_gamescore import compare_mimic_data, recording_player
+
+    name = recording_player(str(wav_file))
+    rate, data = read_mono(wav_file)
+    vector = embedding_data(data, rate)
+
+    best = {}
+    compared = set()
+    while True:
+        candidates = index.query(vector, shortlist, exclude_name=name)
+        for candidate_name, candidate_file, _ in candidates:
+            if candidate_file in compared:
+                continue
+            compared.add(candidate_file)
+            candidate = index.read(candidate_file)
+            if candidate is None:
+                continue
+            score = compare_mimic_data(data, rate, candidate[1], candidate[0])
+            if score > best.get(candidate_name, -1.0):
+                best[candidate_name] = score
+        if len(best) >= k or len(candidates) < shortlist or shortlist >= len(index):
+            break
+        shortlist *= 2
+
+    if register and wav_file not in index:
+        index.add(name, wav_file, vector)
+
+    ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:k]
+
+
+def find_similar_players(wav_file, recordings_dir, k=3):
+    """
+    Load the index, look up wav_file's closest players and remember wav_file.
+
+    Returns a list of player names; errors never get in the way of scoring.
+    """
+    try:
+        index = load_index(recordings_dir)
+        similar = most_similar_players(wav_file, index, k)
+        index.save()
+        return [name for name, _ in similar]
+    except Exception as e:
+        print(f"Warning: similarity search failed for {wav_file}: {e}")
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the players whose whoop sounds most like yours")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories of WAV files")
+    parser.add_argument("--recordings_dir", default="recordings",
+                        help="Directory holding the similarity index")
+    parser.add_argument("-k", type=int, default=3, help="Number of similar players to show")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Start from an empty index instead of the stored one")
+    args = parser.parse_args()
+
+    index_path = os.path.join(args.recordings_dir, DEFAULT_INDEX_FILE)
+    if args.rebuild and os.path.exists(index_path):
+        os.remove(index_path)
+
+    index = load_index(args.recordings_dir)
+    results = {}
+    for wav in find_wav_files(args.paths):
+        similar = most_similar_players(wav, index, args.k)
+        results[wav] = similar
+        listing = ", ".join(f"{name} ({score:.1f})" for name, score in similar) or "-"
+        print(f"{os.path.basename(wav)}: {listing}")
+    index.save()
+    return results
+
+
+if __name__ == "__main__":
+    main()